@@ -1,61 +1,41 @@
 import os
-import json
-import time
-import threading
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from flask_sock import Sock
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from utils.metrics_stream import Broadcaster, MetricsStream
+from utils.metrics_watcher import MetricsFileHandler, MetricsWatcher, metrics_files
+from utils.perf_utils.run_store import default_run_store_path, thread_run_store
+
+METRICS_SUFFIXES = ('_metrics.json', '_metrics.jsonl', '_metrics.pcol')
 
 app = Flask(__name__)
 sock = Sock(app)
 
 # Configuration
 RESULTS_DIR = os.environ.get('RESULTS_DIR', os.path.join(os.getcwd(), 'results'))
+RUN_STORE = os.environ.get('RUN_STORE', default_run_store_path(RESULTS_DIR))
+SEND_QUEUE_SIZE = int(os.environ.get('SEND_QUEUE_SIZE', '64'))
+SEND_TIMEOUT_SECONDS = float(os.environ.get('SEND_TIMEOUT_SECONDS', '10'))
 
 # Global state
 active_tests = {}
-metrics_cache = {}
-last_update_time = 0
-websockets = []  # Store active WebSocket connections
-
-
-class MetricsFileHandler(FileSystemEventHandler):
-    """Handler for file system events when metrics files are updated."""
-    
-    def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith('_metrics.json'):
-            load_metrics_file(event.src_path)
-            broadcast_metrics()
-
-    def on_created(self, event):
-        if not event.is_directory and event.src_path.endswith('_metrics.json'):
-            load_metrics_file(event.src_path)
-            broadcast_metrics()
+metrics_stream = MetricsStream()
+metrics_cache = metrics_stream.tests
+# Active WebSocket connections; a client that falls behind is resynced with a snapshot
+broadcaster = Broadcaster(metrics_stream.snapshot, SEND_QUEUE_SIZE, SEND_TIMEOUT_SECONDS)
 
 
 def load_metrics_file(file_path):
-    """Load metrics from a file into the cache."""
-    global metrics_cache, last_update_time
-    
-    try:
-        with open(file_path, 'r') as f:
-            content = f.read().strip()
-            if not content:
-                print(f"Warning: Metrics file {file_path} is empty, skipping.")
-                return
-            test_metrics = json.loads(content)
-            test_name = test_metrics.get('test_case_id')
-            if test_name:
-                metrics_cache[test_name] = test_metrics
-                last_update_time = time.time()
-                print(f"Loaded metrics for {test_name}")
-            else:
-                print(f"Warning: No test_case_id found in {file_path}")
-    except json.JSONDecodeError as e:
-        print(f"Error loading metrics file {file_path}: Invalid JSON - {e}")
-    except Exception as e:
-        print(f"Error loading metrics file {file_path}: {e}")
+    """Load the new metrics of a file; returns the tests that changed."""
+    loaded = {}
+    # JSON Lines logs are tailed from the last offset; snapshots are re-read when replaced
+    for test_name, test_metrics in metrics_watcher.read(file_path).items():
+        if test_name and test_name != 'N/A':
+            loaded[test_name] = test_metrics
+            print(f"Loaded metrics for {test_name}")
+        else:
+            print(f"Warning: No test_case_id found in {file_path}")
+    return loaded
 
 
 def initialize_metrics():
@@ -64,33 +44,27 @@ def initialize_metrics():
         os.makedirs(RESULTS_DIR, exist_ok=True)
         return
     
-    for filename in os.listdir(RESULTS_DIR):
-        if filename.endswith('_metrics.json'):
-            file_path = os.path.join(RESULTS_DIR, filename)
-            load_metrics_file(file_path)
+    for file_path in metrics_files(RESULTS_DIR, METRICS_SUFFIXES):
+        metrics_stream.update(load_metrics_file(file_path))
 
 
 def start_file_watcher():
-    """Start watching the results directory for changes to metrics files."""
+    """Start watching the results directory, and the shards of sharded runs below it, for changes to metrics files."""
     observer = Observer()
-    observer.schedule(MetricsFileHandler(), RESULTS_DIR, recursive=False)
+    observer.schedule(MetricsFileHandler(metrics_watcher, METRICS_SUFFIXES), RESULTS_DIR, recursive=True)
     observer.start()
     print(f"Started watching {RESULTS_DIR} for metrics files")
     return observer
 
 
-def broadcast_metrics():
-    """Send updated metrics to all connected WebSocket clients."""
-    data = {
-        "metrics": metrics_cache,
-        "last_update": last_update_time
-    }
-    for ws in websockets[:]:  # Copy list to avoid modification issues
-        try:
-            ws.send(json.dumps(data))
-        except Exception as e:
-            print(f"Error sending to WebSocket: {e}")
-            websockets.remove(ws)  # Remove disconnected client
+def broadcast_metrics(tests):
+    """Turn changed tests into one delta message and queue it for every WebSocket client."""
+    broadcaster.publish(metrics_stream.update({
+        test_name: test_metrics for test_name, test_metrics in tests.items() if test_name and test_name != 'N/A'
+    }))
+
+
+metrics_watcher = MetricsWatcher(broadcast_metrics, debounce=float(os.environ.get('WATCH_DEBOUNCE_SECONDS', '0.25')))
 
 
 @app.route('/')
@@ -110,31 +84,66 @@ def get_system_info():
     return jsonify(system_info)
 
 
+@app.route('/api/history/suites')
+def get_history_suites():
+    """API endpoint listing the suites with stored runs."""
+    return jsonify(thread_run_store(RUN_STORE).suites())
+
+
+@app.route('/api/history/runs')
+def get_history_runs():
+    """API endpoint listing the latest stored runs of a suite."""
+    return jsonify(thread_run_store(RUN_STORE).recent_runs(request.args.get('suite'), request.args.get('limit', 20, type=int)))
+
+
+@app.route('/api/history/actions')
+def get_history_actions():
+    """API endpoint listing the (test, action) pairs stored for a suite."""
+    return jsonify(thread_run_store(RUN_STORE).actions(request.args.get('suite', '')))
+
+
+@app.route('/api/history/series')
+def get_history_series():
+    """API endpoint returning an action's per-run aggregates over the last N runs."""
+    return jsonify(thread_run_store(RUN_STORE).action_series(
+        request.args.get('suite', ''),
+        request.args.get('action', ''),
+        request.args.get('test'),
+        request.args.get('last', 50, type=int),
+    ))
+
+
 @sock.route('/ws/metrics')
 def ws_metrics(ws):
-    """WebSocket endpoint to push metrics updates."""
-    websockets.append(ws)
+    """WebSocket endpoint to push metrics updates.
+
+    Clients reconnecting with `?since=<seq>` get the deltas they missed instead
+    of a full snapshot, as long as those are still in the stream's history.
+    """
+    since = request.args.get('since', type=int)
     print("WebSocket client connected")
     try:
-        # Send initial data
-        ws.send(json.dumps({"metrics": metrics_cache, "last_update": last_update_time}))
+        # The broadcaster sends the catch-up (or snapshot) first, then every later delta
+        metrics_stream.subscribe(broadcaster, ws, since)
         while True:
-            # Keep connection alive; updates are pushed via broadcast_metrics
+            # Keep connection alive; updates are pushed by the broadcaster
             ws.receive()  # Optional: Handle incoming messages if needed
     except Exception as e:
         print(f"WebSocket client disconnected: {e}")
     finally:
-        if ws in websockets:
-            websockets.remove(ws)
+        broadcaster.remove(ws)
 
 
 if __name__ == '__main__':
     # Initialize the application
     initialize_metrics()
+    metrics_watcher.start()
     observer = start_file_watcher()
     
     try:
         app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
     finally:
         observer.stop()
-        observer.join()
\ No newline at end of file
+        observer.join()
+        metrics_watcher.stop()
+        broadcaster.stop()
\ No newline at end of file
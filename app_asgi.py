@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional, Set
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.templating import Jinja2Templates
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from watchdog.observers import Observer
+from utils.metrics_stream import MetricsStream
+from utils.metrics_watcher import MetricsFileHandler, MetricsWatcher, metrics_files
+from utils.perf_utils.run_store import default_run_store_path, thread_run_store
+
+METRICS_SUFFIXES = ('_metrics.json', '_metrics.jsonl', '_metrics.pcol')
+
+# Configuration
+RESULTS_DIR = os.environ.get('RESULTS_DIR', os.path.join(os.getcwd(), 'results'))
+RUN_STORE = os.environ.get('RUN_STORE', default_run_store_path(RESULTS_DIR))
+SEND_QUEUE_SIZE = int(os.environ.get('SEND_QUEUE_SIZE', '64'))
+SEND_TIMEOUT_SECONDS = float(os.environ.get('SEND_TIMEOUT_SECONDS', '10'))
+HEARTBEAT_SECONDS = float(os.environ.get('HEARTBEAT_SECONDS', '15'))
+
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
+metrics_stream = MetricsStream()
+
+# Queue marker: the client fell behind and gets a fresh snapshot instead of the deltas it missed
+RESYNC = object()
+
+
+class Client:
+    """A dashboard WebSocket with its own bounded send queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, message):
+        """Queue a message without waiting; a full queue is replaced by a resync."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class ClientHub:
+    """Fans delta messages out to every client on the event loop.
+
+    Publishing never awaits a socket: each client has a bounded queue drained
+    by its own task, so a slow viewer only delays itself and, once its queue
+    overflows, skips straight to a snapshot.
+    """
+
+    def __init__(self, queue_size: int = SEND_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.clients: Set[Client] = set()
+
+    def add(self, client: Client, initial_messages: List[str] = ()):
+        """Register a client (called by `MetricsStream.subscribe`, under the stream lock)."""
+        for message in initial_messages:
+            client.offer(message)
+        self.clients.add(client)
+
+    def remove(self, client: Client):
+        self.clients.discard(client)
+
+    def publish(self, message: Optional[str]):
+        if message is None:
+            return
+        for client in list(self.clients):
+            client.offer(message)
+
+
+hub = ClientHub()
+
+
+def load_metrics_file(metrics_watcher: MetricsWatcher, file_path: str):
+    """Load the new metrics of a file into the stream."""
+    tests = {
+        test_name: test_metrics for test_name, test_metrics in metrics_watcher.read(file_path).items()
+        if test_name and test_name != 'N/A'
+    }
+    return metrics_stream.update(tests)
+
+
+def initialize_metrics(metrics_watcher: MetricsWatcher):
+    """Load all existing metrics files from the results directory."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    for file_path in metrics_files(RESULTS_DIR, METRICS_SUFFIXES):
+        load_metrics_file(metrics_watcher, file_path)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+
+    def on_change(tests):
+        # Runs on the watcher thread: diff and serialize there, hand only the string to the loop
+        message = metrics_stream.update({
+            test_name: test_metrics for test_name, test_metrics in tests.items() if test_name and test_name != 'N/A'
+        })
+        if message is not None:
+            loop.call_soon_threadsafe(hub.publish, message)
+
+    metrics_watcher = MetricsWatcher(on_change, debounce=float(os.environ.get('WATCH_DEBOUNCE_SECONDS', '0.25')))
+    initialize_metrics(metrics_watcher)
+    metrics_watcher.start()
+
+    observer = Observer()
+    observer.schedule(MetricsFileHandler(metrics_watcher, METRICS_SUFFIXES), RESULTS_DIR, recursive=True)
+    observer.start()
+    print(f"Started watching {RESULTS_DIR} for metrics files")
+    try:
+        yield
+    finally:
+        observer.stop()
+        observer.join()
+        metrics_watcher.stop()
+
+
+async def index(request):
+    """Main dashboard page."""
+    return templates.TemplateResponse(request, 'dashboard.html')
+
+
+async def get_system_info(request):
+    """API endpoint to get the latest system information."""
+    system_info = {}
+    for test_name, metrics in list(metrics_stream.tests.items()):
+        if 'system_info' in metrics:
+            system_info = metrics['system_info']
+            break
+    return JSONResponse(system_info)
+
+
+def _int_param(request, name: str, default: int) -> int:
+    value = request.query_params.get(name)
+    return int(value) if value and value.isdigit() else default
+
+
+# History endpoints are plain functions: Starlette runs them in its thread pool, off the event loop
+def get_history_suites(request):
+    """API endpoint listing the suites with stored runs."""
+    return JSONResponse(thread_run_store(RUN_STORE).suites())
+
+
+def get_history_runs(request):
+    """API endpoint listing the latest stored runs of a suite."""
+    return JSONResponse(thread_run_store(RUN_STORE).recent_runs(request.query_params.get('suite'), _int_param(request, 'limit', 20)))
+
+
+def get_history_actions(request):
+    """API endpoint listing the (test, action) pairs stored for a suite."""
+    return JSONResponse(thread_run_store(RUN_STORE).actions(request.query_params.get('suite', '')))
+
+
+def get_history_series(request):
+    """API endpoint returning an action's per-run aggregates over the last N runs."""
+    return JSONResponse(thread_run_store(RUN_STORE).action_series(
+        request.query_params.get('suite', ''),
+        request.query_params.get('action', ''),
+        request.query_params.get('test'),
+        _int_param(request, 'last', 50),
+    ))
+
+
+async def send_loop(client: Client):
+    """Drain a client's queue; resyncs become a snapshot built at send time."""
+    websocket = client.websocket
+    while True:
+        try:
+            message = await asyncio.wait_for(client.queue.get(), timeout=HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            # Idle: tell the client the server is alive, it reconnects when heartbeats stop
+            message = json.dumps({"type": "heartbeat", "seq": metrics_stream.seq, "interval": HEARTBEAT_SECONDS})
+        if message is RESYNC:
+            # Serialized off the event loop, once per version: clients resyncing together share it
+            message = await asyncio.get_running_loop().run_in_executor(None, metrics_stream.snapshot)
+        # A client that cannot take a message within the timeout is disconnected
+        await asyncio.wait_for(websocket.send_text(message), timeout=SEND_TIMEOUT_SECONDS)
+
+
+async def ws_metrics(websocket: WebSocket):
+    """WebSocket endpoint to push metrics updates (same protocol as `app.py`)."""
+    await websocket.accept()
+    since = websocket.query_params.get('since')
+    client = Client(websocket, hub.queue_size)
+    metrics_stream.subscribe(hub, client, int(since) if since and since.isdigit() else None)
+    sender = asyncio.create_task(send_loop(client))
+    receiver = asyncio.create_task(websocket.receive_text())
+    try:
+        # Incoming messages are ignored; receiving only detects the disconnect
+        while True:
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                sender.result()
+            if receiver in done:
+                receiver.result()
+                receiver = asyncio.create_task(websocket.receive_text())
+    except WebSocketDisconnect:
+        print("WebSocket client disconnected")
+    except Exception as e:
+        # Send timeout (backpressure) or a broken connection
+        print(f"WebSocket client dropped: {e!r}")
+    finally:
+        hub.remove(client)
+        for task in (sender, receiver):
+            task.cancel()
+        if client.dropped:
+            print(f"WebSocket client skipped {client.dropped} queued messages by resyncing")
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/api/system_info', get_system_info),
+        Route('/api/history/suites', get_history_suites),
+        Route('/api/history/runs', get_history_runs),
+        Route('/api/history/actions', get_history_actions),
+        Route('/api/history/series', get_history_series),
+        WebSocketRoute('/ws/metrics', ws_metrics),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    # The protocol-level pings detect dead TCP connections; heartbeats cover idle periods in the browser
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', '5000')),
+                ws_ping_interval=HEARTBEAT_SECONDS, ws_ping_timeout=HEARTBEAT_SECONDS)
@@ -0,0 +1,240 @@
+"""Measure what the instrumentation layer costs per recorded action, offline and without a browser.
+
+For each size (10, 1k and 100k actions by default) a fresh monitor records
+that many actions through `performance_keyword`, then the stages that
+follow a run are timed on the recorded data: rebuilding the summary, saving
+the metrics, rendering the HTML report and the dashboard broadcast of
+`app.py`. Every stage is run twice, once timed and once under tracemalloc
+for its peak memory, and reported in microseconds per action.
+
+The monitor's own output (metrics, reports, rollup and run history) goes
+to a temporary directory that is removed afterwards, so a benchmark never
+touches `./results` or the history the regression check uses as its
+baseline. The timings are written to `benchmarks/results/`. With
+`--baseline` they are compared with a stored run and the exit status is 1 when a stage got slower
+than `--max-regression` allows, so CI can gate on it:
+
+    python -m benchmarks.instrumentation --save-baseline
+    python -m benchmarks.instrumentation --baseline benchmarks/baseline.json
+
+`--mode lean` benchmarks the lean recording mode; its background recording
+of the queued actions is timed in the summary stage.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from utils.metrics_stream import MetricsStream
+from utils.perf_utils.performance_keywords import performance_keyword
+from utils.perf_utils.performance_monitor import FULL, RECORDING_MODES, PerformanceMonitor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+SIZES = (10, 1000, 100000)
+STAGES = ("record", "summary", "save", "html_report", "broadcast")
+ACTION_NAMES = ("user navigates to application", "user login in", "user is on products page", "Sort Products",
+                "Validate Products Sorting")
+SUITE_NAME = "benchmark_suite"
+TEST_NAME = "Benchmark Test"
+# Differences below this many microseconds per action are noise, whatever the ratio
+MIN_REGRESSION_US = 2.0
+
+
+def _keywords() -> List[Callable]:
+    return [performance_keyword(action_name)(lambda: None) for action_name in ACTION_NAMES]
+
+
+def _fresh_monitor(mode: str, output_dir: str) -> PerformanceMonitor:
+    monitor = PerformanceMonitor()
+    # The monitor is a singleton; start every size from an empty state with a stopped sampler
+    monitor.enable_monitoring(False)
+    monitor._init_monitor()
+    monitor.set_variable("${RESULTS_DIR}", output_dir)
+    monitor.set_variable("${SUITE_NAME}", SUITE_NAME)
+    monitor.set_variable("${PERF_RUN_STORE}", os.path.join(output_dir, "perf_history.sqlite"))
+    # No budgets: the project's perf_budgets.toml would add its checks to every recorded action
+    monitor.set_variable("${PERF_BUDGETS}", os.path.join(output_dir, "perf_budgets.toml"))
+    monitor.enable_monitoring(True)
+    monitor.set_recording_mode(mode)
+    return monitor
+
+
+class Pipeline:
+    """One size's stages, run in order on the same monitor."""
+
+    def __init__(self, size: int, mode: str, output_dir: str):
+        self.size = size
+        self.monitor = _fresh_monitor(mode, output_dir)
+        self.keywords = _keywords()
+        self.monitor.start_test_session(TEST_NAME)
+
+    def record(self):
+        keywords, count = self.keywords, len(self.keywords)
+        for index in range(self.size):
+            keywords[index % count]()
+
+    def summary(self):
+        # Lean mode: whatever the flusher thread has not recorded yet
+        self.monitor._drain_lean_buffers()
+        self.monitor._update_summary(TEST_NAME)
+
+    def save(self):
+        self.monitor.end_test_session(TEST_NAME)
+        self.monitor.save_metrics()
+
+    def html_report(self):
+        self.monitor.generate_html_report(SUITE_NAME)
+
+    def broadcast(self):
+        # What `app.broadcast_metrics` does for a test it has not seen yet, then for one more action
+        stream = MetricsStream()
+        stream.update({TEST_NAME: self.monitor._metrics[TEST_NAME]})
+        self.keywords[0]()
+        metrics = self.monitor._metrics[TEST_NAME]
+        stream.update({TEST_NAME: dict(metrics, actions=metrics["actions"].frozen())})
+
+
+def _run_stages(size: int, mode: str, output_dir: str, trace_memory: bool) -> Dict[str, Dict]:
+    pipeline = Pipeline(size, mode, output_dir)
+    results = {}
+    for stage in STAGES:
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        getattr(pipeline, stage)()
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[stage] = {"peak_mb": peak / 1e6}
+        else:
+            results[stage] = {"total_s": elapsed, "us_per_action": elapsed / size * 1e6}
+    return results
+
+
+def _per_call(func: Callable, samples: int) -> float:
+    started = time.perf_counter()
+    for _ in range(samples):
+        func()
+    return (time.perf_counter() - started) / samples
+
+
+def calibrate(mode: str, output_dir: str) -> Dict[str, float]:
+    """What one empty measured action costs: inside its own window, in total around it, and when disabled."""
+    pipeline = Pipeline(1, mode, output_dir)
+    floor = pipeline.monitor.calibrate_overhead()
+    keyword = pipeline.keywords[0]
+    wall = _per_call(keyword, 500)
+    pipeline.monitor._drain_lean_buffers()
+    recorded = pipeline.monitor._stats[TEST_NAME][ACTION_NAMES[0]].mean
+    pipeline.monitor.enable_monitoring(False)
+    samples = 100000
+    disabled = _per_call(keyword, samples) - _per_call(lambda: None, samples)
+    return {
+        "window_floor_us": floor * 1e6,
+        "wall_per_action_us": wall * 1e6,
+        # Bookkeeping outside the measured window: what a parent action used to absorb per nested action
+        "bookkeeping_us": (wall - recorded) * 1e6,
+        # A decorated keyword with monitoring disabled, beyond the call of the keyword itself
+        "disabled_call_us": disabled * 1e6,
+    }
+
+
+def run(sizes: List[int], mode: str, output_dir: str) -> Dict:
+    """Benchmark every size; the monitor writes its files to `output_dir`."""
+    results: Dict[str, Dict[str, Dict]] = {stage: {} for stage in STAGES}
+    for size in sizes:
+        timed = _run_stages(size, mode, output_dir, trace_memory=False)
+        traced = _run_stages(size, mode, output_dir, trace_memory=True)
+        for stage in STAGES:
+            results[stage][str(size)] = {**timed[stage], **traced[stage]}
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "mode": mode,
+        "calibration": calibrate(mode, output_dir),
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Stage/size pairs whose per-action cost grew by more than `max_regression` over the baseline."""
+    regressions = []
+    for stage, by_size in current["results"].items():
+        for size, row in by_size.items():
+            reference = baseline.get("results", {}).get(stage, {}).get(size)
+            if reference is None:
+                continue
+            before, after = reference["us_per_action"], row["us_per_action"]
+            if after > before * (1 + max_regression) and after - before > MIN_REGRESSION_US:
+                regressions.append(f"{stage} @ {size}: {before:.1f} -> {after:.1f} us/action ({after / before - 1:+.0%})")
+    return regressions
+
+
+def format_results(report: Dict) -> str:
+    lines = [f"{'stage':<14}{'actions':>9}{'us/action':>12}{'total (s)':>11}{'peak (MB)':>11}"]
+    for stage, by_size in report["results"].items():
+        for size, row in by_size.items():
+            lines.append(f"{stage:<14}{size:>9}{row['us_per_action']:>12.1f}{row['total_s']:>11.3f}{row['peak_mb']:>11.1f}")
+    calibration = report["calibration"]
+    lines.append(
+        f"calibration: {calibration['window_floor_us']:.2f} us inside the measured window, "
+        f"{calibration['bookkeeping_us']:.1f} us of bookkeeping around it, "
+        f"{calibration.get('disabled_call_us', 0.0):.2f} us per call when disabled"
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the performance instrumentation layer without a browser.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--mode", choices=RECORDING_MODES, default=FULL, help="Recording mode of the monitor")
+    parser.add_argument("--output", default=None, help="Results file; defaults to a timestamped file in benchmarks/results")
+    parser.add_argument("--baseline", default=None, help="Compare with this results file and fail on regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown per stage, e.g. 0.25 for 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also store the results as {BASELINE_FILE}")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"instrumentation_{datetime.now().strftime('%Y%m%dT%H%M%S')}.json")
+    baseline: Optional[Dict] = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Metrics, reports and the run store go to a throwaway results directory
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = run(args.sizes, args.mode, directory)
+        finally:
+            PerformanceMonitor().enable_monitoring(False)
+
+    print(format_results(report))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    for path in [output] + ([BASELINE_FILE] if args.save_baseline else []):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than the baseline by more than {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
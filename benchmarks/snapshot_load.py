@@ -0,0 +1,131 @@
+"""Compare how fast the dashboard and report generator load each metrics format.
+
+Writes the same synthetic suite as an indented JSON snapshot, a compact
+suite-level JSON file, a JSON Lines log and a binary columnar snapshot, then
+times loading each one and building what the report renders from it (the
+columnar report data and the per-action durations). Run from the repository
+root:
+
+    python -m benchmarks.snapshot_load --tests 10 --actions 20000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+from utils.perf_utils.action_store import ActionStore, durations_by_action
+from utils.perf_utils.binary_snapshot import write_binary_snapshot
+from utils.perf_utils.metrics_log import ACTION, TEST_START, MetricsLogWriter, build_summary, load_metrics_tests
+from utils.perf_utils.suite_rollup import write_suite_metrics
+
+ACTION_NAMES = ("user login in", "open products page", "add product to cart", "checkout", "user logs out")
+
+
+def synthetic_tests(test_count: int, action_count: int, seed: int = 1) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    tests = {}
+    for test_index in range(test_count):
+        test_name = f"Synthetic Test {test_index + 1}"
+        actions = []
+        for index in range(action_count):
+            duration = rng.lognormvariate(-1.5, 0.6)
+            actions.append({
+                "action": ACTION_NAMES[index % len(ACTION_NAMES)],
+                "start_time": (start + timedelta(seconds=index * 0.5)).isoformat(),
+                "duration": duration,
+                "parameters": {"username": "standard_user"} if index % len(ACTION_NAMES) == 0 else {},
+                "step_order": index + 1,
+                "round_trips": rng.randint(1, 4),
+                "cpu_usage": round(rng.uniform(1, 60), 2),
+                "memory_usage": round(rng.uniform(200, 900), 2),
+                "browser_timings": {"browser_window": duration * 0.8, "harness_overhead": duration * 0.2},
+                "network": {"requests": rng.randint(0, 20), "bytes": rng.randint(0, 500000),
+                            "first_start": 0.01, "last_end": duration * 0.7},
+                "result": "FAIL" if rng.random() < 0.01 else "PASS",
+            })
+        tests[test_name] = {
+            "test_case_id": test_name,
+            "start_time": start.isoformat(),
+            "status": "Completed",
+            "failures": sum(action["result"] == "FAIL" for action in actions),
+            "system_info": {"platform": "benchmark"},
+            "execution_context": {"robot_version": "benchmark"},
+            "summary": build_summary(actions),
+            "actions": actions,
+        }
+    return tests
+
+
+def write_formats(tests: Dict[str, Dict], directory: str) -> Dict[str, str]:
+    paths = {
+        "json (indented)": os.path.join(directory, "indented_metrics.json"),
+        "json (suite file)": os.path.join(directory, "suite_metrics.json"),
+        "jsonl (log)": os.path.join(directory, "log_metrics.jsonl"),
+        "pcol (binary)": os.path.join(directory, "binary_metrics.pcol"),
+    }
+    with open(paths["json (indented)"], 'w', encoding='utf-8') as f:
+        json.dump({"suite_name": "benchmark", "tests": tests}, f, indent=4)
+    write_suite_metrics(paths["json (suite file)"], "benchmark", tests.items())
+    writer = MetricsLogWriter(paths["jsonl (log)"], truncate=True)
+    for test_name, metrics in tests.items():
+        writer.append({"type": TEST_START, "test_case_id": test_name, "start_time": metrics["start_time"]})
+        for action in metrics["actions"]:
+            writer.append(dict(action, type=ACTION, test_case_id=test_name))
+    writer.close()
+    write_binary_snapshot(paths["pcol (binary)"], tests, "benchmark")
+    return paths
+
+
+def measure(load: Callable[[], object], repeat: int):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading metrics as JSON, JSON Lines and binary snapshots.")
+    parser.add_argument("--tests", type=int, default=10)
+    parser.add_argument("--actions", type=int, default=20000, help="Actions per test")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tests = synthetic_tests(args.tests, args.actions)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_formats(tests, directory)
+        del tests
+        print(f"{args.tests} tests x {args.actions} actions")
+        print(f"{'format':<20}{'size':>12}{'load':>12}{'load+render':>14}{'peak memory':>14}")
+        for label, path in paths.items():
+            def load():
+                return load_metrics_tests(path)
+
+            def load_and_render():
+                tests = load_metrics_tests(path)
+                for metrics in tests.values():
+                    actions = ActionStore.of(metrics["actions"])
+                    actions.to_columnar()
+                    durations_by_action(actions)
+                return tests
+
+            load_time, _ = measure(load, args.repeat)
+            render_time, peak = measure(load_and_render, args.repeat)
+            print(f"{label:<20}{os.path.getsize(path) / 1e6:>10.1f}MB{load_time * 1000:>10.1f}ms"
+                  f"{render_time * 1000:>12.1f}ms{peak / 1e6:>12.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
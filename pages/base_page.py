@@ -1,20 +1,39 @@
 from utils.browser_manager import BrowserManager
+from utils.perf_utils.performance_monitor import PerformanceMonitor
 from Browser import SelectAttribute
 
+# Runs in the page: one call returns the text (and optional attributes) of every match
+ELEMENTS_DATA_SCRIPT = """(elements, attributes) => elements.map(element => {
+    const data = {text: element.innerText};
+    for (const attribute of attributes) {
+        data[attribute] = element.getAttribute(attribute);
+    }
+    return data;
+})"""
+
 class BasePage:
     def __init__(self, browser_manager: BrowserManager):
         self.browser = browser_manager.get_browser()
+        self.monitor = PerformanceMonitor()
+
+    def _round_trip(self, count: int = 1):
+        # Every Browser library call is a gRPC round trip to the Playwright server
+        self.monitor.count_round_trips(count)
 
     def open_url(self, url: str):
+        self._round_trip()
         self.browser.new_page(url)
 
     def click_element(self, locator: str):
+        self._round_trip()
         self.browser.click(locator)  
 
     def enter_text(self, locator: str, text: str):
+        self._round_trip()
         self.browser.type_text(locator, text)  
 
     def is_element_present(self, locator: str) -> bool:
+        self._round_trip()
         try:
             self.browser.get_element(locator)
             return True
@@ -24,6 +43,7 @@ class BasePage:
     def select_item_from_dropdown(self, dropdown_locator: str, attribute: str, option_text: str):
         if attribute not in ["value", "label", "text", "index"]:
             raise ValueError("Invalid attribute for dropdown selection. Use SelectAttribute.value, SelectAttribute.label, SelectAttribute.text or SelectAttribute.index")
+        self._round_trip()
         if attribute == "value":
             self.browser.select_options_by(dropdown_locator, SelectAttribute.value, option_text)
         elif attribute == "label":
@@ -37,4 +57,13 @@ class BasePage:
         # Use the Browser library to get elements matching the selector
         elements = self.browser.get_elements(locator)
         # Extract the text from each element and return as a list
+        self._round_trip(1 + len(elements))
         return [self.browser.get_text(element) for element in elements]
+
+    def get_elements_data(self, locator: str, attributes: list = None) -> list:
+        # Pull the text and the requested attributes of all matching elements in a single round trip
+        self._round_trip()
+        return self.browser.evaluate_javascript(locator, ELEMENTS_DATA_SCRIPT, arg=list(attributes or []), all_elements=True) or []
+
+    def get_elements_text_batched(self, locator: str) -> list:
+        return [data["text"] for data in self.get_elements_data(locator)]
@@ -8,6 +8,8 @@ class LoginPage(BasePage):
         self.password_field = "#password"
         self.login_button = "#login-button"
         self.page_title = ".title"
+        # Page the application lands on after a successful login
+        self.landing_path = "inventory.html"
 
     def login(self, username: str, password: str):
         self.enter_text(self.username_field, username)
@@ -18,14 +18,14 @@ class ProductsPage(BasePage):
     
     def validate_product_sort(self, option_text: str) -> bool:
         if option_text == "Name (A to Z)":
-            items_list = self.get_elements_text(self.inventoryItemsList)
+            items_list = self.get_elements_text_batched(self.inventoryItemsList)
             return is_list_of_strings_sorted(items_list, "ASC")
         elif option_text == "Name (Z to A)":
-            items_list = self.get_elements_text(self.inventoryItemsList)
+            items_list = self.get_elements_text_batched(self.inventoryItemsList)
             return is_list_of_strings_sorted(items_list, "DESC")
         elif option_text == "Price (low to high)":
-            items_price_list = self.get_elements_text(self.itemPricesList)
+            items_price_list = self.get_elements_text_batched(self.itemPricesList)
             return is_list_of_numbers_sorted(items_price_list, "ASC")
         elif option_text == "Price (high to low)":
-            items_price_list = self.get_elements_text(self.itemPricesList)
+            items_price_list = self.get_elements_text_batched(self.itemPricesList)
             return is_list_of_numbers_sorted(items_price_list, "DESC")
\ No newline at end of file
@@ -41,8 +41,8 @@ def create_placeholder():
                 "duration": 1.5,
                 "parameters": {},
                 "step_order": 1,
-                "cpu_usage": "23%",
-                "memory_usage": "345.67 MB"
+                "cpu_usage": 23.0,
+                "memory_usage": 345.67
             },
             {
                 "action": "Navigate",
@@ -50,8 +50,8 @@ def create_placeholder():
                 "duration": 0.8,
                 "parameters": {},
                 "step_order": 2,
-                "cpu_usage": "25%",
-                "memory_usage": "348.92 MB"
+                "cpu_usage": 25.0,
+                "memory_usage": 348.92
             }
         ],
         "system_info": {
@@ -0,0 +1,92 @@
+import random
+import statistics
+import pytest
+from utils.perf_utils.action_stats import ActionStats, LogHistogram
+
+
+def durations(count, seed=1):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(-1, 0.8) for _ in range(count)]
+
+
+def stats_of(values):
+    stats = ActionStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+
+def test_welford_matches_direct_computation():
+    values = durations(500)
+    stats = stats_of(values)
+    assert stats.count == 500
+    assert stats.total == pytest.approx(sum(values))
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance == pytest.approx(statistics.variance(values))
+    assert stats.min == min(values)
+    assert stats.max == max(values)
+
+
+def test_chan_merge_equals_single_accumulator():
+    values = durations(900)
+    whole = stats_of(values)
+    merged = ActionStats()
+    for part in (values[:1], values[1:400], [], values[400:]):
+        merged.merge(stats_of(part))
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.variance == pytest.approx(whole.variance)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    assert merged.histogram.buckets == whole.histogram.buckets
+    assert merged.to_summary() == pytest.approx(whole.to_summary())
+
+
+def test_summary_and_state_round_trip():
+    stats = stats_of(durations(200))
+    rebuilt = ActionStats.from_summary(stats.to_summary(), stats.to_state())
+    assert rebuilt.to_summary() == stats.to_summary()
+    assert rebuilt.to_state() == stats.to_state()
+
+
+def test_summary_without_state_keeps_totals():
+    stats = stats_of([0.5, 1.0, 1.5])
+    rebuilt = ActionStats.from_summary(stats.to_summary())
+    assert rebuilt.count == 3
+    assert rebuilt.total == pytest.approx(3.0)
+    assert rebuilt.variance == pytest.approx(stats.variance)
+
+
+def test_empty_summary():
+    summary = ActionStats().to_summary()
+    assert summary["count"] == 0
+    assert summary["min_duration"] == 0
+    assert summary["p95_duration"] == 0.0
+
+
+def test_histogram_percentiles_within_relative_accuracy():
+    values = sorted(durations(2000, seed=7))
+    histogram = LogHistogram(0.01)
+    for value in values:
+        histogram.add(value)
+    for percent in (50, 90, 95, 99):
+        exact = values[int(percent / 100 * (len(values) - 1))]
+        assert histogram.percentile(percent) == pytest.approx(exact, rel=0.0101)
+
+
+def test_histogram_merge_and_serialization():
+    first, second = LogHistogram(), LogHistogram()
+    for value in durations(300, seed=2) + [0.0]:
+        first.add(value)
+    for value in durations(300, seed=3):
+        second.add(value)
+    combined = LogHistogram.from_dict(first.to_dict())
+    combined.merge(LogHistogram.from_dict(second.to_dict()))
+    assert combined.count == 601
+    assert combined.zero_count == 1
+    assert combined.percentile(0) == 0.0
+    assert sum(combined.buckets.values()) == 600
+
+
+def test_histogram_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        LogHistogram(0.01).merge(LogHistogram(0.02))
@@ -0,0 +1,110 @@
+import json
+import pytest
+from utils.perf_utils.action_store import ActionStore, FrozenActions, as_number, durations_by_action
+from utils.perf_utils.binary_snapshot import read_binary_header, read_binary_snapshot, write_binary_snapshot
+
+
+def action(step_order, name="Sort Products", duration=0.25, **fields):
+    record = {
+        "action": name,
+        "start_time": f"2025-02-27T10:00:{step_order:02d}",
+        "duration": duration,
+        "parameters": {},
+        "step_order": step_order,
+        "cpu_usage": None,
+        "memory_usage": None,
+        "result": "PASS",
+    }
+    record.update(fields)
+    return record
+
+
+ACTIONS = [
+    action(1, "user login in", 1.5, cpu_usage=23.0, memory_usage=345.5, round_trips=4, thread_id=7),
+    action(2, parameters={"option": "Name (Z to A)"}, browser_timings={
+        "browser_window": 0.2, "harness_overhead": 0.01, "navigation": {"load": 120.0}, "long_tasks": 2,
+    }),
+    action(3, parameters={"option": "Name (Z to A)"}, parent_step=2, result="FAIL", network={
+        "requests": 3, "bytes": 2048, "first_start": 1.0, "last_end": 2.5,
+    }),
+    action(4, "Validate Products Sorting", 0.05, browser_timings={"navigation": {"load": 80.0}},
+           budget_violations=[{"limit": "max_duration", "budget": 0.01, "value": 0.05}], worker="1"),
+]
+
+
+def test_record_round_trip():
+    store = ActionStore.of(ACTIONS)
+    assert len(store) == 4
+    assert store.to_json() == ACTIONS
+    assert store.names.values == ["user login in", "Sort Products", "Validate Products Sorting"]
+    assert len(store.parameters.values) == 1
+
+
+def test_lazy_records():
+    store = ActionStore.of(ACTIONS)
+    assert store[-1]["action"] == "Validate Products Sorting"
+    assert store[2]["result"] == "FAIL"
+    assert store[1]["browser_timings"]["long_tasks"] == 2
+    assert store[0].get("network") is None
+    assert "budget_violations" in store[3]
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_log_only_fields_are_dropped():
+    store = ActionStore.of([action(1, resources={"chrome": 10.0}, processes=[{"pid": 1}])])
+    assert "resources" not in store.record(0)
+    assert "processes" not in store.record(0)
+
+
+def test_display_strings_are_read_as_numbers():
+    store = ActionStore.of([action(1, cpu_usage="12.5%", memory_usage="300.25 MB")])
+    assert store.record(0)["cpu_usage"] == 12.5
+    assert store.record(0)["memory_usage"] == 300.25
+    assert as_number("n/a", "%") is None
+
+
+def test_frozen_view_ignores_later_appends():
+    store = ActionStore.of(ACTIONS[:2])
+    frozen = store.frozen()
+    store.append(ACTIONS[2])
+    assert isinstance(frozen, FrozenActions)
+    assert len(frozen) == 2
+    assert frozen.to_json() == ACTIONS[:2]
+
+
+def test_durations_by_action_matches_plain_records():
+    expected = {name: list(values) for name, values in durations_by_action(ACTIONS).items()}
+    assert {name: list(values) for name, values in ActionStore.of(ACTIONS).durations_by_action().items()} == expected
+    assert expected["Sort Products"] == [0.25, 0.25]
+
+
+def test_binary_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "suite_metrics.pcol")
+    tests = {
+        "Login": {"test_case_id": "Login", "status": "Completed", "summary": {"user login in": {"count": 1}},
+                  "actions": ACTIONS},
+        "Empty": {"test_case_id": "Empty", "status": "Running", "actions": []},
+    }
+    write_binary_snapshot(path, tests, suite_name="Suite")
+
+    header = read_binary_header(path)
+    assert header["suite_name"] == "Suite"
+    assert [test["length"] for test in header["tests"]] == [4, 0]
+
+    loaded = read_binary_snapshot(path)
+    assert list(loaded) == ["Login", "Empty"]
+    assert loaded["Login"]["status"] == "Completed"
+    assert loaded["Login"]["summary"] == tests["Login"]["summary"]
+    assert loaded["Login"]["actions"].to_json() == ACTIONS
+    assert len(loaded["Empty"]["actions"]) == 0
+    # The loaded store owns its columns, so it can keep recording
+    loaded["Login"]["actions"].append(action(5))
+    assert json.loads(json.dumps(loaded["Login"]["actions"].to_json()))[-1] == action(5)
+
+
+def test_binary_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "metrics.pcol"
+    path.write_bytes(b"NOTPERF\0" + bytes(8))
+    with pytest.raises(ValueError):
+        read_binary_snapshot(str(path))
@@ -0,0 +1,52 @@
+import pytest
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.budgets import ActionBudget, Budgets
+
+BUDGETS = """
+[defaults]
+max_duration = 10
+
+[actions."user login in"]
+p95_duration = 2.0
+max_memory_mb = 1500
+fail = "test"
+"""
+
+
+def stats_of(values):
+    stats = ActionStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+
+def test_load(tmp_path):
+    path = tmp_path / "perf_budgets.toml"
+    path.write_text(BUDGETS, encoding='utf-8')
+    budgets = Budgets.load(str(path))
+    login = budgets.for_action("user login in")
+    assert (login.p95_duration, login.max_duration, login.max_memory_mb, login.fail) == (2.0, 10, 1500, "test")
+    other = budgets.for_action("Sort Products")
+    assert (other.max_duration, other.p95_duration, other.fail) == (10, None, "none")
+    assert list(budgets.to_dict()) == ["user login in"]
+
+
+def test_missing_file_has_no_budgets(tmp_path):
+    budgets = Budgets.load(str(tmp_path / "missing.toml"))
+    assert not budgets
+    assert budgets.for_action("user login in") is None
+
+
+def test_invalid_fail_mode():
+    with pytest.raises(ValueError):
+        ActionBudget(fail="suite")
+
+
+def test_check():
+    budget = ActionBudget(p95_duration=1.0, max_duration=3.0, max_memory_mb=100, min_samples=5)
+    assert budget.check(0.5, stats_of([0.5] * 10), 50) == []
+    violations = budget.check(4.0, stats_of([2.0] * 10), 150)
+    assert [violation["limit"] for violation in violations] == ["max_duration", "p95_duration", "max_memory_mb"]
+    assert violations[1]["value"] == pytest.approx(2.0)
+    # Too few samples for the running p95
+    assert budget.check(2.0, stats_of([2.0] * 4), 50) == []
@@ -0,0 +1,77 @@
+import math
+import random
+import numpy as np
+import pytest
+from utils.perf_utils.regression import (INSUFFICIENT_DATA, OK, REGRESSION, _benjamini_hochberg,
+                                         compare_distributions)
+
+
+def mann_whitney(current, baseline):
+    """Textbook one-sided Mann-Whitney U (normal approximation, tie and continuity correction)."""
+    u = sum(1.0 if x > y else 0.5 if x == y else 0.0 for x in current for y in baseline)
+    n1, n2 = len(current), len(baseline)
+    n = n1 + n2
+    combined = current + baseline
+    ties = sum(count ** 3 - count for count in (combined.count(value) for value in set(combined)))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def samples(count, scale, seed):
+    rng = random.Random(seed)
+    return [round(rng.lognormvariate(0, 0.3) * scale, 2) for _ in range(count)]
+
+
+def test_u_and_p_values_match_textbook_computation():
+    current = {"login": samples(20, 1.2, 1), "sort": samples(15, 1.0, 2), "ties": [1.0, 1.0, 2.0, 2.0, 3.0]}
+    baseline = {"login": samples(30, 1.0, 3), "sort": samples(25, 1.0, 4), "ties": [1.0, 2.0, 2.0, 2.0, 1.0, 0.5]}
+    results = {result["key"]: result for result in compare_distributions(current, baseline)}
+    for key in current:
+        u, p_value = mann_whitney(current[key], baseline[key])
+        assert results[key]["u"] == pytest.approx(u)
+        assert results[key]["p_value"] == pytest.approx(p_value)
+        assert results[key]["median_current"] == pytest.approx(float(np.median(current[key])))
+        assert results[key]["median_baseline"] == pytest.approx(float(np.median(baseline[key])))
+        assert results[key]["effect_size"] == pytest.approx(2 * u / (len(current[key]) * len(baseline[key])) - 1)
+
+
+def test_clear_slowdown_is_a_regression():
+    baseline = {"login": samples(40, 1.0, 5)}
+    results = compare_distributions({"login": [value * 2 for value in samples(20, 1.0, 6)]}, baseline)
+    assert results[0]["status"] == REGRESSION
+    assert results[0]["slowdown"] > 0.5
+    assert results[0]["effect_size"] > 0.8
+
+
+def test_same_distribution_is_ok():
+    results = compare_distributions({"login": samples(30, 1.0, 7)}, {"login": samples(30, 1.0, 8)})
+    assert results[0]["status"] == OK
+
+
+def test_faster_run_is_ok():
+    results = compare_distributions({"login": samples(30, 0.5, 9)}, {"login": samples(30, 1.0, 10)})
+    assert results[0]["status"] == OK
+    assert results[0]["p_value"] > 0.5
+
+
+def test_small_slowdown_is_not_a_regression():
+    baseline = [1.0 + index / 1000 for index in range(50)]
+    current = [value * 1.05 for value in baseline]
+    results = compare_distributions({"login": current}, {"login": baseline})
+    assert results[0]["q_value"] < 0.05
+    assert results[0]["status"] == OK
+
+
+def test_insufficient_data():
+    results = compare_distributions({"login": [1.0, 2.0], "sort": [1.0] * 5, "new": [1.0] * 5},
+                                    {"login": [1.0] * 10, "sort": [1.0] * 4})
+    assert [result["status"] for result in results] == [INSUFFICIENT_DATA] * 3
+    assert results[2]["n_baseline"] == 0
+
+
+def test_benjamini_hochberg():
+    q_values = _benjamini_hochberg(np.array([0.01, 0.04, 0.03, 0.5]))
+    assert q_values == pytest.approx([0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5])
+    assert _benjamini_hochberg(np.array([0.9, 0.8])) == pytest.approx([0.9, 0.9])
+    assert _benjamini_hochberg(np.array([0.6, 0.6, 0.6])).max() <= 1.0
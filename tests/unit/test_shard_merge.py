@@ -0,0 +1,97 @@
+import json
+import os
+import pytest
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.metrics_log import (ACTION, SUMMARY_STATE, TEST_END, TEST_START, TIMING, MetricsLogWriter,
+                                          load_metrics_tests, log_path_for, rollup_metrics_log, summary_stats)
+from utils.perf_utils.shard_merge import find_shard_logs, latest_shard_run, merge_shards, shard_metrics_file
+
+SUITE = "Tests"
+
+
+def write_log(path, test_name, durations, status="Completed"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = MetricsLogWriter(path, truncate=True)
+    writer.append({"type": TEST_START, "test_case_id": test_name, "start_time": "2025-02-27T10:00:00"})
+    for step_order, duration in enumerate(durations, 1):
+        writer.append({"type": ACTION, "test_case_id": test_name, "action": "Sort Products", "duration": duration,
+                       "start_time": f"2025-02-27T10:00:{step_order:02d}", "step_order": step_order})
+    writer.append({"type": TEST_END, "test_case_id": test_name, "status": status})
+    writer.close()
+
+
+def write_shard(results_dir, run_id, worker_id, test_name, durations, mtime=None):
+    path = log_path_for(shard_metrics_file(results_dir, SUITE, run_id, worker_id, 100 + int(worker_id), test_name))
+    write_log(path, test_name, durations)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def stats_of(values):
+    stats = ActionStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+
+def test_rollup_metrics_log(tmp_path):
+    path = str(tmp_path / "test_metrics.jsonl")
+    write_log(path, "Login", [0.5, 1.5])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"type": TIMING, "test_case_id": "Login", "name": "login_cache.restore", "duration": 0.1}))
+        f.write('\n{"type": "action", "test_case_id": "Lo')
+
+    tests = rollup_metrics_log(path)
+    metrics = tests["Login"]
+    assert metrics["status"] == "Completed"
+    assert [action["duration"] for action in metrics["actions"]] == [0.5, 1.5]
+    assert metrics["summary"]["Sort Products"]["count"] == 2
+    assert metrics["summary"]["Sort Products"]["avg_duration"] == pytest.approx(1.0)
+    assert metrics["timings"]["login_cache.restore"]["count"] == 1
+    assert summary_stats(metrics)["Sort Products"].to_state() == stats_of([0.5, 1.5]).to_state()
+    assert load_metrics_tests(path)["Login"]["summary"] == metrics["summary"]
+
+
+def test_shards_of_one_run_are_merged(tmp_path):
+    results_dir = str(tmp_path)
+    write_shard(results_dir, "old-run", "0", "Login", [9.0, 9.0], mtime=1_000_000)
+    first = [0.1, 0.4, 0.2]
+    second = [0.3, 0.6]
+    write_shard(results_dir, "run_2", "0", "Login", first, mtime=2_000_000)
+    write_shard(results_dir, "run_2", "1", "Login", second, mtime=2_000_001)
+    write_shard(results_dir, "run_2", "1", "Sort", [0.7], mtime=2_000_001)
+
+    assert len(find_shard_logs(results_dir)) == 4
+    assert len(find_shard_logs(results_dir, SUITE, "run_2")) == 3
+    assert latest_shard_run(results_dir, SUITE) == "run-2"
+
+    output_file = merge_shards(results_dir, SUITE)
+    with open(output_file, encoding='utf-8') as f:
+        merged = json.load(f)
+    assert merged["run_id"] == "run-2"
+    assert len(merged["shards"]) == 3
+
+    login = merged["tests"]["Login"]
+    assert sorted(login["workers"]) == ["w0", "w1"]
+    assert sorted(action["duration"] for action in login["actions"]) == sorted(first + second)
+    expected = stats_of(first + second)
+    assert login["summary"]["Sort Products"] == pytest.approx(expected.to_summary())
+    assert login[SUMMARY_STATE]["Sort Products"]["histogram"] == expected.histogram.to_dict()
+    assert merged["summary"]["Sort Products"] == pytest.approx(stats_of(first + second + [0.7]).to_summary())
+
+
+def test_merge_an_earlier_run(tmp_path):
+    results_dir = str(tmp_path)
+    write_shard(results_dir, "old-run", "0", "Login", [9.0, 8.0], mtime=1_000_000)
+    write_shard(results_dir, "new-run", "0", "Login", [0.1], mtime=2_000_000)
+
+    output_file = merge_shards(results_dir, SUITE, str(tmp_path / "old.json"), run_id="old-run")
+    tests = load_metrics_tests(output_file)
+    assert tests["Login"]["summary"]["Sort Products"]["count"] == 2
+    assert tests["Login"]["summary"]["Sort Products"]["max_duration"] == 9.0
+
+
+def test_no_shards(tmp_path):
+    assert merge_shards(str(tmp_path), SUITE) is None
+    assert latest_shard_run(str(tmp_path)) is None
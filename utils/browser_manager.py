@@ -1,5 +1,10 @@
 from Browser import Browser, SupportedBrowsers, ViewportDimensions
 from dotenv import load_dotenv
+from pathlib import Path
+from typing import Optional
+from utils.perf_utils.performance_monitor import PerformanceMonitor
+from utils.browser_pool import BrowserPool, pool_launcher
+from utils.perf_utils.browser_metrics import BrowserMetricsCollector
 import os
 
 # Global flag to track if environment variables have been loaded
@@ -19,12 +24,11 @@ class BrowserManager:
         if not cls._instance:
             cls._instance = super(BrowserManager, cls).__new__(cls, *args, **kwargs)
             cls._instance.browser = Browser()
+            cls._instance.pool = None
+            cls._instance.lease = None
         return cls._instance
 
-    def open_browser(self, url: str = os.getenv("base_url", "https://www.saucedemo.com/"), is_headless_mode: bool = False):
-        # Load environment variables only if not loaded already
-        load_env_variables()
-
+    def _browser_settings(self, is_headless_mode: bool = False):
         # Retrieve browser type from environment variable and map it to SupportedBrowsers
         browser_type = os.getenv("browser_type", "chromium").lower()
         
@@ -37,21 +41,81 @@ class BrowserManager:
 
         # Set headless mode
         headless_mode = os.getenv("headless_mode", "False").lower() == "true" or is_headless_mode
+        return browser_enum, headless_mode, os.getenv("browser_timeout", "30s")
+
+    def _get_pool(self, is_headless_mode: bool = False) -> BrowserPool:
+        # Browsers are launched lazily by the pool, once per worker process
+        if self.pool is None:
+            browser_enum, headless_mode, timeout = self._browser_settings(is_headless_mode)
+            self.pool = BrowserPool(
+                self.browser,
+                pool_launcher(self.browser, browser_enum, headless_mode, timeout),
+                size=int(os.getenv("browser_pool_size", "1")),
+                max_uses=int(os.getenv("browser_pool_max_uses", "20")),
+                memory_limit_mb=float(os.getenv("browser_pool_memory_limit_mb", "0")),
+            )
+        return self.pool
+
+    def open_browser(self, url: str = os.getenv("base_url", "https://www.saucedemo.com/"), is_headless_mode: bool = False,
+                     storage_state: Optional[str] = None):
+        # Load environment variables only if not loaded already
+        load_env_variables()
+
+        # A saved storage state (cookies, local storage) seeds the new context, e.g. a cached login
+        context_args = {"storageState": Path(storage_state)} if storage_state else {}
+
+        if os.getenv("browser_metrics", "False").lower() == "true":
+            # Web Performance API timings of the current page are attached to every measured action
+            # Optionally stream every request to a per-test HAR-like log, attributed to the active action
+            record_network = os.getenv("network_capture", "False").lower() == "true"
+            # Keep the registered collector across tests so a running test's network log is not lost
+            collector = PerformanceMonitor().get_action_collector("browser_metrics")
+            if collector is None or collector.browser is not self.browser or collector.record_network != record_network:
+                PerformanceMonitor().register_action_collector(
+                    "browser_metrics", BrowserMetricsCollector(self.browser, record_network=record_network))
+
+        if os.getenv("browser_pool", "False").lower() == "true":
+            # Hand the previous test's context back before taking a fresh one
+            if self.lease is not None:
+                self.pool.release(self.lease)
+            self.lease = self._get_pool(is_headless_mode).acquire(url, **context_args)
+            return
+
+        browser_enum, headless_mode, timeout = self._browser_settings(is_headless_mode)
 
         # Open a new browser window with the specified headless mode
         self.browser.new_browser(browser=browser_enum, headless = headless_mode)
 
         # Set browser timeout
-        self.browser.set_browser_timeout(timeout = os.getenv("browser_timeout", "30s"))
+        self.browser.set_browser_timeout(timeout = timeout)
 
         # width, height = get_screen_resolution()
         # self.browser.new_context(viewport=ViewportDimensions(width=width, height=height))
 
-        self.browser.new_context()
+        self.browser.new_context(**context_args)
         self.browser.new_page(url)
 
+        # The Node server and browser processes now exist; let the monitor pick them up
+        PerformanceMonitor().refresh_process_tree()
+
     def close_browser(self):
+        if self.lease is not None:
+            self.pool.release(self.lease)
+            self.lease = None
+            return
         self.browser.close_browser()
+        PerformanceMonitor().refresh_process_tree()
+
+    def close_pool(self):
+        if self.lease is not None:
+            self.pool.release(self.lease)
+            self.lease = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def save_storage_state(self, path: str) -> str:
+        return self.browser.save_storage_state(Path(path))
 
     def get_browser(self):
         return self.browser
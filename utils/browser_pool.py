@@ -0,0 +1,122 @@
+import time
+from typing import Callable, Dict, List, Optional
+from Browser import Browser, SupportedBrowsers
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.performance_monitor import PerformanceMonitor
+
+
+class PooledBrowser:
+    """A browser launched once and reused for many isolated contexts."""
+
+    __slots__ = ("browser_id", "uses", "active_contexts")
+
+    def __init__(self, browser_id: str):
+        self.browser_id = browser_id
+        self.uses = 0
+        self.active_contexts = 0
+
+
+class ContextLease:
+    """A fresh context handed out by the pool; release it to get the browser back."""
+
+    __slots__ = ("pooled_browser", "context_id")
+
+    def __init__(self, pooled_browser: PooledBrowser, context_id: str):
+        self.pooled_browser = pooled_browser
+        self.context_id = context_id
+
+
+class BrowserPool:
+    """Keeps browsers running per worker and hands out isolated contexts.
+
+    Launching a browser takes seconds while creating a context takes
+    milliseconds, so short tests only pay for the context. A browser is
+    recycled (closed and relaunched) after `max_uses` contexts or when the
+    browser processes grow beyond `memory_limit_mb`.
+    """
+
+    def __init__(self, browser: Browser, launch: Callable[[], str], size: int = 1, max_uses: int = 20,
+                 memory_limit_mb: float = 0):
+        self.browser = browser
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.memory_limit_mb = memory_limit_mb
+        self._launch_browser = launch
+        self._browsers: List[PooledBrowser] = []
+        self._stats: Dict[str, ActionStats] = {name: ActionStats() for name in ("launch", "acquire", "release")}
+        self.recycled = 0
+
+    def _timed(self, name: str, started: float):
+        duration = time.perf_counter() - started
+        self._stats[name].add(duration)
+        PerformanceMonitor().record_timing(f"browser_pool.{name}", duration)
+
+    def _launch(self) -> PooledBrowser:
+        started = time.perf_counter()
+        pooled_browser = PooledBrowser(self._launch_browser())
+        self._timed("launch", started)
+        self._browsers.append(pooled_browser)
+        PerformanceMonitor().refresh_process_tree()
+        return pooled_browser
+
+    def acquire(self, url: Optional[str] = None, **context_args) -> ContextLease:
+        """Open a fresh context (and page) on the least busy pooled browser."""
+        started = time.perf_counter()
+        if len(self._browsers) < self.size:
+            pooled_browser = self._launch()
+        else:
+            pooled_browser = min(self._browsers, key=lambda candidate: candidate.active_contexts)
+            self.browser.switch_browser(pooled_browser.browser_id)
+        context_id = self.browser.new_context(**context_args)
+        self.browser.new_page(url)
+        pooled_browser.uses += 1
+        pooled_browser.active_contexts += 1
+        self._timed("acquire", started)
+        return ContextLease(pooled_browser, context_id)
+
+    def release(self, lease: ContextLease):
+        """Close the leased context and recycle its browser when it is worn out."""
+        started = time.perf_counter()
+        pooled_browser = lease.pooled_browser
+        self.browser.close_context(lease.context_id, pooled_browser.browser_id)
+        pooled_browser.active_contexts -= 1
+        if pooled_browser.active_contexts == 0 and self._needs_recycle(pooled_browser):
+            self.browser.close_browser(pooled_browser.browser_id)
+            self._browsers.remove(pooled_browser)
+            self.recycled += 1
+            PerformanceMonitor().refresh_process_tree()
+        self._timed("release", started)
+
+    def _needs_recycle(self, pooled_browser: PooledBrowser) -> bool:
+        if self.max_uses and pooled_browser.uses >= self.max_uses:
+            return True
+        if self.memory_limit_mb:
+            # The sampler only knows the browser processes as a whole, so the limit is per pool
+            browser_rss = PerformanceMonitor().latest_resource_sample().get("browser_rss_mb", 0.0)
+            return browser_rss > self.memory_limit_mb
+        return False
+
+    def close(self):
+        """Close every pooled browser."""
+        for pooled_browser in self._browsers:
+            self.browser.close_browser(pooled_browser.browser_id)
+        self._browsers.clear()
+
+    def stats(self) -> Dict:
+        """Acquire/release/launch latency summaries and the launch time saved by reuse."""
+        summary = {name: stats.to_summary() for name, stats in self._stats.items()}
+        launch, acquire = self._stats["launch"], self._stats["acquire"]
+        summary["reused_contexts"] = acquire.count - launch.count
+        summary["recycled_browsers"] = self.recycled
+        summary["estimated_launch_time_saved"] = max(acquire.count - launch.count, 0) * launch.mean
+        return summary
+
+
+def pool_launcher(browser: Browser, browser_enum: SupportedBrowsers, headless: bool, timeout: str) -> Callable[[], str]:
+    """Build the launch callable used by the pool from the `.env` browser settings."""
+    def launch() -> str:
+        # reuse_existing=False, otherwise the Browser library hands back the same browser every time
+        browser_id = browser.new_browser(browser=browser_enum, headless=headless, reuse_existing=False)
+        browser.set_browser_timeout(timeout=timeout)
+        return browser_id
+    return launch
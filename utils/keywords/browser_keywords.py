@@ -0,0 +1,18 @@
+from robot.api import logger
+from robot.api.deco import keyword
+from utils.browser_manager import BrowserManager
+
+browser_manager = BrowserManager()
+
+@keyword("Log Browser Pool Statistics")
+def log_browser_pool_statistics() -> dict:
+    if browser_manager.pool is None:
+        logger.info("Browser pool is not in use.")
+        return {}
+    stats = browser_manager.pool.stats()
+    logger.info(f"Browser pool statistics: {stats}")
+    return stats
+
+@keyword("Close Browser Pool")
+def close_browser_pool():
+    browser_manager.close_pool()
@@ -0,0 +1,49 @@
+import os
+from robot.api.deco import keyword
+from robot.libraries.BuiltIn import BuiltIn
+from utils.load_runner import LoadProfile, LoadRunner, format_curve, shop_flow, write_load_report
+from utils.playwright_session import PlaywrightSession
+from utils.standin_server import start_standin_server
+
+# Stand-in servers started by `Start Stand-in Server`, stopped by `Stop Stand-in Server`
+standin_servers = []
+
+@keyword("Run Load Test")
+def run_load_test(users: int = 5, ramp_up: float = 10.0, steady_state: float = 60.0, think_time_min: float = 1.0,
+                  think_time_max: float = 3.0, iterations: int = 0, username: str = "standard_user",
+                  password: str = "secret_sauce", base_url: str = None, name: str = None, headless: bool = None):
+    """Run the login and product sorting flows as concurrent virtual users, each in its own browser context.
+
+    Every user is recorded as its own test of the performance monitor; the latency-versus-concurrency
+    curve and throughput are written to `<name>_load.json` in the results directory."""
+    base_url = base_url or os.getenv("base_url", "https://www.saucedemo.com/")
+    name = name or BuiltIn().get_variable_value("${TEST_NAME}", "Load Test")
+    if headless is None:
+        headless = os.getenv("headless_mode", "False").lower() == "true"
+    profile = LoadProfile(int(users), float(ramp_up), float(steady_state),
+                          (float(think_time_min), float(think_time_max)), int(iterations))
+    runner = LoadRunner(shop_flow(), profile, lambda: PlaywrightSession(os.getenv("browser_type", "chromium"), headless),
+                        base_url, username, password, name)
+    report = runner.run()
+
+    BuiltIn().log(format_curve(report))
+    results_dir = BuiltIn().get_variable_value("${RESULTS_DIR}") or os.path.join(os.getcwd(), "results")
+    report_file = write_load_report(results_dir, report)
+    BuiltIn().log(f"Load report saved to {report_file}")
+    if report["errors"]:
+        BuiltIn().log(f"{report['errors']} actions failed: {report['first_errors']}", "WARN")
+    return report_file
+
+@keyword("Start Stand-in Server")
+def start_standin(latency: float = 0.0) -> str:
+    """Serve the offline saucedemo stand-in on a free local port; returns its base URL."""
+    server, base_url = start_standin_server(latency=float(latency))
+    standin_servers.append(server)
+    BuiltIn().log(f"Stand-in server listening on {base_url}")
+    return base_url
+
+@keyword("Stop Stand-in Server")
+def stop_standin():
+    """Stop every stand-in server started by this library."""
+    while standin_servers:
+        standin_servers.pop().shutdown()
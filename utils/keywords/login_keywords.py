@@ -1,10 +1,17 @@
+import os
+import time
 from robot.api.deco import keyword
 from utils.browser_manager import BrowserManager
+from utils.login_cache import LoginCache
 from pages.login_page import LoginPage
-from utils.perf_utils.performance_keywords import performance_keyword
+from utils.perf_utils.performance_keywords import performance_keyword, performance_library
 
 browser_manager = BrowserManager()
 login_page = LoginPage(browser_manager)
+login_cache = LoginCache(
+    cache_dir=os.getenv("login_cache_dir", ".auth"),
+    ttl_seconds=float(os.getenv("login_cache_ttl_seconds", "3600")),
+)
 
 @performance_keyword("user navigates to application")
 @keyword("user navigates to application")
@@ -16,7 +23,38 @@ def user_navigates_to_application(headless_mode: bool = False):
 def user_logs_in(username: str, password: str):
     login_page.login(username, password)
 
+@performance_keyword("user is logged in")
+@keyword("user is logged in as")
+def user_is_logged_in_as(username: str, password: str, headless_mode: bool = False):
+    """Open the application already authenticated, reusing a cached storage state when one is fresh."""
+    monitor = performance_library.monitor
+    base_url = os.getenv("base_url", "https://www.saucedemo.com/")
+    entry = login_cache.get(base_url, username)
+
+    if entry is not None:
+        started = time.perf_counter()
+        browser_manager.open_browser(url=base_url.rstrip('/') + '/' + login_page.landing_path,
+                                     is_headless_mode=headless_mode, storage_state=entry["state_path"])
+        if login_page.is_on_page():
+            restore_seconds = time.perf_counter() - started
+            monitor.record_timing("login_cache.restore", restore_seconds)
+            monitor.record_timing("login_cache.saved", max(entry["ui_login_seconds"] - restore_seconds, 0.0))
+            return
+        # The server no longer accepts the cached session; fall back to a real login
+        login_cache.invalidate(base_url, username)
+        # Close the browser (or hand back the pooled context) opened for the cached session before opening another
+        browser_manager.close_browser()
+
+    started = time.perf_counter()
+    browser_manager.open_browser(url=base_url, is_headless_mode=headless_mode)
+    login_page.login(username, password)
+    ui_login_seconds = time.perf_counter() - started
+    monitor.record_timing("login_cache.ui_login", ui_login_seconds)
+
+    saved_state = browser_manager.save_storage_state(login_cache.prepare(base_url, username))
+    login_cache.store(base_url, username, saved_state, ui_login_seconds)
+
 @performance_keyword("user is on products page")
 @keyword("user is on products page")
 def user_is_on_products_page() -> bool:
-    return login_page.is_on_page() == True
\ No newline at end of file
+    return login_page.is_on_page() == True
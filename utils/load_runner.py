@@ -0,0 +1,344 @@
+import argparse
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from pages.login_page import LoginPage
+from pages.products_page import ProductsPage
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.metrics_log import write_snapshot
+from utils.perf_utils.performance_monitor import PerformanceMonitor
+from utils.perf_utils.shard_merge import safe_name
+
+LOAD_SUFFIX = "_load.json"
+SORT_OPTIONS = ("Name (A to Z)", "Name (Z to A)", "Price (low to high)", "Price (high to low)")
+
+
+class LoadProfile:
+    """How many virtual users run, how fast they arrive and how long they pause between actions.
+
+    Users start evenly spread over `ramp_up` seconds, then all of them keep
+    repeating the flow until `steady_state` more seconds have passed (or each
+    completed `iterations`, when set). Between two actions a user thinks for
+    a random time within `think_time`.
+    """
+
+    __slots__ = ("users", "ramp_up", "steady_state", "think_time", "iterations")
+
+    def __init__(self, users: int = 1, ramp_up: float = 0.0, steady_state: float = 60.0,
+                 think_time: Tuple[float, float] = (1.0, 3.0), iterations: int = 0):
+        if users < 1:
+            raise ValueError(f"A load test needs at least one virtual user. Given: {users}")
+        self.users = users
+        self.ramp_up = ramp_up
+        self.steady_state = steady_state
+        self.think_time = (min(think_time), max(think_time))
+        self.iterations = iterations
+
+    @property
+    def duration(self) -> float:
+        return self.ramp_up + self.steady_state
+
+    def start_offset(self, index: int) -> float:
+        return self.ramp_up * index / self.users
+
+    def think(self, rng: random.Random) -> float:
+        low, high = self.think_time
+        return rng.uniform(low, high) if high > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class VirtualUser:
+    """One simulated user: its own session (an isolated browser context) and the page objects built on it."""
+
+    def __init__(self, index: int, session, base_url: str, username: str, password: str):
+        self.index = index
+        self.session = session
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.login_page = LoginPage(session)
+        self.products_page = ProductsPage(session)
+
+
+Step = Tuple[str, Callable[[VirtualUser], object]]
+
+
+def _expect(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+
+
+def shop_flow(sort_options: Sequence[str] = SORT_OPTIONS) -> List[Step]:
+    """The Login and Sort Products flows of the suites, under the action names their keywords record."""
+    steps: List[Step] = [
+        ("user navigates to application", lambda user: user.session.open_browser(user.base_url)),
+        ("user login in", lambda user: user.login_page.login(user.username, user.password)),
+        ("user is on products page", lambda user: _expect(user.login_page.is_on_page(), "Products page is not shown")),
+    ]
+    for option in sort_options:
+        steps.append(("Sort Products", lambda user, option=option: user.products_page.sort_products("text", option)))
+        steps.append(("Validate Products Sorting", lambda user, option=option: _expect(
+            user.products_page.validate_product_sort(option), f"Products are not sorted by {option}")))
+    return steps
+
+
+class LoadStats:
+    """Latency per action at each number of active users, and throughput per second of the run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.active_users = 0
+        self.iterations = 0
+        self._level_since = self.started
+        self._time_at_level: Dict[int, float] = {}
+        self._levels: Dict[int, Dict[str, ActionStats]] = {}
+        self._errors: Dict[int, int] = {}
+        self._first_errors: Dict[str, str] = {}
+        # Second of the run -> [completed actions, errors, most active users]
+        self._seconds: Dict[int, List[int]] = {}
+
+    def _change_level(self, delta: int):
+        now = time.perf_counter()
+        self._time_at_level[self.active_users] = self._time_at_level.get(self.active_users, 0.0) + now - self._level_since
+        self._level_since = now
+        self.active_users += delta
+
+    def user_started(self):
+        with self._lock:
+            self._change_level(1)
+
+    def user_stopped(self):
+        with self._lock:
+            self._change_level(-1)
+
+    def iteration_done(self):
+        with self._lock:
+            self.iterations += 1
+
+    def record(self, action_name: str, duration: float, error: Optional[str] = None):
+        with self._lock:
+            level = self.active_users
+            if error is None:
+                level_stats = self._levels.setdefault(level, {})
+                action_stats = level_stats.get(action_name)
+                if action_stats is None:
+                    action_stats = level_stats[action_name] = ActionStats()
+                action_stats.add(duration)
+            else:
+                self._errors[level] = self._errors.get(level, 0) + 1
+                self._first_errors.setdefault(action_name, error)
+            bucket = self._seconds.setdefault(int(time.perf_counter() - self.started), [0, 0, 0])
+            bucket[0] += error is None
+            bucket[1] += error is not None
+            bucket[2] = max(bucket[2], level)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            self._change_level(0)
+            elapsed = time.perf_counter() - self.started
+            curve = []
+            for level in sorted(set(self._levels) | set(self._errors)):
+                seconds = self._time_at_level.get(level, 0.0)
+                overall = ActionStats()
+                for stats in self._levels.get(level, {}).values():
+                    overall.merge(stats)
+                summary = {action_name: stats.to_summary() for action_name, stats in self._levels.get(level, {}).items()}
+                overall = overall.to_summary()
+                actions = overall["count"]
+                curve.append({
+                    "active_users": level,
+                    "seconds": seconds,
+                    "actions": actions,
+                    "errors": self._errors.get(level, 0),
+                    "throughput": actions / seconds if seconds > 0 else None,
+                    # Every action at this level together, then each action on its own
+                    "overall": overall,
+                    "summary": summary,
+                })
+            actions = sum(bucket[0] for bucket in self._seconds.values())
+            return {
+                "duration": elapsed,
+                "iterations": self.iterations,
+                "actions": actions,
+                "errors": sum(self._errors.values()),
+                "throughput": actions / elapsed if elapsed > 0 else None,
+                "first_errors": dict(self._first_errors),
+                "curve": curve,
+                "timeline": [
+                    {"second": second, "actions": bucket[0], "errors": bucket[1], "active_users": bucket[2]}
+                    for second, bucket in sorted(self._seconds.items())
+                ],
+            }
+
+
+class LoadRunner:
+    """Runs a flow as concurrent virtual users, one thread per user.
+
+    Every user opens its own session from `session_factory` on its own
+    thread, so users share nothing but the server under test. Each user is a
+    test session of the `PerformanceMonitor`, so its actions reach the
+    metrics log, the dashboard and the reports like any test's; the runner
+    additionally groups latencies by the number of users active when each
+    action finished.
+    """
+
+    def __init__(self, steps: List[Step], profile: LoadProfile, session_factory: Callable[[], object], base_url: str,
+                 username: str = "standard_user", password: str = "secret_sauce", name: str = "Load Test",
+                 seed: Optional[int] = None):
+        self.steps = steps
+        self.profile = profile
+        self.session_factory = session_factory
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.name = name
+        self.seed = seed
+        self.monitor = PerformanceMonitor()
+        self.stats = LoadStats()
+        self._stop = threading.Event()
+        self._stop_at = 0.0
+
+    def stop(self):
+        """Ask every user to stop after its current action."""
+        self._stop.set()
+
+    def run(self) -> Dict:
+        started_at = datetime.now().isoformat()
+        self.stats = LoadStats()
+        self._stop.clear()
+        start = time.perf_counter()
+        self._stop_at = start + self.profile.duration
+        threads = [
+            threading.Thread(target=self._run_user, args=(index, start + self.profile.start_offset(index)),
+                             name=f"virtual-user-{index + 1}", daemon=True)
+            for index in range(self.profile.users)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "started_at": started_at,
+            "profile": self.profile.to_dict(),
+            **self.stats.to_dict(),
+        }
+
+    def _run_user(self, index: int, start_at: float):
+        if self._stop.wait(max(0.0, start_at - time.perf_counter())):
+            return
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        test_name = f"{self.name} - user {index + 1}"
+        session = self.session_factory()
+        user = VirtualUser(index, session, self.base_url, self.username, self.password)
+        # Registered collectors observe the Robot Browser library's page, not this user's
+        self.monitor.start_test_session(test_name, collectors=False)
+        self.stats.user_started()
+        try:
+            iterations = 0
+            while not self._stop.is_set() and time.perf_counter() < self._stop_at:
+                if self.profile.iterations and iterations >= self.profile.iterations:
+                    break
+                for action_name, step in self.steps:
+                    started = time.perf_counter()
+                    try:
+                        with self.monitor.measure_action(action_name):
+                            started = time.perf_counter()
+                            step(user)
+                            duration = time.perf_counter() - started
+                    except Exception as e:
+                        # The rest of this iteration depends on the failed step; start the next one
+                        self.stats.record(action_name, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+                        break
+                    self.stats.record(action_name, duration)
+                    if self._stop.wait(self.profile.think(rng)):
+                        break
+                iterations += 1
+                self.stats.iteration_done()
+        finally:
+            self.stats.user_stopped()
+            self.monitor.end_test_session(test_name)
+            session.close()
+
+
+def write_load_report(results_dir: str, report: Dict) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{safe_name(report['name'])}{LOAD_SUFFIX}")
+    write_snapshot(path, report)
+    return path
+
+
+def format_curve(report: Dict) -> str:
+    """Latency versus concurrency as a text table: throughput and mean/p95 over all actions per level."""
+    lines = [f"{'users':>6}{'seconds':>10}{'actions':>9}{'errors':>8}{'actions/s':>11}{'mean (s)':>10}{'p95 (s)':>10}"]
+    for row in report["curve"]:
+        overall = row["overall"]
+        throughput = row["throughput"] if row["throughput"] is not None else 0.0
+        lines.append(f"{row['active_users']:>6}{row['seconds']:>10.1f}{row['actions']:>9}{row['errors']:>8}"
+                     f"{throughput:>11.2f}{overall['avg_duration']:>10.3f}{overall['p95_duration']:>10.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the login and product sorting flows as concurrent virtual users.")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which users start")
+    parser.add_argument("--steady-state", type=float, default=60.0, help="Seconds all users keep running after the ramp-up")
+    parser.add_argument("--think-time", type=float, nargs=2, default=(1.0, 3.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--iterations", type=int, default=0, help="Flow repetitions per user; 0 runs until the time is up")
+    parser.add_argument("--base-url", default=os.getenv("base_url", "https://www.saucedemo.com/"))
+    parser.add_argument("--standin", action="store_true", help="Serve the offline stand-in site and run against it")
+    parser.add_argument("--standin-latency", type=float, default=0.0, help="Seconds the stand-in adds to every response")
+    parser.add_argument("--username", default="standard_user")
+    parser.add_argument("--password", default="secret_sauce")
+    parser.add_argument("--browser", default=os.getenv("browser_type", "chromium"))
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--name", default="Load Test")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    from utils.playwright_session import PlaywrightSession
+
+    base_url = args.base_url
+    server = None
+    if args.standin:
+        from utils.standin_server import start_standin_server
+        server, base_url = start_standin_server(latency=args.standin_latency)
+        print(f"Stand-in server listening on {base_url}")
+
+    monitor = PerformanceMonitor()
+    monitor.enable_monitoring(True)
+    profile = LoadProfile(args.users, args.ramp_up, args.steady_state, tuple(args.think_time), args.iterations)
+    runner = LoadRunner(
+        shop_flow(), profile, lambda: PlaywrightSession(args.browser, headless=not args.headed), base_url,
+        args.username, args.password, args.name, args.seed,
+    )
+    try:
+        report = runner.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+    monitor.save_metrics()
+
+    print(format_curve(report))
+    print(f"{report['actions']} actions, {report['errors']} errors, {report['throughput'] or 0:.2f} actions/s overall")
+    for action_name, error in report["first_errors"].items():
+        print(f"First error in '{action_name}': {error}")
+    # Next to the metrics the monitor saved for every virtual user
+    print(f"Load report written to {write_load_report(os.path.join(os.getcwd(), 'results'), report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+class LoginCache:
+    """Disk cache of browser storage states keyed by (base_url, username).
+
+    A storage state captured after one real UI login can seed any number of
+    new contexts, so tests that only need an authenticated user skip the
+    login form. Entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, cache_dir: str = ".auth", ttl_seconds: float = 3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, base_url: str, username: str) -> str:
+        return hashlib.sha256(f"{base_url.rstrip('/')}|{username}".encode("utf-8")).hexdigest()[:32]
+
+    def state_path(self, base_url: str, username: str) -> str:
+        """Path of the storage state file for a user."""
+        return os.path.join(self.cache_dir, f"{self._key(base_url, username)}.json")
+
+    def _meta_path(self, base_url: str, username: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(base_url, username)}.meta.json")
+
+    def get(self, base_url: str, username: str) -> Optional[Dict]:
+        """Return the cache entry metadata (with `state_path`) if a fresh entry exists."""
+        meta_path = self._meta_path(base_url, username)
+        state_path = self.state_path(base_url, username)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - meta.get("created", 0) > self.ttl_seconds or not os.path.exists(state_path):
+            return None
+        meta["state_path"] = state_path
+        return meta
+
+    def prepare(self, base_url: str, username: str) -> str:
+        """Return a temporary path the browser can save a fresh storage state to."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return self.state_path(base_url, username) + ".tmp"
+
+    def store(self, base_url: str, username: str, saved_state_path: str, ui_login_seconds: float) -> str:
+        """Move a saved storage state into the cache, recording how long the UI login took."""
+        state_path = self.state_path(base_url, username)
+        os.replace(saved_state_path, state_path)
+        meta = {
+            "base_url": base_url,
+            "username": username,
+            "created": time.time(),
+            "ui_login_seconds": ui_login_seconds,
+        }
+        meta_path = self._meta_path(base_url, username)
+        with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        return state_path
+
+    def invalidate(self, base_url: str, username: str):
+        """Drop a cache entry, e.g. when the restored session turned out to be logged out."""
+        for path in (self.state_path(base_url, username), self._meta_path(base_url, username)):
+            if os.path.exists(path):
+                os.remove(path)
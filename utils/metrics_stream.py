@@ -0,0 +1,247 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from utils.perf_utils.action_store import json_default
+from utils.perf_utils.metrics_log import SUMMARY_STATE
+
+PROTOCOL_VERSION = 1
+
+
+def client_view(metrics: Dict) -> Dict:
+    """The part of a test's metrics sent to dashboard clients, without the summaries' merge state."""
+    return {key: value for key, value in metrics.items() if key not in (SUMMARY_STATE, "timing_samples")}
+
+
+def _same_action(left: Dict, right: Dict) -> bool:
+    return left.get("step_order") == right.get("step_order") and left.get("start_time") == right.get("start_time")
+
+
+class MetricsStream:
+    """Versioned change feed of the dashboard's metrics cache.
+
+    Every change to a test becomes one delta message with the next sequence
+    number: only the actions appended since the previous version, the summary
+    rows that changed and the scalar fields that changed. Messages are
+    serialized once and kept in a bounded history, so a client reconnecting
+    with its last sequence number is caught up from the history and only falls
+    back to a full snapshot when it is too far behind.
+    """
+
+    def __init__(self, history: int = 1000):
+        self.seq = 0
+        self.last_update = 0.0
+        self.tests: Dict[str, Dict] = {}
+        self._history: Deque[Tuple[int, str]] = deque(maxlen=history)
+        self._snapshot_cache: Optional[Tuple[int, str]] = None
+        self._lock = threading.Lock()
+
+    def _diff(self, previous: Optional[Dict], current: Dict) -> Optional[Dict]:
+        if previous is None:
+            return {"reset": True, "test": client_view(current)}
+
+        previous_actions = previous.get("actions", [])
+        current_actions = current.get("actions", [])
+        known = len(previous_actions)
+        if len(current_actions) < known or (known and not _same_action(previous_actions[-1], current_actions[known - 1])):
+            # History was rewritten (test restarted, shards re-merged): resend the test
+            return {"reset": True, "test": client_view(current)}
+
+        change: Dict = {}
+        if len(current_actions) > known:
+            change["actions"] = current_actions[known:]
+
+        previous_summary = previous.get("summary", {})
+        changed_rows = {
+            action_name: row for action_name, row in current.get("summary", {}).items()
+            if previous_summary.get(action_name) != row
+        }
+        if changed_rows:
+            change["summary"] = changed_rows
+
+        fields = {
+            key: value for key, value in current.items()
+            if key not in ("actions", "summary", SUMMARY_STATE, "timing_samples") and previous.get(key) != value
+        }
+        if fields:
+            change["fields"] = fields
+        return change or None
+
+    def update(self, tests: Dict[str, Dict]) -> Optional[str]:
+        """Apply new test metrics; returns the serialized delta, or None when nothing changed."""
+        with self._lock:
+            changes = {}
+            for test_name, metrics in tests.items():
+                change = self._diff(self.tests.get(test_name), metrics)
+                self.tests[test_name] = metrics
+                if change is not None:
+                    changes[test_name] = change
+            if not changes:
+                return None
+            self.seq += 1
+            self.last_update = time.time()
+            message = json.dumps({
+                "type": "delta",
+                "version": PROTOCOL_VERSION,
+                "seq": self.seq,
+                "last_update": self.last_update,
+                "tests": changes,
+            }, separators=(',', ':'), default=json_default)
+            self._history.append((self.seq, message))
+            return message
+
+    def snapshot(self) -> str:
+        """A full snapshot message of the current version."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> str:
+        # Built once per version: every client resyncing at the same version shares it
+        if self._snapshot_cache is not None and self._snapshot_cache[0] == self.seq:
+            return self._snapshot_cache[1]
+        message = json.dumps({
+            "type": "snapshot",
+            "version": PROTOCOL_VERSION,
+            "seq": self.seq,
+            "last_update": self.last_update,
+            "metrics": {test_name: client_view(metrics) for test_name, metrics in self.tests.items()},
+        }, separators=(',', ':'), default=json_default)
+        self._snapshot_cache = (self.seq, message)
+        return message
+
+    def catch_up(self, since: Optional[int] = None) -> List[str]:
+        """Messages bringing a client at sequence `since` up to date (a snapshot if it is too old)."""
+        with self._lock:
+            return self._catch_up(since)
+
+    def _catch_up(self, since: Optional[int]) -> List[str]:
+        if since is None or since > self.seq:
+            # New client, or a client of a previous server process
+            return [self._snapshot()]
+        if since == self.seq:
+            return []
+        if not self._history or self._history[0][0] > since + 1:
+            return [self._snapshot()]
+        return [message for seq, message in self._history if seq > since]
+
+    def subscribe(self, broadcaster: "Broadcaster", client, since: Optional[int] = None):
+        """Register a client and queue its catch-up messages, atomically with respect to `update`.
+
+        The catch-up is queued for the client ahead of any later delta, so it
+        sees one ordered stream.
+        """
+        with self._lock:
+            broadcaster.add(client, self._catch_up(since))
+
+
+# Queue marker: the client fell behind and gets a fresh snapshot instead of the messages it missed
+RESYNC = object()
+
+
+class _ClientSender:
+    """One client's bounded queue, drained by a sender thread of its own."""
+
+    def __init__(self, broadcaster: "Broadcaster", client):
+        self.broadcaster = broadcaster
+        self.client = client
+        self.queue: "queue.Queue" = queue.Queue(maxsize=broadcaster.queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="metrics-sender", daemon=True)
+
+    def offer(self, message):
+        """Queue a message without blocking; a full queue is replaced by a resync."""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(RESYNC)
+
+    def close(self):
+        """Stop the sender thread after its current message; queued messages are discarded."""
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            if message is RESYNC:
+                message = self.broadcaster.snapshot()
+            started = time.monotonic()
+            try:
+                self.client.send(message)
+            except Exception as e:
+                print(f"Error sending to WebSocket: {e}")
+                break
+            if time.monotonic() - started > self.broadcaster.send_timeout:
+                # Too slow to keep up: drop it, the dashboard reconnects with its last sequence number
+                print("WebSocket client dropped: send timed out")
+                try:
+                    self.client.close()
+                except Exception:
+                    pass
+                break
+        self.broadcaster.remove(self.client)
+        if self.dropped:
+            print(f"WebSocket client skipped {self.dropped} queued messages by resyncing")
+
+
+class Broadcaster:
+    """Fans serialized messages out to every connected client, one sender thread per client.
+
+    Publishing only enqueues, so the file watcher never blocks on a socket,
+    and a slow socket only delays its own client: each client has a bounded
+    queue that, once it overflows, is replaced by a fresh snapshot from
+    `snapshot`. Each message is the same string for every client.
+    """
+
+    def __init__(self, snapshot: Callable[[], str], queue_size: int = 64, send_timeout: float = 10.0):
+        self.snapshot = snapshot
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._senders: Dict[object, _ClientSender] = {}
+        self._clients_lock = threading.Lock()
+
+    def add(self, client, initial_messages: List[str] = ()):
+        """Add a client; `initial_messages` are sent to it before any later broadcast."""
+        sender = _ClientSender(self, client)
+        for message in initial_messages:
+            sender.offer(message)
+        with self._clients_lock:
+            self._senders[client] = sender
+        sender.thread.start()
+
+    def remove(self, client):
+        with self._clients_lock:
+            sender = self._senders.pop(client, None)
+        if sender is not None:
+            sender.close()
+
+    def publish(self, message: Optional[str]):
+        if message is None:
+            return
+        with self._clients_lock:
+            senders = list(self._senders.values())
+        for sender in senders:
+            sender.offer(message)
+
+    def stop(self):
+        with self._clients_lock:
+            clients = list(self._senders)
+        for client in clients:
+            self.remove(client)
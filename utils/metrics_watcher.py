@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from watchdog.events import FileSystemEventHandler
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.action_store import ActionStore
+from utils.perf_utils.binary_snapshot import binary_path_for
+from utils.perf_utils.metrics_log import ACTION, TIMING, apply_record, load_metrics_tests, log_path_for
+from utils.perf_utils.shard_merge import SHARDS_DIR
+
+
+# Leading bytes of a log compared on every read to notice a log rewritten in place
+HEAD_BYTES = 256
+
+
+class LogTail:
+    """Incremental reader of an append-only JSON Lines metrics log.
+
+    Remembers the byte offset it has parsed up to and the file's inode, so each
+    read parses only the bytes appended since the previous one. An incomplete
+    trailing line is kept until its newline arrives. A new inode, a shrunken
+    file or different leading bytes (the log was truncated in place by a new
+    run, which may already have written past the old offset) restart from the
+    beginning.
+    Actions are kept in columnar `ActionStore`s, so a dashboard following a
+    long soak run does not hold one dict per action.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reset(None)
+
+    def _reset(self, inode: Optional[int]):
+        self.inode = inode
+        self.offset = 0
+        self.mtime_ns: Optional[int] = None
+        # The first bytes of the log; its first record carries the run's start time
+        self._head = b""
+        self._partial = b""
+        self.tests: Dict[str, Dict] = {}
+        self._stats: Dict[str, Dict[str, ActionStats]] = {}
+        self._timing_stats: Dict[str, Dict[str, ActionStats]] = {}
+
+    def read(self) -> Dict[str, Dict]:
+        """Parse newly appended records; returns copies of the tests they touched."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self._reset(stat.st_ino)
+        if stat.st_size == self.offset and stat.st_mtime_ns == self.mtime_ns:
+            return {}
+
+        with open(self.path, 'rb') as f:
+            if self._head and f.read(len(self._head)) != self._head:
+                self._reset(stat.st_ino)
+            f.seek(self.offset)
+            data = f.read()
+        self.mtime_ns = stat.st_mtime_ns
+        if len(self._head) < HEAD_BYTES:
+            # Until it is full, the head is every byte read so far
+            self._head += data[:HEAD_BYTES - len(self._head)]
+        self.offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+
+        touched = set()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            test_name = record.get("test_case_id")
+            if test_name is None:
+                continue
+            apply_record(self.tests, record, ActionStore)
+            if record.get("type") == ACTION:
+                self._stats.setdefault(test_name, {}).setdefault(record["action"], ActionStats()).add(record["duration"])
+            elif record.get("type") == TIMING:
+                self.tests[test_name].pop("timing_samples", None)
+                self._timing_stats.setdefault(test_name, {}).setdefault(record["name"], ActionStats()).add(record["duration"])
+            touched.add(test_name)
+
+        changed = {}
+        for test_name in touched:
+            metrics = self.tests[test_name]
+            metrics["summary"] = {
+                action_name: stats.to_summary() for action_name, stats in self._stats.get(test_name, {}).items()
+            }
+            if test_name in self._timing_stats:
+                metrics["timings"] = {
+                    name: stats.to_summary() for name, stats in self._timing_stats[test_name].items()
+                }
+            # Frozen views, so consumers can compare against what they were given before
+            changed[test_name] = dict(metrics, actions=metrics["actions"].frozen())
+        return changed
+
+
+class SnapshotFile:
+    """Reader of a JSON or binary snapshot that only reloads it when inode, mtime or size changed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signature = None
+
+    def read(self) -> Dict[str, Dict]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature or stat.st_size == 0:
+            return {}
+        tests = load_metrics_tests(self.path)
+        self.signature = signature
+        return tests
+
+
+class MetricsWatcher:
+    """Coalesces file system events per file and reads each changed file once per window.
+
+    `notify` only records the path; a worker thread reads every path notified
+    during the last `debounce` seconds and hands the changed tests to
+    `on_change`. JSON snapshots are skipped while their append-only log or
+    binary snapshot exists, since those are always at least as fresh. Between
+    the log and the binary snapshot, the more recently written one is read.
+    """
+
+    def __init__(self, on_change: Callable[[Dict[str, Dict]], None], debounce: float = 0.25):
+        self.on_change = on_change
+        self.debounce = debounce
+        self._readers: Dict[str, object] = {}
+        self._pending: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def read(self, path: str) -> Dict[str, Dict]:
+        """Read the changes of one file right away."""
+        if path.endswith('.json') and (os.path.exists(log_path_for(path)) or os.path.exists(binary_path_for(path))):
+            return {}
+        if path.endswith(('.jsonl', '.pcol')) and self._superseded(path):
+            return {}
+        reader = self._readers.get(path)
+        if reader is None:
+            reader = self._readers[path] = LogTail(path) if path.endswith('.jsonl') else SnapshotFile(path)
+        try:
+            return reader.read()
+        except (OSError, ValueError) as e:
+            print(f"Error loading metrics file {path}: {e}")
+            return {}
+
+    @staticmethod
+    def _superseded(path: str) -> bool:
+        # The log keeps growing during a run; the binary snapshot is written when metrics are saved
+        snapshot_path = path[:-1] if path.endswith('.jsonl') else path[:-len('.pcol')] + '.json'
+        other = binary_path_for(snapshot_path) if path.endswith('.jsonl') else log_path_for(snapshot_path)
+        try:
+            own_mtime, other_mtime = os.stat(path).st_mtime_ns, os.stat(other).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        return other_mtime > own_mtime or (other_mtime == own_mtime and path.endswith('.jsonl'))
+
+    def notify(self, path: str):
+        """Record a file system event; the file is read once the debounce window ends."""
+        with self._condition:
+            if path not in self._pending:
+                self._pending[path] = time.monotonic() + self.debounce
+                self._condition.notify()
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="metrics-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                wait = min(self._pending.values()) - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                now = time.monotonic()
+                due = [path for path, deadline in self._pending.items() if deadline <= now]
+                for path in due:
+                    del self._pending[path]
+
+            changed = {}
+            for path in due:
+                changed.update(self.read(path))
+            if changed:
+                try:
+                    self.on_change(changed)
+                except Exception as e:
+                    print(f"Error publishing metrics update: {e}")
+
+
+def metrics_files(results_dir: str, suffixes: Tuple[str, ...]) -> List[str]:
+    """Metrics files of a results directory, including the per-worker shards of sharded (pabot) runs."""
+    paths = []
+    for directory in (results_dir, os.path.join(results_dir, SHARDS_DIR)):
+        if os.path.isdir(directory):
+            paths.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(suffixes))
+    return paths
+
+
+class MetricsFileHandler(FileSystemEventHandler):
+    """Handler for file system events when metrics files are updated.
+
+    Events are only recorded here; the watcher coalesces them per file and
+    reads each file once per debounce window.
+    """
+
+    def __init__(self, watcher: MetricsWatcher, suffixes: Tuple[str, ...] = ('_metrics.json', '_metrics.jsonl', '_metrics.pcol')):
+        super().__init__()
+        self.watcher = watcher
+        self.suffixes = suffixes
+
+    def on_modified(self, event):
+        if not event.is_directory and event.src_path.endswith(self.suffixes):
+            self.watcher.notify(event.src_path)
+
+    def on_created(self, event):
+        if not event.is_directory and event.src_path.endswith(self.suffixes):
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        # Snapshots are written to a temporary file and renamed into place
+        if not event.is_directory and event.dest_path.endswith(self.suffixes):
+            self.watcher.notify(event.dest_path)
@@ -0,0 +1,229 @@
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+from collections import Counter
+from threading import Event, Lock, Thread, get_ident
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.perf_utils.action_stats import ActionStats
+
+SAMPLING = "sampling"
+CPROFILE = "cprofile"
+PROFILE_MODES = (SAMPLING, CPROFILE)
+COLLAPSED_SUFFIX = ".collapsed"
+PSTATS_SUFFIX = ".prof"
+# The percentile rule needs this many earlier durations of the action before it keeps anything
+MIN_PERCENTILE_SAMPLES = 20
+
+
+def frame_label(code) -> str:
+    """One frame of a collapsed stack; `;` separates frames, so it cannot appear in a label."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def collapse_frame(frame) -> str:
+    """The stack of a live frame, outermost first, in collapsed-stack notation."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def collapse_pstats(stats: pstats.Stats) -> Counter:
+    """Approximate collapsed stacks from cProfile's caller graph, weighted in microseconds.
+
+    cProfile only keeps caller -> callee edges, so a function's time is split
+    over its callers in proportion to the time each of them spent in it.
+    """
+    entries = stats.stats
+    callees: Dict[Tuple, List[Tuple]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    def label(function: Tuple) -> str:
+        filename, line, name = function
+        return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+    stacks = Counter()
+
+    def walk(function: Tuple, path: List[str], share: float):
+        _, _, own_time, total_time, _ = entries[function]
+        if total_time * share < 1e-6:
+            # Below the resolution of the weights; also bounds the walk on large call graphs
+            return
+        path = path + [label(function)]
+        weight = int(own_time * share * 1e6)
+        if weight:
+            stacks[";".join(path)] += weight
+        for callee, edge_time in callees.get(function, ()):
+            callee_total = entries[callee][3]
+            if callee_total and label(callee) not in path:
+                walk(callee, path, share * edge_time / callee_total)
+
+    for function, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(function, [], 1.0)
+    return stacks
+
+
+def write_collapsed(path: str, stacks: Counter) -> str:
+    """Write stacks as `frame;frame;frame count` lines, the input of flamegraph.pl and speedscope."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+class StackSampler:
+    """Samples the stacks of the threads running profiled actions, from a daemon thread.
+
+    The thread sleeps on an event while no action is profiled, so actions
+    that are not profiled cost nothing. Nested profiled actions of one thread
+    each receive every sample taken while they are open.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._sessions: Dict[int, List[Counter]] = {}
+        self._lock = Lock()
+        self._active = Event()
+        self._thread: Optional[Thread] = None
+
+    def begin(self, thread_ident: int) -> Counter:
+        """Start collecting samples of a thread; returns the counter they are added to."""
+        stacks = Counter()
+        with self._lock:
+            self._sessions.setdefault(thread_ident, []).append(stacks)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="StackSampler", daemon=True)
+                self._thread.start()
+        self._active.set()
+        return stacks
+
+    def end(self, thread_ident: int, stacks: Counter) -> Counter:
+        """Stop collecting into `stacks` and return it."""
+        with self._lock:
+            sessions = self._sessions.get(thread_ident, [])
+            for index, session in enumerate(sessions):
+                # Identity, not equality: two empty counters compare equal
+                if session is stacks:
+                    del sessions[index]
+                    break
+            if not sessions:
+                self._sessions.pop(thread_ident, None)
+            if not self._sessions:
+                self._active.clear()
+        return stacks
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_ident, sessions in self._sessions.items():
+                    frame = frames.get(thread_ident)
+                    if frame is None:
+                        continue
+                    stack = collapse_frame(frame)
+                    for stacks in sessions:
+                        stacks[stack] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ActionProfiler:
+    """Profiles selected measured actions and keeps the profiles of slow ones.
+
+    `sampling` samples the acting thread's stack every `interval` seconds
+    from a background thread; `cprofile` runs cProfile in the acting thread,
+    which sees every Python call but slows the action down. A profile is kept
+    when the action took at least `threshold` seconds or, with `percentile`,
+    at least that percentile of the action's earlier durations.
+    """
+
+    def __init__(self, mode: str = SAMPLING, actions: Iterable[str] = (), threshold: Optional[float] = None,
+                 percentile: Optional[float] = None, interval: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(PROFILE_MODES)}. Given: {mode}")
+        self.mode = mode
+        # No action names: every measured action is profiled
+        self.actions = frozenset(actions)
+        self.threshold = threshold
+        self.percentile = percentile
+        self.interval = interval
+        self._sampler = StackSampler(interval) if mode == SAMPLING else None
+        # cProfile replaces the thread's profile function, so nested actions of a thread are not profiled again
+        self._cprofile_threads = set()
+
+    def selects(self, action_name: str) -> bool:
+        return not self.actions or action_name in self.actions
+
+    def start(self, action_name: str):
+        """Start profiling the current thread's action; returns a token for `stop`, or None."""
+        if not self.selects(action_name):
+            return None
+        thread_ident = get_ident()
+        if self._sampler is not None:
+            return thread_ident, self._sampler.begin(thread_ident)
+        if thread_ident in self._cprofile_threads:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process; another action already holds it
+            return None
+        self._cprofile_threads.add(thread_ident)
+        return thread_ident, profile
+
+    def stop(self, token) -> Tuple[Counter, Optional[cProfile.Profile]]:
+        """Stop profiling; returns the collapsed stacks and, in cprofile mode, the profile itself."""
+        thread_ident, collector = token
+        if self._sampler is not None:
+            return self._sampler.end(thread_ident, collector), None
+        collector.disable()
+        self._cprofile_threads.discard(thread_ident)
+        return collapse_pstats(pstats.Stats(collector)), collector
+
+    def should_keep(self, duration: float, stats: Optional[ActionStats]) -> bool:
+        """Whether an action of this duration is slow enough to keep its profile.
+
+        `stats` holds the action's earlier durations, without this one.
+        """
+        if self.threshold is not None and duration >= self.threshold:
+            return True
+        if self.percentile is not None and stats is not None and stats.count >= MIN_PERCENTILE_SAMPLES:
+            return duration >= stats.histogram.percentile(self.percentile)
+        return False
+
+    def save(self, path: str, stacks: Counter, profile: Optional[cProfile.Profile] = None) -> Dict:
+        """Write the collapsed stacks (and the cProfile stats next to them); returns the action's profile entry."""
+        write_collapsed(path, stacks)
+        # Sampled stacks count samples; stacks from cProfile are weighted in microseconds
+        entry = {"mode": self.mode, "file": path, "weight": sum(stacks.values()),
+                 "unit": "samples" if self.mode == SAMPLING else "us"}
+        if profile is not None:
+            stats_file = path[:-len(COLLAPSED_SUFFIX)] + PSTATS_SUFFIX if path.endswith(COLLAPSED_SUFFIX) else path + PSTATS_SUFFIX
+            profile.dump_stats(stats_file)
+            entry["pstats"] = stats_file
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a cProfile stats file of an action into collapsed stacks.")
+    parser.add_argument("stats_file", help="A .prof file written by cProfile")
+    parser.add_argument("--output", default=None, help=f"Defaults to the stats file with a {COLLAPSED_SUFFIX} suffix")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.stats_file)[0] + COLLAPSED_SUFFIX
+    write_collapsed(output, collapse_pstats(pstats.Stats(args.stats_file)))
+    print(f"Collapsed stacks written to {output}")
+
+
+if __name__ == "__main__":
+    main()
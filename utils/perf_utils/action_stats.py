@@ -0,0 +1,159 @@
+import math
+from typing import Dict, Optional
+
+# Percentiles reported in every action summary
+SUMMARY_PERCENTILES = (50, 90, 95, 99)
+
+
+class LogHistogram:
+    """Mergeable log-bucket histogram for streaming percentile estimates.
+
+    Values are counted in buckets whose bounds grow geometrically, so every
+    estimate is within `relative_accuracy` of the true value while memory only
+    grows with the dynamic range of the data, not with the number of samples.
+    Two histograms with the same accuracy merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """Count one value."""
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: 'LogHistogram'):
+        """Add the counts of another histogram into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different relative accuracy.")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def percentile(self, percent: float) -> float:
+        """Estimate the value at the given percentile (0-100)."""
+        if self.count == 0:
+            return 0.0
+        rank = percent / 100 * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_dict(self) -> Dict:
+        """Serialize the histogram so it can be merged later."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LogHistogram':
+        """Rebuild a histogram serialized with `to_dict`."""
+        histogram = cls(data.get("relative_accuracy", 0.01))
+        histogram.buckets = {int(index): count for index, count in data.get("buckets", {}).items()}
+        histogram.zero_count = data.get("zero_count", 0)
+        histogram.count = histogram.zero_count + sum(histogram.buckets.values())
+        return histogram
+
+
+class ActionStats:
+    """Incrementally maintained duration statistics for one action name."""
+
+    __slots__ = ("count", "total", "min", "max", "mean", "_m2", "histogram")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.histogram = LogHistogram(relative_accuracy)
+
+    def add(self, duration: float):
+        """Record one duration in O(1) using Welford's online algorithm."""
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        delta = duration - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (duration - self.mean)
+        self.histogram.add(duration)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the recorded durations."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def merge(self, other: 'ActionStats'):
+        """Combine the statistics of another accumulator (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.mean, self._m2 = other.mean, other._m2
+        else:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self._m2 += other._m2 + delta * delta * self.count * other.count / count
+            self.mean += delta * other.count / count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram.merge(other.histogram)
+
+    def to_summary(self) -> Dict:
+        """Return the summary row reported for this action."""
+        summary = {
+            "count": self.count,
+            "total_duration": self.total,
+            "min_duration": self.min if self.count else 0,
+            "max_duration": self.max,
+            "avg_duration": self.mean,
+            "std_duration": math.sqrt(self.variance),
+        }
+        for percent in SUMMARY_PERCENTILES:
+            # Bucket midpoints can fall just outside the observed range; clamp them back in
+            estimate = self.histogram.percentile(percent)
+            summary[f"p{percent}_duration"] = min(max(estimate, self.min), self.max) if self.count else 0.0
+        return summary
+
+    def to_state(self) -> Dict:
+        """Return what `from_summary` needs besides the summary row to merge this accumulator exactly."""
+        return {"m2": self._m2, "histogram": self.histogram.to_dict()}
+
+    @classmethod
+    def from_summary(cls, summary: Dict, state: Optional[Dict] = None) -> 'ActionStats':
+        """Rebuild an accumulator from a summary row and the state written by `to_state`."""
+        stats = cls()
+        stats.count = summary.get("count", 0)
+        stats.total = summary.get("total_duration", 0.0)
+        stats.min = summary.get("min_duration", float('inf')) if stats.count else float('inf')
+        stats.max = summary.get("max_duration", 0.0)
+        stats.mean = summary.get("avg_duration", 0.0)
+        if state:
+            stats._m2 = state.get("m2", 0.0)
+            stats.histogram = LogHistogram.from_dict(state.get("histogram", {}))
+        else:
+            # Without its state, keep the totals and approximate the spread
+            stats._m2 = summary.get("std_duration", 0.0) ** 2 * max(stats.count - 1, 0)
+            for _ in range(stats.count):
+                stats.histogram.add(stats.mean)
+        return stats
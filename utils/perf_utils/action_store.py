@@ -0,0 +1,348 @@
+import json
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+NAN = float('nan')
+# Per-action details that only go to the metrics log; the store never keeps them in memory
+LOG_ONLY_FIELDS = ("resources", "processes")
+_COLUMN_FIELDS = (
+    "action", "start_time", "duration", "parameters", "step_order", "round_trips",
+    "cpu_usage", "memory_usage", "browser_timings", "network", "result", "parent_step", "thread_id",
+) + LOG_ONLY_FIELDS
+
+
+# Browser timings with a column of their own; the others (navigation, paints, long tasks, ...) are kept sparsely
+_TIMING_COLUMNS = ("browser_window", "harness_overhead")
+
+
+# Column name and fixed-size typecode; the binary snapshot writes the same columns
+COLUMNS = (
+    ("step_order", 'q'), ("start", 'd'), ("duration", 'd'), ("round_trips", 'q'), ("cpu", 'd'), ("memory", 'd'),
+    ("name_ids", 'q'), ("param_ids", 'q'), ("failed", 'b'), ("browser_window", 'd'), ("harness_overhead", 'd'),
+    ("requests", 'q'), ("bytes", 'q'), ("first_start", 'd'), ("last_end", 'd'), ("parent_step", 'q'), ("thread_id", 'q'),
+)
+# Value of a column in records (or files) written before the column existed
+_MISSING = {'q': -1, 'd': NAN, 'b': 0}
+
+
+def as_number(value, unit: str = "") -> Optional[float]:
+    """Read a number that older records stored as a display string ("12.5%", "300.25 MB")."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(str(value).replace(unit, "").strip())
+    except ValueError:
+        return None
+
+
+def _epoch(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _optional(value: float):
+    return None if math.isnan(value) else value
+
+
+class _Interner:
+    """Stores each distinct value once and refers to it by index."""
+
+    __slots__ = ("values", "_ids")
+
+    def __init__(self):
+        self.values: List = []
+        self._ids: Dict = {}
+
+    @classmethod
+    def of(cls, values: List, keys: Optional[List] = None) -> '_Interner':
+        interner = cls()
+        interner.values = list(values)
+        interner._ids = {key: index for index, key in enumerate(values if keys is None else keys)}
+        return interner
+
+    def intern(self, value, key=None) -> int:
+        key = value if key is None else key
+        index = self._ids.get(key)
+        if index is None:
+            index = self._ids[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+class ActionRecord:
+    """Lazy read-only view of one stored action; fields are read from the columns on access."""
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: 'ActionStore', index: int):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, key: str):
+        store, index = self._store, self._index
+        if key == "duration":
+            return store.duration[index]
+        if key == "action":
+            return store.names.values[store.name_ids[index]]
+        if key == "step_order":
+            return store.step_order[index]
+        if key == "result":
+            return "FAIL" if store.failed[index] else "PASS"
+        return store.record(index)[key]
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._store.record(self._index)
+
+    def keys(self):
+        return self._store.record(self._index).keys()
+
+    def to_dict(self) -> Dict:
+        return self._store.record(self._index)
+
+
+class ActionStore:
+    """Columnar, append-only store of one test's actions.
+
+    Numeric fields live in typed arrays (a few bytes per action instead of a
+    dict with formatted strings), action names and parameter dicts are
+    interned, and rare fields such as budget violations and the browser
+    timings without a column are kept sparsely. Per-action process details
+    (`resources`, `processes`) are written to the metrics log but not kept here. Indexing returns a lazy
+    `ActionRecord`; slicing and `to_json` export plain dicts, which only
+    happens when metrics are written or sent.
+    """
+
+    __slots__ = (
+        "step_order", "start", "duration", "round_trips", "cpu", "memory", "name_ids", "param_ids", "failed",
+        "browser_window", "harness_overhead", "requests", "bytes", "first_start", "last_end", "parent_step", "thread_id",
+        "names", "parameters", "extras",
+    )
+
+    def __init__(self):
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self.names = _Interner()
+        self.parameters = _Interner()
+        # Sparse: index -> fields without a column (budget violations, worker, ...)
+        self.extras: Dict[int, Dict] = {}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence], names: List[str], parameters: List[Dict],
+                     extras: Optional[Dict[int, Dict]] = None) -> 'ActionStore':
+        """A store over existing column buffers (e.g. memory-mapped), without copying them.
+
+        Columns that are not `array`s (such as memoryviews) make the store read-only.
+        Columns missing from `columns` read as missing values.
+        """
+        store = cls.__new__(cls)
+        length = len(columns["duration"])
+        for name, typecode in COLUMNS:
+            column = columns.get(name)
+            setattr(store, name, array(typecode, [_MISSING[typecode]]) * length if column is None else column)
+        store.names = _Interner.of(names)
+        store.parameters = _Interner.of(parameters, [json.dumps(value, sort_keys=True, default=str) for value in parameters])
+        store.extras = extras or {}
+        return store
+
+    @classmethod
+    def of(cls, actions: Union['ActionStore', Sequence[Dict]]) -> 'ActionStore':
+        """The given store, or a new store holding the given action records."""
+        if isinstance(actions, cls):
+            return actions
+        store = cls()
+        for action in actions:
+            store.append(action)
+        return store
+
+    def append(self, record: Dict):
+        """Add one action record, keeping only its columns and rare extra fields."""
+        index = len(self.duration)
+        browser_timings = record.get("browser_timings") or {}
+        network = record.get("network") or {}
+        parameters = record.get("parameters") or {}
+        round_trips = record.get("round_trips")
+        parent_step = record.get("parent_step")
+        thread_id = record.get("thread_id")
+        cpu = as_number(record.get("cpu_usage"), "%")
+        memory = as_number(record.get("memory_usage"), "MB")
+        browser_window = browser_timings.get("browser_window")
+        harness_overhead = browser_timings.get("harness_overhead")
+
+        self.step_order.append(record.get("step_order", index + 1))
+        self.start.append(_epoch(record.get("start_time")))
+        self.duration.append(record["duration"])
+        self.round_trips.append(-1 if round_trips is None else round_trips)
+        self.cpu.append(NAN if cpu is None else cpu)
+        self.memory.append(NAN if memory is None else memory)
+        self.name_ids.append(self.names.intern(record["action"]))
+        self.param_ids.append(
+            self.parameters.intern(parameters, json.dumps(parameters, sort_keys=True, default=str)) if parameters else -1
+        )
+        self.failed.append(1 if record.get("result") == "FAIL" else 0)
+        self.browser_window.append(NAN if browser_window is None else browser_window)
+        self.harness_overhead.append(NAN if harness_overhead is None else harness_overhead)
+        self.requests.append(network.get("requests", -1))
+        self.bytes.append(network.get("bytes", -1))
+        self.first_start.append(network.get("first_start", NAN))
+        self.last_end.append(network.get("last_end", NAN))
+        self.parent_step.append(-1 if parent_step is None else parent_step)
+        self.thread_id.append(-1 if thread_id is None else thread_id)
+        extras = {key: value for key, value in record.items() if key not in _COLUMN_FIELDS}
+        sparse_timings = {key: value for key, value in browser_timings.items() if key not in _TIMING_COLUMNS}
+        if sparse_timings:
+            extras["browser_timings"] = sparse_timings
+        if extras:
+            self.extras[index] = extras
+
+    def __len__(self) -> int:
+        return len(self.duration)
+
+    def __iter__(self) -> Iterator[ActionRecord]:
+        return (ActionRecord(self, index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(position) for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("action index out of range")
+        return ActionRecord(self, index)
+
+    def name(self, index: int) -> str:
+        return self.names.values[self.name_ids[index]]
+
+    def record(self, index: int) -> Dict:
+        """Export one action as a dict, in the same shape as the metrics log records."""
+        record = {
+            "action": self.names.values[self.name_ids[index]],
+            "start_time": datetime.fromtimestamp(self.start[index]).isoformat() if not math.isnan(self.start[index]) else None,
+            "duration": self.duration[index],
+            "parameters": self.parameters.values[self.param_ids[index]] if self.param_ids[index] >= 0 else {},
+            "step_order": self.step_order[index],
+        }
+        if self.parent_step[index] >= 0:
+            record["parent_step"] = self.parent_step[index]
+        if self.thread_id[index] >= 0:
+            record["thread_id"] = self.thread_id[index]
+        if self.round_trips[index] >= 0:
+            record["round_trips"] = self.round_trips[index]
+        record["cpu_usage"] = _optional(self.cpu[index])
+        record["memory_usage"] = _optional(self.memory[index])
+        extras = self.extras.get(index, {})
+        if not math.isnan(self.browser_window[index]) or not math.isnan(self.harness_overhead[index]):
+            record["browser_timings"] = {
+                "browser_window": _optional(self.browser_window[index]),
+                "harness_overhead": _optional(self.harness_overhead[index]),
+                **extras.get("browser_timings", {}),
+            }
+        elif "browser_timings" in extras:
+            record["browser_timings"] = dict(extras["browser_timings"])
+        if self.requests[index] >= 0:
+            record["network"] = {
+                "requests": self.requests[index],
+                "bytes": self.bytes[index],
+                "first_start": _optional(self.first_start[index]),
+                "last_end": _optional(self.last_end[index]),
+            }
+        record["result"] = "FAIL" if self.failed[index] else "PASS"
+        record.update((key, value) for key, value in extras.items() if key != "browser_timings")
+        return record
+
+    def frozen(self) -> 'FrozenActions':
+        """A view of the actions stored so far, unaffected by later appends."""
+        return FrozenActions(self, len(self))
+
+    def to_json(self) -> List[Dict]:
+        return self[:]
+
+    def durations_by_action(self) -> Dict[str, array]:
+        durations: Dict[int, array] = {}
+        for name_id, duration in zip(self.name_ids, self.duration):
+            column = durations.get(name_id)
+            if column is None:
+                column = durations[name_id] = array('d')
+            column.append(duration)
+        return {self.names.values[name_id]: column for name_id, column in durations.items()}
+
+    def to_columnar(self) -> Dict:
+        """The columns as JSON-ready lists (missing values as null), for the HTML report."""
+        return {
+            "length": len(self),
+            "names": list(self.names.values),
+            "columns": {
+                "step_order": self.step_order.tolist(),
+                "action": self.name_ids.tolist(),
+                "start_time": [_optional(value) for value in self.start],
+                "duration": [round(value, 4) for value in self.duration],
+                "round_trips": [value if value >= 0 else None for value in self.round_trips],
+                "browser_window": [_optional(value) for value in self.browser_window],
+                "harness_overhead": [_optional(value) for value in self.harness_overhead],
+                "requests": [value if value >= 0 else None for value in self.requests],
+                "bytes": [value if value >= 0 else None for value in self.bytes],
+                "cpu": [_optional(value) for value in self.cpu],
+                "memory": [_optional(value) for value in self.memory],
+                "result": self.failed.tolist(),
+                "over_budget": [1 if "budget_violations" in self.extras.get(index, ()) else 0 for index in range(len(self))],
+            },
+        }
+
+
+class FrozenActions:
+    """The first `length` actions of a store; lets readers diff against an earlier state."""
+
+    __slots__ = ("store", "length")
+
+    def __init__(self, store: ActionStore, length: int):
+        self.store = store
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[ActionRecord]:
+        return (ActionRecord(self.store, index) for index in range(self.length))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.record(position) for position in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("action index out of range")
+        return ActionRecord(self.store, index)
+
+    def to_json(self) -> List[Dict]:
+        return self[:]
+
+
+def durations_by_action(actions: Union[ActionStore, Sequence[Dict]]) -> Dict[str, array]:
+    """Duration samples per action name, from a store's columns or from plain records."""
+    if isinstance(actions, ActionStore):
+        return actions.durations_by_action()
+    durations: Dict[str, array] = {}
+    for action in actions:
+        durations.setdefault(action["action"], array('d')).append(action["duration"])
+    return durations
+
+
+def json_default(value):
+    """`json.dump` fallback that exports action stores as lists of records."""
+    to_json = getattr(value, "to_json", None)
+    if to_json is not None:
+        return to_json()
+    return str(value)
@@ -0,0 +1,158 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, Optional
+from utils.perf_utils.action_store import COLUMNS, ActionStore, json_default
+from utils.perf_utils.metrics_log import load_metrics_tests, write_snapshot
+
+MAGIC = b"PERFCOL\0"
+FORMAT_VERSION = 1
+BINARY_SUFFIX = "_metrics.pcol"
+# Magic, format version, header length
+_PREFIX = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+def binary_path_for(snapshot_path: str) -> str:
+    """Return the binary snapshot path matching a `_metrics.json` snapshot path."""
+    return snapshot_path[:-len(".json")] + ".pcol" if snapshot_path.endswith(".json") else snapshot_path + ".pcol"
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def write_binary_snapshot(path: str, tests: Dict[str, Dict], suite_name: Optional[str] = None):
+    """Write tests as a versioned columnar file that readers can memory-map.
+
+    Layout: an 8-byte magic, the format version and the length of a JSON
+    header, the header (per test: its scalar fields, interned action names and
+    parameters, sparse extras and the offset of every column), then the raw
+    little-endian columns, each 8-byte aligned. Like JSON snapshots, the file
+    is written to a temporary path and renamed into place.
+    """
+    header_tests = []
+    buffers = []
+    offset = 0
+    for test_name, metrics in tests.items():
+        store = ActionStore.of(metrics.get("actions", []))
+        columns = {}
+        for name, typecode in COLUMNS:
+            column = array(typecode, getattr(store, name))
+            if sys.byteorder != "little":
+                column.byteswap()
+            data = column.tobytes()
+            columns[name] = {"format": typecode, "offset": offset}
+            buffers.append(data + b"\0" * _padding(len(data)))
+            offset += len(data) + _padding(len(data))
+        header_tests.append({
+            "name": test_name,
+            "fields": {key: value for key, value in metrics.items() if key != "actions"},
+            "length": len(store),
+            "names": store.names.values,
+            "parameters": store.parameters.values,
+            "extras": {str(index): extras for index, extras in store.extras.items()},
+            "columns": columns,
+        })
+
+    header = json.dumps({
+        "suite_name": suite_name,
+        "written_at": datetime.now().isoformat(),
+        "tests": header_tests,
+    }, separators=(',', ':'), default=json_default).encode('utf-8')
+    header += b" " * _padding(_PREFIX.size + len(header))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for data in buffers:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_binary_header(path: str) -> Dict:
+    """Read only the header: suite name and per-test fields, without touching any column."""
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+        _check(path, magic, version)
+        return json.loads(f.read(header_length))
+
+
+def _check(path: str, magic: bytes, version: int):
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a binary metrics snapshot.")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"'{path}' uses format version {version}; this reader supports up to {FORMAT_VERSION}.")
+
+
+def read_binary_snapshot(path: str) -> Dict[str, Dict]:
+    """Load per-test metrics with their actions as stores over the file's columns.
+
+    Nothing is parsed per action: each column is copied out of a memory
+    mapping into a typed array in one block. The mapping is closed before
+    returning, so no handle keeps the file open (on Windows an open mapping
+    makes the writer's `os.replace` fail).
+    """
+    tests = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        magic, version, header_length = _PREFIX.unpack_from(mapping, 0)
+        _check(path, magic, version)
+        header = json.loads(mapping[_PREFIX.size:_PREFIX.size + header_length])
+        data_start = _PREFIX.size + header_length
+
+        with memoryview(mapping) as buffer:
+            for test in header["tests"]:
+                columns = {}
+                for name, spec in test["columns"].items():
+                    start = data_start + spec["offset"]
+                    column = array(spec["format"])
+                    with buffer[start:start + test["length"] * column.itemsize] as view:
+                        column.frombytes(view)
+                    if sys.byteorder != "little":
+                        column.byteswap()
+                    columns[name] = column
+                store = ActionStore.from_columns(
+                    columns, test["names"], test["parameters"],
+                    {int(index): extras for index, extras in test["extras"].items()},
+                )
+                tests[test["name"]] = dict(test["fields"], actions=store)
+    return tests
+
+
+def to_binary(source: str, output: Optional[str] = None) -> str:
+    """Convert a JSON snapshot, suite file or JSON Lines log to a binary snapshot."""
+    tests = load_metrics_tests(source)
+    if output is None:
+        base = source[:-1] if source.endswith(".jsonl") else source
+        output = binary_path_for(base)
+    write_binary_snapshot(output, tests)
+    return output
+
+
+def to_json(source: str, output: Optional[str] = None) -> str:
+    """Convert a binary snapshot back to a suite-level JSON metrics file."""
+    header = read_binary_header(source)
+    output = output or (source[:-len(".pcol")] + ".json" if source.endswith(".pcol") else source + ".json")
+    write_snapshot(output, {"suite_name": header.get("suite_name"), "tests": read_binary_snapshot(source)})
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert performance metrics between JSON and the binary columnar snapshot.")
+    parser.add_argument("direction", choices=("to-binary", "to-json"))
+    parser.add_argument("source")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    convert = to_binary if args.direction == "to-binary" else to_json
+    print(f"Written {convert(args.source, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
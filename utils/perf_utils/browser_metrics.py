@@ -0,0 +1,256 @@
+from typing import Dict, List, Optional
+from robot.api import logger
+from utils.perf_utils.network_recorder import NETWORK_ENTRY_TYPES, NetworkRecorder
+from utils.perf_utils.performance_monitor import PerformanceMonitor
+
+# Installed on first use in every page (navigation resets it) and drained once per action.
+# Observers buffer entries in the page; takeRecords() flushes entries not yet delivered.
+# When the page goes away before a drain, its entries are handed to the next page of the tab
+# through sessionStorage (same origin only); `restored` tells the reader that happened.
+DRAIN_SCRIPT = """() => {
+    const MAX_ENTRIES = 2000;
+    const CARRY_KEY = '__uiPerfCarry';
+    const types = ['navigation', 'resource', 'paint', 'largest-contentful-paint', 'layout-shift', 'longtask'];
+    if (!window.__uiPerf) {
+        const state = {entries: [], dropped: 0, observers: [], restored: false};
+        try {
+            const carry = JSON.parse(sessionStorage.getItem(CARRY_KEY) || 'null');
+            sessionStorage.removeItem(CARRY_KEY);
+            if (carry) {
+                // Re-base the previous page's entries on this page's time origin
+                const shift = carry.timeOrigin - performance.timeOrigin;
+                for (const entry of carry.entries) {
+                    entry.startTime += shift;
+                    state.entries.push(entry);
+                }
+                state.dropped += carry.dropped;
+                state.restored = true;
+            }
+        } catch (e) {
+            // Storage unavailable (sandboxed or opaque origin)
+        }
+        const collect = (list) => {
+            for (const entry of list.getEntries()) {
+                if (state.entries.length < MAX_ENTRIES) {
+                    state.entries.push(entry.toJSON());
+                } else {
+                    state.dropped++;
+                }
+            }
+        };
+        for (const type of types) {
+            try {
+                const observer = new PerformanceObserver(collect);
+                observer.observe({type: type, buffered: true});
+                state.observers.push([observer, collect]);
+            } catch (e) {
+                // Entry type not supported by this browser engine
+            }
+        }
+        addEventListener('pagehide', () => {
+            for (const [observer, collect] of state.observers) {
+                collect({getEntries: () => observer.takeRecords()});
+            }
+            try {
+                sessionStorage.setItem(CARRY_KEY, JSON.stringify(
+                    {timeOrigin: performance.timeOrigin, entries: state.entries, dropped: state.dropped}));
+            } catch (e) {
+                // Quota exceeded or storage unavailable: the next drain reports an untracked navigation
+            }
+        });
+        window.__uiPerf = state;
+    }
+    const state = window.__uiPerf;
+    for (const [observer, collect] of state.observers) {
+        collect({getEntries: () => observer.takeRecords()});
+    }
+    const drained = {
+        entries: state.entries,
+        dropped: state.dropped,
+        restored: state.restored,
+        now: performance.now(),
+        timeOrigin: performance.timeOrigin,
+        url: location.href,
+    };
+    state.entries = [];
+    state.dropped = 0;
+    state.restored = false;
+    return drained;
+}"""
+
+
+def summarize_entries(entries: List[Dict]) -> Dict:
+    """Reduce raw Performance API entries to per-action browser timings (milliseconds)."""
+    summary: Dict = {}
+    resources = [entry for entry in entries if entry.get("entryType") == "resource"]
+    long_tasks = [entry for entry in entries if entry.get("entryType") == "longtask"]
+
+    for entry in entries:
+        entry_type = entry.get("entryType")
+        if entry_type == "navigation":
+            summary["navigation"] = {
+                "ttfb": round(entry.get("responseStart", 0) - entry.get("requestStart", 0), 2),
+                "response_end": round(entry.get("responseEnd", 0), 2),
+                "dom_interactive": round(entry.get("domInteractive", 0), 2),
+                "dom_content_loaded": round(entry.get("domContentLoadedEventEnd", 0), 2),
+                "load_event_end": round(entry.get("loadEventEnd", 0), 2),
+                "transfer_size": entry.get("transferSize", 0),
+            }
+        elif entry_type == "paint":
+            summary[entry.get("name", "paint").replace("-", "_")] = round(entry.get("startTime", 0), 2)
+        elif entry_type == "largest-contentful-paint":
+            # Later LCP candidates replace earlier ones
+            summary["largest_contentful_paint"] = round(entry.get("renderTime") or entry.get("startTime", 0), 2)
+        elif entry_type == "layout-shift" and not entry.get("hadRecentInput"):
+            summary["cumulative_layout_shift"] = round(summary.get("cumulative_layout_shift", 0) + entry.get("value", 0), 4)
+
+    if resources:
+        summary["resources"] = {
+            "count": len(resources),
+            "transfer_size": sum(entry.get("transferSize", 0) for entry in resources),
+            "total_duration": round(sum(entry.get("duration", 0) for entry in resources), 2),
+        }
+    if long_tasks:
+        durations = [entry.get("duration", 0) for entry in long_tasks]
+        summary["long_tasks"] = {
+            "count": len(durations),
+            "total_duration": round(sum(durations), 2),
+            # Main-thread time beyond the 50 ms budget of each task
+            "total_blocking_time": round(sum(max(duration - 50, 0) for duration in durations), 2),
+        }
+
+    timed = [entry for entry in entries if "startTime" in entry]
+    if timed:
+        first_start = min(entry["startTime"] for entry in timed)
+        last_end = max(entry["startTime"] + entry.get("duration", 0) for entry in timed)
+        summary["browser_window"] = round(last_end - first_start, 2)
+    return summary
+
+
+def _rebase(entries: List[Dict], time_origin: float, new_origin: float) -> List[Dict]:
+    """Entries with their start times moved from one page's time origin to another's."""
+    shift = time_origin - new_origin
+    return [dict(entry, startTime=entry.get("startTime", 0) + shift) if "startTime" in entry else entry for entry in entries]
+
+
+class BrowserMetricsCollector:
+    """Action collector that reads Web Performance API entries from the current page.
+
+    Entries are buffered in the page by PerformanceObservers and drained with a
+    single JavaScript call when a measured action ends; nothing polls. With
+    `record_network`, navigation/resource entries are also streamed to a
+    per-test HAR-like log, attributed to the action's step order. The page is
+    then drained when an action starts as well, so requests made between
+    actions are logged as unattributed instead of being charged to the next
+    action, and requests made inside a nested action's parent stay with it.
+    """
+
+    def __init__(self, browser, record_network: bool = False):
+        self.browser = browser
+        self.record_network = record_network
+        self._recorders: Dict[str, NetworkRecorder] = {}
+        # Step orders of the open measured actions, innermost last
+        self._open_steps: List[int] = []
+        # Entries drained at an action's start that are not requests, with their page's time origin
+        self._held: List[Dict] = []
+        self._held_origin = 0.0
+        self._held_dropped = 0
+        # Time origin of the page drained last; a new one without restored entries is an untracked navigation
+        self._time_origin: Optional[float] = None
+        self._untracked_navigations = 0
+
+    def _recorder(self) -> NetworkRecorder:
+        monitor = PerformanceMonitor()
+        test_name = monitor.current_test_name()
+        recorder = self._recorders.get(test_name)
+        if recorder is None:
+            recorder = self._recorders[test_name] = NetworkRecorder(monitor.get_artifact_file(test_name, "network.jsonl"))
+        return recorder
+
+    def start_action(self, step_order: int):
+        """With network capture, drain what the page recorded since the last drain; otherwise nothing to do."""
+        if self.record_network:
+            drained = self.drain()
+            if drained:
+                time_origin = drained.get("timeOrigin", 0)
+                entries = drained.get("entries", [])
+                # Between actions nobody is waiting for these requests; inside a parent action they are its own
+                self._recorder().record(self._open_steps[-1] if self._open_steps else None, entries, time_origin)
+                self._hold([entry for entry in entries if entry.get("entryType") not in NETWORK_ENTRY_TYPES],
+                           time_origin, drained.get("dropped", 0))
+        self._open_steps.append(step_order)
+
+    def _hold(self, entries: List[Dict], time_origin: float, dropped: int):
+        if self._held and time_origin != self._held_origin:
+            self._held = _rebase(self._held, self._held_origin, time_origin)
+        self._held.extend(entries)
+        self._held_origin = time_origin
+        self._held_dropped += dropped
+
+    def drain(self) -> Optional[Dict]:
+        """Return (and clear) the entries buffered in the current page."""
+        try:
+            drained = self.browser.evaluate_javascript(None, DRAIN_SCRIPT)
+        except Exception as e:
+            # No page yet, page closing or navigating: there is nothing to read
+            logger.debug(f"Browser metrics not collected: {e}")
+            return None
+        if drained:
+            time_origin = drained.get("timeOrigin")
+            if self._time_origin is not None and time_origin != self._time_origin and not drained.get("restored"):
+                # The previous page went away without handing over its undrained entries (e.g. cross-origin)
+                self._untracked_navigations += 1
+            self._time_origin = time_origin
+        return drained
+
+    def end_action(self, step_order: int, duration: float) -> Optional[Dict]:
+        """Summarize the entries recorded during the action."""
+        if self._open_steps and self._open_steps[-1] == step_order:
+            self._open_steps.pop()
+        drained = self.drain()
+        if not drained:
+            return None
+        time_origin = drained.get("timeOrigin", 0)
+        entries = drained.get("entries", [])
+        dropped = drained.get("dropped", 0)
+        if self._held:
+            entries = _rebase(self._held, self._held_origin, time_origin) + entries
+            dropped += self._held_dropped
+            self._held, self._held_dropped = [], 0
+        browser_timings = summarize_entries(entries)
+        browser_timings["entries"] = len(entries)
+        if dropped:
+            browser_timings["dropped_entries"] = dropped
+        if self._untracked_navigations:
+            browser_timings["untracked_navigations"] = self._untracked_navigations
+            self._untracked_navigations = 0
+        if "browser_window" in browser_timings:
+            # Wall-clock time not covered by any browser activity: Robot, gRPC and Python overhead
+            browser_timings["harness_overhead"] = round(max(duration * 1000 - browser_timings["browser_window"], 0), 2)
+        collected = {"browser_timings": browser_timings}
+
+        if self.record_network:
+            recorder = self._recorder()
+            recorder.record(step_order, drained.get("entries", []), time_origin)
+            network = recorder.summary(step_order)
+            if network:
+                collected["network"] = network
+        return collected
+
+    def end_test(self, test_name: str) -> Optional[Dict]:
+        """Export the test's network log as a HAR file."""
+        # The next test starts on a new page; its first drain is not a navigation of this one
+        self._time_origin = None
+        self._untracked_navigations = 0
+        self._open_steps.clear()
+        self._held, self._held_dropped = [], 0
+        recorder = self._recorders.pop(test_name, None)
+        if recorder is None:
+            return None
+        har_file = recorder.finish()
+        logger.info(f"Network HAR saved to {har_file}")
+        collected = {"network_log": recorder.log_file, "network_har": har_file}
+        if recorder.unattributed:
+            collected["network_unattributed"] = recorder.unattributed
+            logger.info(f"{recorder.unattributed} requests were made between measured actions")
+        return collected
@@ -0,0 +1,99 @@
+import os
+from typing import Dict, List, Optional
+from utils.perf_utils.action_stats import ActionStats
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+BUDGETS_FILE = "perf_budgets.toml"
+FAIL_MODES = ("none", "keyword", "test")
+# Seconds above which report cells are highlighted for actions without a budget
+DEFAULT_DURATION_THRESHOLD = 2
+
+
+class BudgetExceeded(AssertionError):
+    """Raised from a measured keyword whose action exceeded its budget."""
+
+
+class ContinuableBudgetExceeded(BudgetExceeded):
+    """Fails the test but lets it run to the end (Robot Framework continuable failure)."""
+
+    ROBOT_CONTINUE_ON_FAILURE = True
+
+
+class ActionBudget:
+    """Limits for one action name; any limit left as None is not checked."""
+
+    __slots__ = ("p95_duration", "max_duration", "max_memory_mb", "min_samples", "fail")
+
+    def __init__(self, p95_duration: Optional[float] = None, max_duration: Optional[float] = None,
+                 max_memory_mb: Optional[float] = None, min_samples: int = 5, fail: str = "none"):
+        if fail not in FAIL_MODES:
+            raise ValueError(f"Budget 'fail' must be one of {', '.join(FAIL_MODES)}. Given: {fail}")
+        self.p95_duration = p95_duration
+        self.max_duration = max_duration
+        self.max_memory_mb = max_memory_mb
+        self.min_samples = min_samples
+        self.fail = fail
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def check(self, duration: float, stats: ActionStats, memory_mb: float) -> List[Dict]:
+        """Return the violations of one finished action; pure arithmetic on in-memory figures."""
+        violations = []
+        if self.max_duration is not None and duration > self.max_duration:
+            violations.append({"limit": "max_duration", "budget": self.max_duration, "value": duration})
+        # The running p95 is only meaningful once a few samples were collected
+        if self.p95_duration is not None and stats.count >= self.min_samples:
+            p95 = min(max(stats.histogram.percentile(95), stats.min), stats.max)
+            if p95 > self.p95_duration:
+                violations.append({"limit": "p95_duration", "budget": self.p95_duration, "value": p95})
+        if self.max_memory_mb is not None and memory_mb > self.max_memory_mb:
+            violations.append({"limit": "max_memory_mb", "budget": self.max_memory_mb, "value": memory_mb})
+        return violations
+
+
+class Budgets:
+    """Per-action budgets read once from a TOML file.
+
+    ```toml
+    [defaults]
+    max_duration = 10
+
+    [actions."user login in"]
+    p95_duration = 2.0
+    max_memory_mb = 1500
+    fail = "test"    # "none", "keyword" or "test"
+    ```
+
+    Actions without their own table use `[defaults]` when present.
+    """
+
+    def __init__(self, actions: Optional[Dict[str, ActionBudget]] = None, default: Optional[ActionBudget] = None):
+        self.actions = actions or {}
+        self.default = default
+
+    @classmethod
+    def load(cls, path: str) -> "Budgets":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+        defaults = config.get("defaults")
+        actions = {
+            action_name: ActionBudget(**{**(defaults or {}), **limits})
+            for action_name, limits in config.get("actions", {}).items()
+        }
+        return cls(actions, ActionBudget(**defaults) if defaults else None)
+
+    def __bool__(self) -> bool:
+        return bool(self.actions) or self.default is not None
+
+    def for_action(self, action_name: str) -> Optional[ActionBudget]:
+        return self.actions.get(action_name, self.default)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {action_name: budget.to_dict() for action_name, budget in self.actions.items()}
@@ -0,0 +1,68 @@
+import base64
+import gzip
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+from jinja2 import Environment, FileSystemLoader, Template
+from utils.perf_utils.action_store import ActionStore, as_number
+
+# Templates ship with the project, so they are found from any working directory
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'templates')
+REPORT_TEMPLATE = 'performance_report_template.html'
+
+TABLE = "table"
+COLUMNAR = "columnar"
+AUTO = "auto"
+REPORT_MODES = (AUTO, TABLE, COLUMNAR)
+# Above this many actions in a suite, `auto` switches from server-rendered tables to columnar data
+COLUMNAR_THRESHOLD = 2000
+# Embedded data larger than this is gzip-compressed (decoded in the browser with DecompressionStream)
+COMPRESS_THRESHOLD = 256 * 1024
+
+
+@lru_cache(maxsize=None)
+def _environment(template_dir: str) -> Environment:
+    # One environment per directory keeps its compiled templates across reports
+    environment = Environment(loader=FileSystemLoader(template_dir))
+    environment.filters["number"] = as_number
+    return environment
+
+
+def get_template(name: str = REPORT_TEMPLATE, template_dir: str = TEMPLATE_DIR) -> Template:
+    if not os.path.isdir(template_dir):
+        raise FileNotFoundError(f"Template directory '{template_dir}' does not exist.")
+    try:
+        return _environment(template_dir).get_template(name)
+    except Exception as e:
+        raise FileNotFoundError(f"Template '{name}' not found in '{template_dir}'.") from e
+
+
+def resolve_mode(mode: str, action_count: int) -> str:
+    if mode not in REPORT_MODES:
+        raise ValueError(f"Report mode must be one of {', '.join(REPORT_MODES)}. Given: {mode}")
+    if mode == AUTO:
+        return COLUMNAR if action_count > COLUMNAR_THRESHOLD else TABLE
+    return mode
+
+
+def columnar_actions(actions: Union[ActionStore, List[Dict]], waterfall: Optional[Dict[int, List[Dict]]] = None) -> Dict:
+    """One array per field instead of one object per action.
+
+    Action names are stored once in `names` and referenced by index, so a 10k
+    action run costs a few numeric arrays instead of 10k repeated objects.
+    """
+    data = ActionStore.of(actions).to_columnar()
+    # Requests per step order, rendered when an action row is opened
+    data["waterfall"] = {str(step_order): requests for step_order, requests in (waterfall or {}).items()}
+    return data
+
+
+def encode_report_data(data: Dict) -> Dict[str, str]:
+    """Serialize the columnar data for embedding; large payloads are gzip + base64 encoded."""
+    payload = json.dumps(data, separators=(',', ':'))
+    if len(payload) <= COMPRESS_THRESHOLD:
+        # Neutralize "</" so the JSON cannot close its <script> block
+        return {"encoding": "json", "payload": payload.replace("</", "<\\/")}
+    compressed = gzip.compress(payload.encode('utf-8'), compresslevel=6)
+    return {"encoding": "gzip-base64", "payload": base64.b64encode(compressed).decode('ascii')}
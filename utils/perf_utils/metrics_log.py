@@ -0,0 +1,175 @@
+import json
+import os
+from threading import Lock, get_ident
+from typing import Callable, Dict, Iterator, Optional
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.action_store import json_default
+
+# Record types written to the append-only metrics log
+TEST_START = "test_start"
+ACTION = "action"
+TEST_END = "test_end"
+TIMING = "timing"
+# Per-test key holding the accumulator state behind the summary rows, written only to merge inputs
+SUMMARY_STATE = "summary_state"
+
+
+class MetricsLogWriter:
+    """Append-only JSON Lines writer for performance records.
+
+    Every record is a single compact JSON line, so recording an action costs
+    one small write regardless of how many actions were recorded before it.
+    The file is flushed and fsynced every `sync_every` records and on close.
+    """
+
+    def __init__(self, path: str, sync_every: int = 50, truncate: bool = False):
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self._pending = 0
+        self._lock = Lock()
+        self._file = open(path, 'w' if truncate else 'a', encoding='utf-8')
+
+    def append(self, record: Dict):
+        """Append a single record to the log."""
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._pending += 1
+            if self._pending >= self.sync_every:
+                self._sync()
+
+    def flush(self):
+        """Force pending records to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """Flush and close the underlying file."""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def _sync(self):
+        if self._pending and not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+
+def log_path_for(snapshot_path: str) -> str:
+    """Return the JSON Lines log path matching a `_metrics.json` snapshot path."""
+    return snapshot_path + 'l' if snapshot_path.endswith('.json') else snapshot_path + '.jsonl'
+
+
+def read_metrics_log(path: str) -> Iterator[Dict]:
+    """Yield records from a JSON Lines metrics log, skipping a torn trailing line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A writer may be mid-line; the record will be complete on the next read
+                continue
+
+
+def build_stats(actions) -> Dict[str, ActionStats]:
+    """Build the per-action accumulators for a list of action records."""
+    stats = {}
+    for action in actions:
+        stats.setdefault(action["action"], ActionStats()).add(action["duration"])
+    return stats
+
+
+def build_summary(actions) -> Dict:
+    """Build the per-action summary for a list of action records."""
+    return {action_name: action_stats.to_summary() for action_name, action_stats in build_stats(actions).items()}
+
+
+def summary_fields(stats: Dict[str, ActionStats]) -> Dict:
+    """The summary rows of per-action accumulators and, apart from them, the state needed to merge them."""
+    return {
+        "summary": {action_name: action_stats.to_summary() for action_name, action_stats in stats.items()},
+        SUMMARY_STATE: {action_name: action_stats.to_state() for action_name, action_stats in stats.items()},
+    }
+
+
+def summary_stats(metrics: Dict) -> Dict[str, ActionStats]:
+    """Rebuild the per-action accumulators of a test from its summary rows and their state."""
+    states = metrics.get(SUMMARY_STATE, {})
+    return {
+        action_name: ActionStats.from_summary(row, states.get(action_name))
+        for action_name, row in metrics.get("summary", {}).items()
+    }
+
+
+def apply_record(tests: Dict[str, Dict], record: Dict, new_actions: Callable = list):
+    """Fold one log record into a dict of per-test metrics.
+
+    `new_actions` creates the container of a test's actions, e.g. an
+    `ActionStore` for long-lived readers.
+    """
+    record = dict(record)
+    record_type = record.pop("type", None)
+    test_name = record.pop("test_case_id", None)
+    if test_name is None:
+        return
+
+    if record_type == TEST_START:
+        metrics = tests.setdefault(test_name, {"test_case_id": test_name, "actions": new_actions()})
+        metrics.update(record)
+        metrics.setdefault("status", "Running")
+        metrics.setdefault("failures", 0)
+    elif record_type == ACTION:
+        metrics = tests.setdefault(test_name, {"test_case_id": test_name, "actions": new_actions(), "status": "Running"})
+        metrics["actions"].append(record)
+    elif record_type == TEST_END:
+        metrics = tests.setdefault(test_name, {"test_case_id": test_name, "actions": new_actions()})
+        metrics.update(record)
+    elif record_type == TIMING:
+        metrics = tests.setdefault(test_name, {"test_case_id": test_name, "actions": new_actions(), "status": "Running"})
+        metrics.setdefault("timing_samples", []).append({"action": record["name"], "duration": record["duration"]})
+
+
+def rollup_metrics_log(path: str) -> Dict[str, Dict]:
+    """Rebuild per-test metrics dicts (with summaries) from a JSON Lines log."""
+    tests = {}
+    for record in read_metrics_log(path):
+        apply_record(tests, record)
+    for metrics in tests.values():
+        metrics.update(summary_fields(build_stats(metrics["actions"])))
+        if "timing_samples" in metrics:
+            metrics["timings"] = build_summary(metrics.pop("timing_samples"))
+    return tests
+
+
+def write_snapshot(path: str, metrics: Dict):
+    """Write a compact JSON snapshot of metrics.
+
+    The snapshot is written to a temporary file and renamed over the target,
+    so readers see either the previous or the new snapshot, never a torn one.
+    """
+    tmp_path = f"{path}.{os.getpid()}-{get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, separators=(',', ':'), default=json_default)
+    os.replace(tmp_path, path)
+
+
+def load_metrics_tests(path: str, preferred_test: Optional[str] = None) -> Dict[str, Dict]:
+    """Load per-test metrics from a JSON Lines log, a JSON snapshot or a binary snapshot."""
+    if path.endswith('.jsonl'):
+        return rollup_metrics_log(path)
+    if path.endswith('.pcol'):
+        from utils.perf_utils.binary_snapshot import read_binary_snapshot
+        return read_binary_snapshot(path)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        metrics = json.load(f)
+    if "tests" in metrics:
+        # Suite-level file holding several tests (e.g. merged pabot shards)
+        return metrics["tests"]
+    test_name = metrics.get("test_case_id", preferred_test or "N/A")
+    return {test_name: metrics}
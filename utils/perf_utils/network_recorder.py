@@ -0,0 +1,141 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from utils.perf_utils.metrics_log import MetricsLogWriter, read_metrics_log
+
+NETWORK_ENTRY_TYPES = ("navigation", "resource")
+
+
+def _phase(end: float, start: float) -> float:
+    """Duration of a timing phase, -1 when the browser did not report it (HAR convention)."""
+    return round(end - start, 3) if start and end and end >= start else -1
+
+
+def to_har_entry(entry: Dict, time_origin: float, step_order: int) -> Dict:
+    """Convert a Resource/Navigation Timing entry into a compact HAR-like entry.
+
+    Cross-origin responses without a Timing-Allow-Origin header report zero for
+    the detailed phases and sizes; those phases are written as -1.
+    """
+    started = (time_origin + entry.get("startTime", 0)) / 1000
+    secure_start = entry.get("secureConnectionStart", 0)
+    return {
+        "startedDateTime": datetime.fromtimestamp(started, tz=timezone.utc).isoformat(),
+        "time": round(entry.get("duration", 0), 3),
+        "request": {"url": entry.get("name", ""), "initiator": entry.get("initiatorType", entry.get("entryType"))},
+        "response": {
+            "status": entry.get("responseStatus", 0),
+            "bodySize": entry.get("encodedBodySize", 0),
+            "transferSize": entry.get("transferSize", 0),
+            "contentSize": entry.get("decodedBodySize", 0),
+        },
+        "timings": {
+            "blocked": _phase(entry.get("domainLookupStart", 0), entry.get("fetchStart", 0)),
+            "dns": _phase(entry.get("domainLookupEnd", 0), entry.get("domainLookupStart", 0)),
+            "connect": _phase(entry.get("connectEnd", 0), entry.get("connectStart", 0)),
+            "ssl": _phase(entry.get("connectEnd", 0), secure_start) if secure_start else -1,
+            "wait": _phase(entry.get("responseStart", 0), entry.get("requestStart", 0)),
+            "receive": _phase(entry.get("responseEnd", 0), entry.get("responseStart", 0)),
+        },
+        "_step_order": step_order,
+        "_start_offset": round(entry.get("startTime", 0), 3),
+    }
+
+
+class NetworkRecorder:
+    """Streams the requests seen in each measured action to a per-test HAR-like log.
+
+    Entries are appended to `<test>_network.jsonl` as they are drained, so
+    nothing accumulates in Python but each open action's totals; `finish`
+    wraps the log into a `.har` file by streaming it line by line. Requests
+    seen between actions are logged with `_unattributed` and counted.
+    """
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        self._writer = MetricsLogWriter(log_file, sync_every=200, truncate=True)
+        # Per step order: requests, bytes, first start and last end recorded so far
+        self._totals: Dict[int, List[float]] = {}
+        self.unattributed = 0
+
+    def record(self, step_order: Optional[int], entries: List[Dict], time_origin: float) -> int:
+        """Write the network entries seen during an action, or between actions with no step order.
+
+        Returns how many entries were written.
+        """
+        written = 0
+        for entry in entries:
+            if entry.get("entryType") not in NETWORK_ENTRY_TYPES:
+                continue
+            har_entry = to_har_entry(entry, time_origin, step_order or 0)
+            if step_order is None:
+                har_entry["_unattributed"] = True
+            self._writer.append(har_entry)
+            written += 1
+            if step_order is None:
+                continue
+            start = time_origin + entry.get("startTime", 0)
+            end = start + entry.get("duration", 0)
+            totals = self._totals.get(step_order)
+            if totals is None:
+                self._totals[step_order] = [1, entry.get("transferSize", 0), start, end]
+            else:
+                totals[0] += 1
+                totals[1] += entry.get("transferSize", 0)
+                totals[2] = min(totals[2], start)
+                totals[3] = max(totals[3], end)
+        if step_order is None:
+            self.unattributed += written
+        return written
+
+    def summary(self, step_order: int) -> Optional[Dict]:
+        """The network summary of an action, once it has ended; None when it made no requests."""
+        totals = self._totals.pop(step_order, None)
+        if totals is None:
+            return None
+        requests, transferred, first_start, last_end = totals
+        return {
+            "requests": requests,
+            "bytes": transferred,
+            # Epoch milliseconds, so actions can be laid out on one waterfall
+            "first_start": round(first_start, 3),
+            "last_end": round(last_end, 3),
+        }
+
+    def finish(self) -> str:
+        """Close the log and export it as a HAR 1.2 file; returns the HAR path."""
+        self._writer.close()
+        har_file = self.log_file[:-len(".jsonl")] + ".har"
+        with open(har_file, 'w', encoding='utf-8') as f:
+            f.write('{"log":{"version":"1.2","creator":{"name":"UI-Performance-Testing","version":"1.0"},"entries":[')
+            for index, entry in enumerate(read_metrics_log(self.log_file)):
+                f.write(("," if index else "") + json.dumps(entry, separators=(',', ':')))
+            f.write(']}}')
+        return har_file
+
+
+def read_waterfall(log_file: str, max_requests_per_action: int = 50) -> Dict[int, List[Dict]]:
+    """Group the entries of a network log by step order for rendering a waterfall."""
+    waterfall: Dict[int, List[Dict]] = {}
+    if not os.path.exists(log_file):
+        return waterfall
+    for entry in read_metrics_log(log_file):
+        if entry.get("_unattributed"):
+            continue
+        requests = waterfall.setdefault(entry.get("_step_order", 0), [])
+        if len(requests) < max_requests_per_action:
+            requests.append({
+                "url": entry["request"]["url"],
+                "offset": entry.get("_start_offset", 0),
+                "time": entry.get("time", 0),
+                "bytes": entry["response"].get("transferSize", 0),
+                "status": entry["response"].get("status", 0),
+            })
+    for requests in waterfall.values():
+        first = min(request["offset"] for request in requests)
+        for request in requests:
+            request["offset"] = round(request["offset"] - first, 3)
+            request["end"] = round(request["offset"] + request["time"], 3)
+    return waterfall
@@ -1,4 +1,3 @@
-from functools import wraps
 from robot.api.deco import keyword
 from robot.libraries.BuiltIn import BuiltIn
 from utils.perf_utils.performance_library import PerformanceLibrary
@@ -10,11 +9,8 @@ performance_library = PerformanceLibrary()
 def performance_keyword(action_name: str):
     """Decorator to measure performance of a Robot Framework keyword."""
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-                # Use the decorator to wrap the keyword function
-            return performance_library.measure_action_keyword(action_name)(func)(*args, **kwargs)
-        return wrapper
+        # The measuring wrapper is built once here, not on every call
+        return performance_library.measure_action_keyword(action_name)(func)
     return decorator
 
 @keyword("Start Performance Monitoring")
@@ -32,6 +28,19 @@ def save_performance_metrics():
     """Save all collected performance metrics to files."""
     performance_library.save_performance_metrics()
 
+@keyword("Merge Performance Shards")
+def merge_performance_shards(suite_name: Optional[str] = None):
+    """Merge the metric shards written by parallel (pabot) workers into one suite-level file."""
+    return performance_library.merge_performance_shards(suite_name)
+
+@keyword("Check Performance Regressions")
+def check_performance_regressions(last_runs: int = 20, alpha: float = 0.05, min_slowdown: float = 0.10,
+                                  fail_on_regression: bool = True):
+    """Compare action durations with the last stored runs (Mann-Whitney U) and fail on significant slowdowns.
+
+    Run it after `Save Performance Metrics`, which stores the run history."""
+    return performance_library.check_performance_regressions(last_runs, alpha, min_slowdown, fail_on_regression)
+
 @keyword("Generate Performance Report")
 def generate_performance_report(test_name: str) -> Dict:
     """Generate a performance report for a specific test."""
@@ -48,6 +57,35 @@ def generate_html_performance_report(suite_name: str):
     BuiltIn().log(f"HTML Performance Report saved to {report_file}")
     return report_file
 
+@keyword("Generate Performance Rollup Report")
+def generate_performance_rollup_report():
+    """Generate a cross-suite report (slowest actions, failure correlation, per-test timelines) from every saved suite."""
+    return performance_library.generate_performance_rollup_report()
+
+@keyword("Export Binary Performance Metrics")
+def export_binary_performance_metrics(suite_name: str = None):
+    """Write the suite's metrics as a columnar binary snapshot that the dashboard and reports load without parsing."""
+    return performance_library.export_binary_performance_metrics(suite_name)
+
+@keyword("Export Performance Trace")
+def export_performance_trace(suite_name: str = None):
+    """Write the run's tests and nested actions as a Chrome Trace Event file to open in Perfetto or chrome://tracing."""
+    return performance_library.export_performance_trace(suite_name)
+
+@keyword("Set Performance Recording Mode")
+def set_performance_recording_mode(mode: str):
+    """Record actions in `full` mode or in `lean` mode, which queues them per thread and records them in the background."""
+    performance_library.set_performance_recording_mode(mode)
+
+@keyword("Enable Action Profiling")
+def enable_action_profiling(mode: str = "sampling", *actions: str, threshold: float = None, percentile: float = None,
+                            interval: float = 0.005):
+    """Profile the named actions (all actions when none are named) and keep the profiles of slow ones.
+
+    `mode` is `sampling`, `cprofile` or `none`. A profile is kept when the action took at least `threshold`
+    seconds or at least the `percentile` of its earlier durations; it is written as collapsed stacks."""
+    performance_library.enable_action_profiling(mode, list(actions), threshold, percentile, interval)
+
 @keyword("Enable Performance Monitoring")
 def enable_performance_monitoring(enable: bool):
     """Enable or disable performance monitoring."""
@@ -19,18 +19,69 @@ class PerformanceLibrary:
         
     def measure_action_keyword(self, action_name: str, user_id: Optional[str] = None, parameters: Optional[dict] = None):
         """Decorator for Robot Framework keywords to measure performance"""
+        monitor = self.monitor
+
         def decorator(func):
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
-                with self.monitor.measure_action(action_name, user_id, parameters):
+                # Disabled monitoring costs one attribute check; lean mode skips the context manager
+                if not monitor.enabled:
+                    return func(*args, **kwargs)
+                if monitor.lean:
+                    return monitor.call_measured(action_name, parameters, func, args, kwargs)
+                with monitor.measure_action(action_name, user_id, parameters):
                     return func(*args, **kwargs)
             return wrapper
         return decorator
+
+    def set_performance_recording_mode(self, mode: str):
+        """Record actions in full or lean mode"""
+        self.monitor.set_recording_mode(mode)
     
+    def enable_action_profiling(self, mode: str = "sampling", actions: Optional[list] = None, threshold: Optional[float] = None,
+                                percentile: Optional[float] = None, interval: float = 0.005):
+        """Profile measured actions and keep the profiles of slow ones"""
+        self.monitor.enable_profiling(mode, actions, threshold, percentile, interval)
+
     def save_performance_metrics(self):
         """Save all collected metrics to file"""
         self.monitor.save_metrics()
         
+    def merge_performance_shards(self, suite_name: Optional[str] = None):
+        """Merge per-worker metric shards into one suite-level file"""
+        return self.monitor.merge_metric_shards(suite_name)
+
+    def check_performance_regressions(self, last_runs: int = 20, alpha: float = 0.05, min_slowdown: float = 0.10,
+                                      fail_on_regression: bool = True):
+        """Compare this run with the stored baseline and fail when an action got significantly slower"""
+        results = self.monitor.compare_with_baseline(last_runs=last_runs, alpha=alpha, min_slowdown=min_slowdown)
+        regressions = [row for row in results if row["status"] == "regression"]
+        for row in regressions:
+            logger.warn(
+                f"Performance regression in '{row['test']}' / '{row['action']}': median "
+                f"{row['median_current']:.3f}s vs {row['median_baseline']:.3f}s ({row['slowdown']:+.0%}), "
+                f"effect size {row['effect_size']:.2f}, q={row['q_value']:.4f}"
+            )
+        logger.info(f"Checked {len(results)} actions against the last {last_runs} runs: {len(regressions)} regressions")
+        if regressions and fail_on_regression:
+            raise AssertionError(
+                f"{len(regressions)} action(s) regressed: "
+                + ", ".join(f"{row['action']} ({row['slowdown']:+.0%})" for row in regressions)
+            )
+        return results
+
+    def generate_performance_rollup_report(self):
+        """Generate the cross-suite rollup report of the results directory"""
+        return self.monitor.generate_rollup_report()
+
+    def export_binary_performance_metrics(self, suite_name: str = None):
+        """Write the suite's metrics as a memory-mappable binary snapshot"""
+        return self.monitor.export_binary_snapshot(suite_name)
+
+    def export_performance_trace(self, suite_name: str = None):
+        """Write the recorded actions as a Chrome Trace Event file"""
+        return self.monitor.export_chrome_trace(suite_name)
+
     def generate_performance_report(self, test_name: str):
         """Generate and return performance report"""
         return self.monitor.generate_report(test_name)
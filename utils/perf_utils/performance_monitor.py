@@ -3,14 +3,56 @@ import json
 import os
 import platform
 import psutil
+from collections import deque
 from robot import version
 from datetime import datetime
-from typing import Optional, Dict
-from threading import Lock, local
+from typing import Optional, Dict, List, Tuple
+from threading import Event, Lock, Thread, current_thread, get_native_id, local, main_thread
 from contextlib import contextmanager
 from robot.api import logger
 from robot.libraries.BuiltIn import BuiltIn
-from jinja2 import Environment, FileSystemLoader
+from utils.perf_utils.action_profiler import COLLAPSED_SUFFIX, ActionProfiler
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.action_store import ActionStore, durations_by_action, json_default
+from utils.perf_utils.binary_snapshot import binary_path_for, write_binary_snapshot
+from utils.perf_utils.budgets import (
+    BUDGETS_FILE, DEFAULT_DURATION_THRESHOLD, Budgets, BudgetExceeded, ContinuableBudgetExceeded,
+)
+from utils.perf_utils.html_report import AUTO, COLUMNAR, columnar_actions, encode_report_data, get_template, resolve_mode
+from utils.perf_utils.metrics_log import (
+    ACTION, TEST_END, TEST_START, TIMING, MetricsLogWriter, load_metrics_tests, log_path_for, summary_fields,
+    write_snapshot,
+)
+from utils.perf_utils.process_tracker import ROLES, ProcessTreeTracker
+from utils.perf_utils.regression import REGRESSION, compare_distributions
+from utils.perf_utils.resource_sampler import ResourceSampler
+from utils.perf_utils.run_store import RunStore, default_run_store_path
+from utils.perf_utils.network_recorder import read_waterfall
+from utils.perf_utils.shard_merge import (
+    find_shard_logs, merge_shards, merged_metrics_file, run_label, safe_name, shard_metrics_file,
+)
+from utils.perf_utils.spans import TRACE_SUFFIX, span_times, write_chrome_trace
+from utils.perf_utils.suite_rollup import SuiteAggregator, generate_rollup_report, write_rollup, write_suite_metrics
+
+FULL = "full"
+LEAN = "lean"
+RECORDING_MODES = (FULL, LEAN)
+
+def _action_count(tests: Dict[str, Dict]) -> int:
+    return sum(len(metrics.get("actions", [])) for metrics in tests.values())
+
+
+def _process_tree_usage(resources: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """Mean CPU % and RSS (MB) of the Python/Node/browser process tree during an action.
+
+    None when the sampler had no sample yet: not measured, rather than zero usage.
+    """
+    if not resources.get("samples"):
+        return None, None
+    cpu_usage = round(sum(resources.get(f"{role}_cpu", {}).get("mean", 0.0) for role in ROLES), 2)
+    memory_usage = round(sum(resources.get(f"{role}_rss_mb", {}).get("mean", 0.0) for role in ROLES), 2)
+    return cpu_usage, memory_usage
+
 
 class PerformanceMonitor:
     """Singleton class for managing performance monitoring."""
@@ -25,32 +67,373 @@ class PerformanceMonitor:
 
     def _init_monitor(self):
         self._metrics = {}
+        self._stats = {}
+        self._timing_stats = {}
         self._local = local()
         self._lock = Lock()
+        self._log_writers = {}
+        # Suite and log writer of every test session, fixed when the session starts
+        self._session_suites = {}
+        self._session_writers = {}
+        # Sessions whose actions bypass the action collectors (e.g. load test virtual users)
+        self._sessions_without_collectors = set()
+        self._collectors = {}
+        self._sampler = None
+        self._budgets = None
+        self._profiler = None
+        # Values that take precedence over the Robot Framework variables of the same name, see `set_variable`
+        self._variables = {}
+        # Action start times are read from the monotonic clock and placed on the wall clock through this anchor
+        self._clock_anchor = (time.time(), time.perf_counter())
+        # Clock cost inside every measured window; None unless ${PERF_SUBTRACT_OVERHEAD} enabled the correction
+        self._overhead_floor = None
+        # Lean recording mode: finished actions wait in per-thread queues until the flusher thread records them
+        self._lean = False
+        self._lean_buffers = []
+        self._drain_lock = Lock()
+        self._flusher = None
+        self._flusher_stop = Event()
+        self._flush_interval = 0.5
+        # Budget warnings raised off the main thread, where Robot drops log messages; logged by the main thread
+        self._pending_warnings = []
+        # Per-action records are only formatted for the Robot log when it keeps DEBUG messages
+        self._log_actions = False
+        # Identifies this run in the history store unless ${PERF_RUN_ID} is shared (e.g. by pabot workers)
+        self._run_key = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self._shard_run_id: Optional[str] = None
         self._is_performance_monitoring_enabled = False
 
     def enable_monitoring(self, enable: bool):
         """Enable or disable performance monitoring"""
         self._is_performance_monitoring_enabled = enable
+        if not enable:
+            self._stop_flusher()
+            self._stop_sampler()
 
-    def _get_results_dir(self) -> str:
-        """Get results directory from Robot Framework variables."""
+    @property
+    def enabled(self) -> bool:
+        """Whether actions are measured at all; wrappers check it before doing any work."""
+        return self._is_performance_monitoring_enabled
+
+    @property
+    def lean(self) -> bool:
+        """Whether actions are recorded in lean mode, see `set_recording_mode`."""
+        return self._lean
+
+    def set_recording_mode(self, mode: str):
+        """Record actions in `full` mode (the default) or in `lean` mode.
+
+        In lean mode a measured action only reads the clock and appends a tuple
+        to a queue of its own thread; a background thread turns the queued
+        tuples into action records every `${PERF_FLUSH_INTERVAL}` seconds.
+        Action collectors and the per-process report are skipped, and budget
+        violations never fail the keyword: they are recorded on the action and
+        warned about when the test ends or the metrics are saved.
+        """
+        mode = str(mode).lower()
+        if mode not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode '{mode}', expected one of {', '.join(RECORDING_MODES)}")
+        if self._lean and mode != LEAN:
+            self._stop_flusher()
+        self._lean = mode == LEAN
+        if self._lean:
+            self._flush_interval = float(self._get_variable("${PERF_FLUSH_INTERVAL}", self._flush_interval))
+            self._ensure_flusher()
+
+    def set_variable(self, name: str, value):
+        """Set a variable such as `${RESULTS_DIR}` for this monitor, over the Robot Framework variable of that name.
+
+        Lets tools outside a Robot Framework run (e.g. the benchmarks) send
+        metrics, reports and the run history somewhere other than `./results`.
+        """
+        self._variables[name] = value
+
+    def _get_variable(self, name: str, default=None):
+        """Get a Robot Framework variable, falling back to a default outside of a run."""
+        if name in self._variables:
+            return self._variables[name]
         try:
-            results_dir = BuiltIn().get_variable_value("${RESULTS_DIR}")
-            if results_dir:
-                return results_dir
+            return BuiltIn().get_variable_value(name, default)
         except Exception:
-            pass  # Fall back to default if variable is not set
+            return default
+
+    def _ensure_sampler(self) -> ResourceSampler:
+        """Start the background resource sampler on first use."""
+        if self._sampler is None:
+            collect_uss = str(self._get_variable("${PERF_COLLECT_USS}", "False")).lower() == "true"
+            self._sampler = ResourceSampler(
+                rate_hz=float(self._get_variable("${PERF_SAMPLE_RATE_HZ}", 20)),
+                buffer_seconds=float(self._get_variable("${PERF_SAMPLE_BUFFER_SECONDS}", 600)),
+                tracker=ProcessTreeTracker(collect_uss=collect_uss),
+            )
+        self._sampler.start()
+        return self._sampler
+
+    def _ensure_budgets(self) -> Budgets:
+        """Load the action budgets once, so checking them costs no I/O during the run."""
+        if self._budgets is None:
+            path = self._get_variable("${PERF_BUDGETS}", None) or os.path.join(os.getcwd(), BUDGETS_FILE)
+            self._budgets = Budgets.load(path)
+            if self._budgets:
+                logger.info(f"Loaded performance budgets from {path}")
+        return self._budgets
+
+    def enable_profiling(self, mode: Optional[str], actions: Optional[List[str]] = None, threshold: Optional[float] = None,
+                         percentile: Optional[float] = None, interval: float = 0.005) -> Optional[ActionProfiler]:
+        """Profile measured actions (all of them, or only `actions`) and keep the profiles of slow ones.
+
+        `mode` is `sampling` or `cprofile`; None or `none` turns profiling off.
+        Without `threshold` and `percentile`, profiles of actions slower than
+        the report's default duration threshold are kept. Kept profiles are
+        written as collapsed stacks and linked from the action's `profile` entry.
+        """
+        if mode is None or str(mode).lower() == "none":
+            self._profiler = None
+            return None
+        if threshold is None and percentile is None:
+            threshold = DEFAULT_DURATION_THRESHOLD
+        self._profiler = ActionProfiler(str(mode).lower(), actions or (), threshold, percentile, interval)
+        logger.info(f"Profiling {', '.join(actions) if actions else 'all actions'} in {self._profiler.mode} mode")
+        return self._profiler
+
+    def _ensure_profiler(self):
+        """Set up profiling from `${PERF_PROFILE}` and its companion variables, once."""
+        if self._profiler is not None:
+            return
+        mode = self._get_variable("${PERF_PROFILE}", None)
+        if not mode:
+            return
+        actions = self._get_variable("${PERF_PROFILE_ACTIONS}", None) or []
+        if isinstance(actions, str):
+            actions = [action.strip() for action in actions.split(",") if action.strip()]
+        threshold = self._get_variable("${PERF_PROFILE_THRESHOLD}", None)
+        percentile = self._get_variable("${PERF_PROFILE_PERCENTILE}", None)
+        self.enable_profiling(
+            mode, list(actions),
+            float(threshold) if threshold is not None else None,
+            float(percentile) if percentile is not None else None,
+            float(self._get_variable("${PERF_PROFILE_INTERVAL}", 0.005)),
+        )
+
+    def _finish_profile(self, token, action_name: str, step_order: int, duration: float) -> Optional[Dict]:
+        """Stop an action's profiler and write its profile when the action was slow enough."""
+        stacks, profile = self._profiler.stop(token)
+        test_name = self._local.test_info['test_name']
+        with self._lock:
+            # The action's earlier durations; this one is added after the decision
+            keep = self._profiler.should_keep(duration, self._stats.get(test_name, {}).get(action_name))
+        if not keep:
+            return None
+        path = self.get_artifact_file(test_name, f"step{step_order}_{safe_name(action_name)}{COLLAPSED_SUFFIX}")
+        try:
+            return self._profiler.save(path, stacks, profile)
+        except OSError as e:
+            logger.warn(f"Could not write the profile of '{action_name}' to {path}: {e}")
+            return None
+
+    def get_budgets(self) -> Budgets:
+        """The loaded action budgets (empty when no budgets file exists)."""
+        return self._ensure_budgets()
+
+    def _test_report_data(self, metrics: Dict, mode: str) -> Dict:
+        """Template context of one test; in columnar mode its actions are embedded as compact arrays."""
+        actions = metrics.get("actions", [])
+        waterfall = read_waterfall(metrics["network_log"]) if metrics.get("network_log") else {}
+        data = {
+            "test_case_id": metrics.get("test_case_id", "N/A"),
+            "start_time": metrics.get("start_time", "N/A"),
+            "status": metrics.get("status", "N/A"),
+            "summary": metrics.get("summary", {}),
+            "timings": metrics.get("timings", {}),
+            "action_count": len(actions),
+            "total_bytes": sum(action.get("network", {}).get("bytes", 0) for action in actions),
+            "budgets": self._report_budgets(metrics.get("summary", {})),
+            "span_times": span_times(actions),
+            "budget_violations": [action for action in actions if action.get("budget_violations")],
+            "profiles": self._report_profiles(actions),
+        }
+        if mode == COLUMNAR:
+            data["data"] = encode_report_data(columnar_actions(actions, waterfall))
+        else:
+            data["actions"] = actions
+            data["waterfall"] = waterfall
+        return data
+
+    def _report_profiles(self, actions) -> List[Dict]:
+        """The kept profiles of a test, with links relative to the report in the results directory."""
+        results_dir = self._get_results_dir()
+        profiles = []
+        for action in actions:
+            profile = action.get("profile")
+            if not profile:
+                continue
+            profiles.append({
+                "step_order": action["step_order"],
+                "action": action["action"],
+                "duration": action["duration"],
+                "mode": profile.get("mode"),
+                "weight": profile.get("weight", 0),
+                "unit": profile.get("unit", ""),
+                "href": os.path.relpath(profile["file"], results_dir),
+                "pstats_href": os.path.relpath(profile["pstats"], results_dir) if profile.get("pstats") else None,
+            })
+        return profiles
+
+    def _report_budgets(self, summary: Dict) -> Dict[str, Dict]:
+        """The budget of every summarized action that has one (its own table or the defaults)."""
+        budgets = self._ensure_budgets()
+        report = {}
+        for action_name in summary:
+            budget = budgets.for_action(action_name)
+            if budget is not None:
+                report[action_name] = budget.to_dict()
+        return report
+
+    def refresh_process_tree(self):
+        """Re-scan the tracked process tree, e.g. after a browser was opened or closed."""
+        if self._sampler is not None:
+            self._sampler.tracker.invalidate()
+
+    def register_action_collector(self, name: str, collector):
+        """Register an object whose `start_action(step_order)` / `end_action(step_order, duration)`
+        hooks run around every measured action; the dict returned by `end_action` is merged
+        into the action record. An optional `end_test(test_name)` hook runs when a test session
+        ends. Registering the same name again replaces the collector."""
+        self._collectors[name] = collector
+
+    def get_action_collector(self, name: str):
+        """Return the collector registered under `name`, if any."""
+        return self._collectors.get(name)
+
+    def unregister_action_collector(self, name: str):
+        """Remove a previously registered action collector."""
+        self._collectors.pop(name, None)
+
+    def _collect_action_start(self, step_order: int):
+        for name, collector in list(self._collectors.items()):
+            try:
+                collector.start_action(step_order)
+            except Exception as e:
+                logger.debug(f"Collector {name} failed at action start: {e}")
+
+    def _collect_action_end(self, step_order: int, duration: float) -> Dict:
+        collected = {}
+        for name, collector in list(self._collectors.items()):
+            try:
+                collected.update(collector.end_action(step_order, duration) or {})
+            except Exception as e:
+                logger.debug(f"Collector {name} failed at action end: {e}")
+        return collected
+
+    def _collect_test_end(self, test_name: str) -> Dict:
+        collected = {}
+        for name, collector in list(self._collectors.items()):
+            end_test = getattr(collector, "end_test", None)
+            if end_test is None:
+                continue
+            try:
+                collected.update(end_test(test_name) or {})
+            except Exception as e:
+                logger.debug(f"Collector {name} failed at test end: {e}")
+        return collected
+
+    def latest_resource_sample(self) -> Dict:
+        """Return the most recent resource sample, or an empty dict when nothing was sampled."""
+        latest = self._sampler.latest() if self._sampler else None
+        return latest or {}
+
+    def _stop_sampler(self):
+        """Stop the background resource sampler if it is running."""
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def _get_results_dir(self) -> str:
+        """Get results directory from Robot Framework variables."""
+        results_dir = self._get_variable("${RESULTS_DIR}")
+        if results_dir:
+            return results_dir
 
         # Default results directory
         return os.path.join(os.getcwd(), "results")
 
+    def _get_suite_name(self) -> str:
+        """Get the current suite name from Robot Framework variables."""
+        return self._get_variable("${SUITE_NAME}", "default_suite")
+
+    def _get_worker_id(self) -> Optional[str]:
+        """Get the pabot worker id, or None when metrics are not collected in shards."""
+        worker_id = self._get_variable("${PABOTEXECUTIONPOOLID}") or self._get_variable("${PABOTQUEUEINDEX}")
+        if worker_id is None and str(self._get_variable("${PERF_SHARD_MODE}", "False")).lower() == "true":
+            worker_id = "0"
+        return worker_id
+
+    def _get_shard_run_id(self) -> str:
+        """Id shared by every worker of this run, so shards left by earlier runs are never merged into it."""
+        if self._shard_run_id is None:
+            run_id = self._get_variable("${PERF_RUN_ID}", None) or os.getenv("PERF_RUN_ID")
+            if run_id is None and (self._get_variable("${PABOTEXECUTIONPOOLID}") or self._get_variable("${PABOTQUEUEINDEX}")) is not None:
+                # pabot starts every worker of a run from its own process
+                try:
+                    parent = psutil.Process(os.getppid())
+                    run_id = f"{parent.pid}-{datetime.fromtimestamp(parent.create_time()).strftime('%Y%m%dT%H%M%S')}"
+                except psutil.Error:
+                    run_id = None
+            self._shard_run_id = str(run_id or self._run_key)
+        return self._shard_run_id
+
+    def _get_metrics_file(self, suite_name: Optional[str] = None, test_name: Optional[str] = None) -> str:
+        """Get the snapshot metrics file path for a suite, or for this worker's shard of a test."""
+        suite_name = suite_name or self._session_suites.get(test_name) or self._get_suite_name()
+        worker_id = self._get_worker_id()
+        if worker_id is not None and test_name is not None:
+            return shard_metrics_file(self._get_results_dir(), suite_name, self._get_shard_run_id(), worker_id,
+                                      os.getpid(), test_name)
+        return os.path.join(self._get_results_dir(), f"{suite_name}_metrics.json")
+
+    def get_artifact_file(self, test_name: str, suffix: str) -> str:
+        """Path of a per-test artifact (e.g. a network log) next to the test's metrics."""
+        metrics_file = self._get_metrics_file(test_name=test_name)
+        if os.path.dirname(metrics_file) != self._get_results_dir():
+            # Shard mode: keep artifacts next to the worker's shard
+            return metrics_file[:-len("_metrics.json")] + f"_{suffix}"
+        suite_name = self._session_suites.get(test_name) or self._get_suite_name()
+        return os.path.join(self._get_results_dir(), f"{safe_name(suite_name)}_{safe_name(test_name)}_{suffix}")
+
+    def current_test_name(self) -> str:
+        """Name of the test session active in the current thread."""
+        self._ensure_test_info()
+        return self._local.test_info['test_name']
+
+    def _get_log_writer(self, test_name: Optional[str] = None) -> MetricsLogWriter:
+        """Get the append-only log writer of a test session, or of the current suite (or shard)."""
+        writer = self._session_writers.get(test_name)
+        if writer is None:
+            writer = self._open_log_writer(log_path_for(self._get_metrics_file(test_name=test_name)))
+        return writer
+
+    def _open_log_writer(self, log_file: str) -> MetricsLogWriter:
+        """Get the writer of a log file, opening it on first use."""
+        writer = self._log_writers.get(log_file)
+        if writer is None:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            # The first open in this process starts a fresh log for the run
+            writer = MetricsLogWriter(log_file, truncate=True)
+            self._log_writers[log_file] = writer
+        return writer
+
+    def _flush_logs(self):
+        """Flush all open metrics logs to disk."""
+        for writer in self._log_writers.values():
+            writer.flush()
+
     def _get_system_info(self) -> Dict:
-        """Retrieve system information."""
+        """Retrieve system information without blocking on a CPU measurement interval."""
+        latest = self._sampler.latest() if self._sampler else None
+        cpu = latest["system_cpu"] if latest else psutil.cpu_percent(interval=None)
         return {
             "os": platform.system(),
             "os_version": platform.version(),
-            "cpu": f"{psutil.cpu_percent(interval=1)}%",  # Get CPU usage as a percentage
+            "cpu": f"{cpu}%",  # Get CPU usage as a percentage
             "memory": f"{round(psutil.virtual_memory().total / (1024 ** 3), 2)} GB",  # Total memory in GB
         }
 
@@ -68,6 +451,8 @@ class PerformanceMonitor:
             "python_version": platform.python_version(),
             "browser": browser_type,
             "headless_mode": headless_mode.lower() == "true",
+            "pid": os.getpid(),
+            "worker_id": self._get_worker_id(),
         }
 
     def _ensure_test_info(self):
@@ -78,10 +463,25 @@ class PerformanceMonitor:
                 'test_start_time': None,
                 'step_order': 0,
                 'failures': 0,
+                'round_trips': 0,
+                # [step order, instrumentation time of nested actions] of the measured actions
+                # currently open in this thread, outermost first
+                'span_stack': [],
+                'thread_id': get_native_id(),
+                # Lean mode queue of this thread's finished actions, registered on first use
+                'lean_buffer': None,
+                # Metrics log of the active session, resolved once in `start_test_session`
+                'log_writer': None,
+                'collectors': True,
             }
 
-    def start_test_session(self, test_name: str):
-        """Start a new test session."""
+    def start_test_session(self, test_name: str, collectors: bool = True):
+        """Start a new test session.
+
+        With `collectors` False the registered action collectors are not run for
+        the session, e.g. for a virtual user whose page is not the one the
+        collectors observe.
+        """
         if not self._is_performance_monitoring_enabled:
             logger.info(f"Performance monitoring is disabled for tests {test_name}")
             return
@@ -89,9 +489,29 @@ class PerformanceMonitor:
         self._local.test_info['test_name'] = test_name
         self._local.test_info['test_start_time'] = datetime.now()
         self._local.test_info['failures'] = 0  # Reset failures for new test
+        self._local.test_info['collectors'] = collectors
+        self._ensure_sampler()
+        self._ensure_budgets()
+        self._ensure_profiler()
+        self._log_actions = str(self._get_variable("${LOG LEVEL}", "INFO")).upper() in ("DEBUG", "TRACE")
+        mode = self._get_variable("${PERF_RECORDING_MODE}", None)
+        if mode is not None and str(mode).lower() != (LEAN if self._lean else FULL):
+            self.set_recording_mode(mode)
+        if self._overhead_floor is None and str(self._get_variable("${PERF_SUBTRACT_OVERHEAD}", "False")).lower() == "true":
+            self.calibrate_overhead()
 
+        # A session keeps the suite it started in: nested suites running its actions
+        # still write them to its log, and the variable lookups happen only here
+        suite_name = self._session_suites.get(test_name) or self._get_suite_name()
+        log_file = log_path_for(self._get_metrics_file(suite_name, test_name))
         with self._lock:
+            if collectors:
+                self._sessions_without_collectors.discard(test_name)
+            else:
+                self._sessions_without_collectors.add(test_name)
             if test_name not in self._metrics:
+                self._session_suites[test_name] = suite_name
+                self._session_writers[test_name] = self._open_log_writer(log_file)
                 system_info = self._get_system_info()
                 logger.info(f"System Info: {json.dumps(system_info, indent=2)}")
                 execution_context = self._get_execution_context()
@@ -100,102 +520,384 @@ class PerformanceMonitor:
                 self._metrics[test_name] = {
                     "test_case_id": test_name,
                     "start_time": datetime.now().isoformat(),
-                    "actions": [],
+                    "actions": ActionStore(),
                     "system_info": system_info,
                     "execution_context": execution_context,
                     "status": "Running",
                     "failures": 0,
                 }
-                print("self._metrics[test_name]:", json.dumps(self._metrics[test_name], indent=4))
+                self._get_log_writer(test_name).append({
+                    "type": TEST_START,
+                    "test_case_id": test_name,
+                    "start_time": self._metrics[test_name]["start_time"],
+                    "system_info": system_info,
+                    "execution_context": execution_context,
+                    "status": "Running",
+                })
+            self._local.test_info['log_writer'] = self._session_writers[test_name]
 
     @contextmanager
     def measure_action(self, action_name: str, user_id: Optional[str] = None, params: Optional[Dict] = None):
-        """Context manager to measure action duration and save incrementally."""
+        """Context manager to measure action duration and append it to the metrics log."""
         if not self._is_performance_monitoring_enabled:
             yield
             return
+        if self._lean:
+            token = self._lean_start(params)
+            try:
+                yield
+            finally:
+                self._lean_end(action_name, token)
+            return
+        enter_time = time.perf_counter()
         self._ensure_test_info()
         self._local.test_info['step_order'] += 1
         step_order = self._local.test_info['step_order']
+        span_stack = self._local.test_info['span_stack']
+        parent_step = span_stack[-1][0] if span_stack else None
 
-        logger.info(f"Measuring action: {action_name} - Step Order: {step_order}")
+        if self._log_actions:
+            logger.debug(f"Measuring action: {action_name} - Step Order: {step_order}")
+        # Latest per-process figures from the sampler thread; a reference, not a psutil call
+        processes_at_start = self._sampler.tracker.latest if self._sampler else {}
+        round_trips_at_start = self._local.test_info['round_trips']
+        use_collectors = self._local.test_info['collectors']
+        if use_collectors:
+            self._collect_action_start(step_order)
+        span = [step_order, 0.0]
+        span_stack.append(span)
+        # Actions that are not profiled skip this; the sampler thread sleeps while nothing is profiled
+        profile_token = self._profiler.start(action_name) if self._profiler is not None else None
         start_time = time.perf_counter()
         try:
             yield
         finally:
             end_time = time.perf_counter()
             duration = end_time - start_time
+            span_stack.pop()
+            overhead = None
+            if self._overhead_floor is not None:
+                # Nested actions' bookkeeping ran inside this window; it is not the keyword's time
+                overhead = min(duration, self._overhead_floor + span[1])
+                duration -= overhead
+            start_epoch = self._clock_anchor[0] + (start_time - self._clock_anchor[1])
+            profile = self._finish_profile(profile_token, action_name, step_order, duration) if profile_token is not None else None
+            # Collectors run after the clock stopped so they never inflate the duration
+            collected = self._collect_action_end(step_order, duration) if use_collectors else {}
+            # Resource figures come from the background sampler, never from psutil calls here
+            resources = self._sampler.window_stats(start_time, end_time) if self._sampler else {"samples": 0}
+            processes = self._sampler.tracker.action_report(processes_at_start, self._sampler.tracker.latest) if self._sampler else []
+            cpu_usage, memory_usage = _process_tree_usage(resources)
 
             action_data = {
                 "action": action_name,
-                "start_time": datetime.now().isoformat(),
+                "start_time": datetime.fromtimestamp(start_epoch).isoformat(),
                 "duration": duration,
                 "parameters": params or {},
                 "step_order": step_order,
-                "cpu_usage": f"{psutil.cpu_percent()}%",
-                "memory_usage": f"{psutil.virtual_memory().used / (1024 ** 2):.2f} MB",
+                # Span tree: the enclosing measured action of the same thread, if any
+                "parent_step": parent_step,
+                "thread_id": self._local.test_info['thread_id'],
+                # Includes the round trips of nested measured actions
+                "round_trips": self._local.test_info['round_trips'] - round_trips_at_start,
+                # Numbers, not display strings: percent of one core and MB (None when nothing was sampled)
+                "cpu_usage": cpu_usage,
+                "memory_usage": memory_usage,
+                "resources": resources,
+                "processes": processes,
+                **collected,
                 "result": "FAIL" if self._local.test_info['step_order'] <= self._local.test_info['failures'] else "PASS",
             }
+            if overhead is not None and span[1]:
+                action_data["instrumentation_overhead"] = overhead
+            if profile is not None:
+                action_data["profile"] = profile
+
+            budget, violations = self._store_action(
+                self._local.test_info['test_name'], action_data, resources, self._local.test_info['failures'],
+                self._local.test_info['log_writer'])
+            if span_stack:
+                # Everything this action cost its parent besides its own duration
+                span_stack[-1][1] += span[1] + (start_time - enter_time) + (time.perf_counter() - end_time) + (self._overhead_floor or 0.0)
+
+        # Only reached when the keyword itself passed: a budget failure never masks a real error
+        if violations and budget.fail != "none":
+            message = f"'{action_name}' exceeded its budget: " + ", ".join(
+                f"{violation['limit']} {violation['value']:.3f} > {violation['budget']}" for violation in violations
+            )
+            raise (ContinuableBudgetExceeded if budget.fail == "test" else BudgetExceeded)(message)
 
+    def _store_action(self, test_name: str, action_data: Dict, resources: Dict, failures: int,
+                      writer: Optional[MetricsLogWriter] = None, refresh_summary: bool = True):
+        """Fold a finished action into the stats, check its budget and append it to the store and the log."""
+        if writer is None:
+            # Measured outside a session started by this thread
+            writer = self._get_log_writer(test_name)
+        action_name = action_data["action"]
+        duration = action_data["duration"]
+        budget = self._budgets.for_action(action_name) if self._budgets else None
+        violations = []
+        with self._lock:
+            self._metrics[test_name]["failures"] = failures
+            action_stats = self._record_stats(test_name, action_name, duration, refresh_summary)
+            if budget is not None:
+                # Peak memory of the tracked process tree during the action
+                peak_memory = sum(resources.get(f"{role}_rss_mb", {}).get("max", 0.0) for role in ROLES)
+                violations = budget.check(duration, action_stats, peak_memory)
+            if violations:
+                action_data["budget_violations"] = violations
+                self._metrics[test_name]["budget_violations"] = self._metrics[test_name].get("budget_violations", 0) + 1
+            # Only the columns are kept in memory; the full record goes to the log
+            self._metrics[test_name]["actions"].append(action_data)
+
+        # One compact line per action; the writer syncs to disk in batches (and feeds the dashboard)
+        writer.append({"type": ACTION, "test_case_id": test_name, **action_data})
+
+        if self._log_actions:
+            logger.debug(f"Action recorded: {json.dumps(action_data, indent=2, default=json_default)}")
+        for violation in violations:
+            self._warn(
+                f"Budget exceeded by '{action_name}' (step {action_data['step_order']}) in '{test_name}': "
+                f"{violation['limit']} {violation['value']:.3f} > {violation['budget']}"
+            )
+        return budget, violations
+
+    def _warn(self, message: str):
+        """Log a warning now on the main thread; other threads queue it for `_log_pending_warnings`."""
+        if current_thread() is main_thread():
+            logger.warn(message)
+        else:
             with self._lock:
-                test_name = self._local.test_info['test_name']
-                self._metrics[test_name]["actions"].append(action_data)
-                self._metrics[test_name]["failures"] = self._local.test_info['failures']
-                self._update_summary(test_name)
-                self._save_metrics(test_name)  # Save after each action
+                self._pending_warnings.append(message)
 
-            logger.info(f"Action recorded: {json.dumps(action_data, indent=2)}")
+    def _log_pending_warnings(self):
+        """Log the warnings queued by other threads, when called from the main thread."""
+        if not self._pending_warnings or current_thread() is not main_thread():
+            return
+        with self._lock:
+            messages, self._pending_warnings = self._pending_warnings, []
+        for message in messages:
+            logger.warn(message)
 
-    def _update_summary(self, test_name: str):
-        """Update the action summary after an action is recorded."""
-        if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
+    def call_measured(self, action_name: str, params: Optional[Dict], func, args, kwargs):
+        """Call `func` as one lean-mode action, without the context manager of `measure_action`."""
+        token = self._lean_start(params)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._lean_end(action_name, token)
+
+    def _lean_start(self, params: Optional[Dict]) -> tuple:
+        enter_time = time.perf_counter()
+        self._ensure_test_info()
+        test_info = self._local.test_info
+        test_info['step_order'] += 1
+        span_stack = test_info['span_stack']
+        parent_step = span_stack[-1][0] if span_stack else None
+        span = [test_info['step_order'], 0.0]
+        span_stack.append(span)
+        return span, parent_step, params, test_info['round_trips'], enter_time, time.perf_counter()
+
+    def _lean_end(self, action_name: str, token: tuple):
+        """Close a lean-mode action: queue its raw figures for the flusher thread."""
+        end_time = time.perf_counter()
+        span, parent_step, params, round_trips_at_start, enter_time, start_time = token
+        test_info = self._local.test_info
+        span_stack = test_info['span_stack']
+        span_stack.pop()
+        duration = end_time - start_time
+        overhead = None
+        if self._overhead_floor is not None:
+            overhead = min(duration, self._overhead_floor + span[1])
+            duration -= overhead
+        buffer = test_info['lean_buffer']
+        if buffer is None:
+            buffer = test_info['lean_buffer'] = deque()
+            with self._lock:
+                self._lean_buffers.append(buffer)
+        # deque.append is atomic: the flusher pops from the other end without a lock
+        buffer.append((
+            test_info['test_name'], action_name, params, span[0], parent_step, test_info['thread_id'],
+            start_time, end_time, duration, overhead if span[1] else None,
+            test_info['round_trips'] - round_trips_at_start, test_info['failures'], test_info['log_writer'],
+        ))
+        if span_stack:
+            span_stack[-1][1] += span[1] + (start_time - enter_time) + (time.perf_counter() - end_time) + (self._overhead_floor or 0.0)
+
+    def _drain_lean_buffers(self):
+        """Record every queued lean-mode action; the summary rows are refreshed once per drain."""
+        if not self._lean_buffers:
             return
+        # One drain at a time, so the actions of a test are recorded in the order they finished
+        with self._drain_lock:
+            touched = set()
+            for buffer in list(self._lean_buffers):
+                while buffer:
+                    entry = buffer.popleft()
+                    self._store_lean_action(entry)
+                    touched.add((entry[0], entry[1]))
+            if touched:
+                with self._lock:
+                    for test_name, action_name in touched:
+                        summary = self._metrics[test_name].setdefault("summary", {})
+                        summary[action_name] = self._stats[test_name][action_name].to_summary()
 
-        metrics = self._metrics[test_name]
-        actions = metrics.get("actions", [])
-        summary = {}
+    def _store_lean_action(self, entry: tuple):
+        (test_name, action_name, params, step_order, parent_step, thread_id, start_time, end_time, duration,
+         overhead, round_trips, failures, writer) = entry
+        resources = self._sampler.window_stats(start_time, end_time) if self._sampler else {"samples": 0}
+        start_epoch = self._clock_anchor[0] + (start_time - self._clock_anchor[1])
+        cpu_usage, memory_usage = _process_tree_usage(resources)
+        action_data = {
+            "action": action_name,
+            "start_time": datetime.fromtimestamp(start_epoch).isoformat(),
+            "duration": duration,
+            "parameters": params or {},
+            "step_order": step_order,
+            "parent_step": parent_step,
+            "thread_id": thread_id,
+            "round_trips": round_trips,
+            "cpu_usage": cpu_usage,
+            "memory_usage": memory_usage,
+            "resources": resources,
+            "result": "FAIL" if step_order <= failures else "PASS",
+        }
+        if overhead is not None:
+            action_data["instrumentation_overhead"] = overhead
+        self._store_action(test_name, action_data, resources, failures, writer, refresh_summary=False)
 
-        for action in actions:
-            action_name = action["action"]
-            if action_name not in summary:
-                summary[action_name] = {
-                    "count": 0,
-                    "total_duration": 0,
-                    "min_duration": float('inf'),
-                    "max_duration": 0,
-                }
-            summary[action_name]["count"] += 1
-            summary[action_name]["total_duration"] += action["duration"]
-            summary[action_name]["min_duration"] = min(summary[action_name]["min_duration"], action["duration"])
-            summary[action_name]["max_duration"] = max(summary[action_name]["max_duration"], action["duration"])
-            summary[action_name]["avg_duration"] = summary[action_name]["total_duration"] / summary[action_name]["count"]
+    def _ensure_flusher(self):
+        """Start the thread that records lean-mode actions in the background."""
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher_stop.clear()
+            self._flusher = Thread(target=self._run_flusher, name="perf-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._flusher_stop.wait(self._flush_interval):
+            try:
+                self._drain_lean_buffers()
+            except Exception as e:
+                # Robot ignores log messages from other threads; keep the error visible on the console
+                print(f"Performance flusher failed: {e}")
+
+    def _stop_flusher(self):
+        """Stop the flusher thread after recording what is still queued."""
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+            self._flusher = None
+        self._drain_lean_buffers()
+
+    def calibrate_overhead(self, samples: int = 2000) -> float:
+        """Measure the clock cost inside an empty measured window and subtract it from durations from now on.
+
+        Together with the bookkeeping time of nested actions, which is measured
+        on every action, this is removed from each action's duration; records of
+        parent actions keep the removed time as `instrumentation_overhead`.
+        """
+        timings = []
+
+        @contextmanager
+        def probe():
+            # Same shape as the measured window of `measure_action`
+            start_time = time.perf_counter()
+            try:
+                yield
+            finally:
+                timings.append(time.perf_counter() - start_time)
+
+        for _ in range(samples):
+            with probe():
+                pass
+        timings.sort()
+        self._overhead_floor = timings[len(timings) // 2]
+        logger.info(f"Instrumentation overhead calibrated: {self._overhead_floor * 1e6:.2f} us per measured window")
+        return self._overhead_floor
+
+    def _record_stats(self, test_name: str, action_name: str, duration: float,
+                      refresh_summary: bool = True) -> ActionStats:
+        """Fold one action duration into its accumulator and refresh only that summary row."""
+        action_stats = self._stats.setdefault(test_name, {}).get(action_name)
+        if action_stats is None:
+            action_stats = self._stats[test_name][action_name] = ActionStats()
+        action_stats.add(duration)
+        if refresh_summary:
+            self._metrics[test_name].setdefault("summary", {})[action_name] = action_stats.to_summary()
+        return action_stats
+
+    def count_round_trips(self, count: int = 1):
+        """Count browser round trips (gRPC calls) made by the current thread's measured action."""
+        if not self._is_performance_monitoring_enabled:
+            return
+        self._ensure_test_info()
+        self._local.test_info['round_trips'] += count
 
-        metrics["summary"] = summary
+    def record_timing(self, name: str, duration: float):
+        """Record a harness timing (e.g. browser pool acquire latency) for the current test.
+
+        Timings are summarized separately from actions so they never shift step orders.
+        """
+        if not self._is_performance_monitoring_enabled:
+            return
+        self._ensure_test_info()
+        test_name = self._local.test_info['test_name']
+        if test_name not in self._metrics:
+            return
+        with self._lock:
+            timing_stats = self._timing_stats.setdefault(test_name, {}).get(name)
+            if timing_stats is None:
+                timing_stats = self._timing_stats[test_name][name] = ActionStats()
+            timing_stats.add(duration)
+            self._metrics[test_name].setdefault("timings", {})[name] = timing_stats.to_summary()
+            writer = self._get_log_writer(test_name)
+        writer.append({"type": TIMING, "test_case_id": test_name, "name": name, "duration": duration})
+
+    def _update_summary(self, test_name: str):
+        """Rebuild the action summary of a test, and the state snapshots merge it with, from its accumulators."""
+        if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
+            return
+
+        self._metrics[test_name].update(summary_fields(self._stats.get(test_name, {})))
 
     def _save_metrics(self, test_name: str):
-            """Save metrics for a specific test to file."""
-            if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
-                return
-
-            results_dir = self._get_results_dir()
-            os.makedirs(results_dir, exist_ok=True)
-            suite_name = BuiltIn().get_variable_value("${SUITE_NAME}", "default_suite")
-            filename = os.path.join(results_dir, f"{suite_name}_metrics.json")
-            
-            with open(filename, 'w') as f:
-                json.dump(self._metrics[test_name], f, indent=2)
-                logger.info(f"Metrics incrementally saved to {filename}")
+        """Roll the metrics of a specific test up into a compact snapshot file."""
+        if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
+            return
+
+        results_dir = self._get_results_dir()
+        os.makedirs(results_dir, exist_ok=True)
+        filename = self._get_metrics_file(test_name=test_name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        write_snapshot(filename, self._metrics[test_name])
+        logger.info(f"Metrics snapshot saved to {filename}")
 
     def end_test_session(self, test_name: str):
         """Mark the test as completed and save final metrics."""
         if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
             return
 
+        self._drain_lean_buffers()
+        # Collectors may add per-test artifacts (e.g. the HAR file) to the metrics
+        collected = self._collect_test_end(test_name) if test_name not in self._sessions_without_collectors else {}
+        sharded = self._get_worker_id() is not None
         with self._lock:
+            self._metrics[test_name].update(collected)
             self._metrics[test_name]["status"] = "Completed"
             self._update_summary(test_name)
-            self._save_metrics(test_name)
+            self._get_log_writer(test_name).append({
+                "type": TEST_END,
+                "test_case_id": test_name,
+                "status": "Completed",
+                "failures": self._metrics[test_name].get("failures", 0),
+                **collected,
+            })
+            self._flush_logs()
+            if sharded:
+                # A shard snapshot holds only this test; the suite file is written once by `save_metrics`
+                self._save_metrics(test_name)
             logger.info(f"Test session {test_name} completed and metrics saved.")
+        self._log_pending_warnings()
 
     # def save_metrics(self):
     #     """Save all metrics to files at the end of the test."""
@@ -217,27 +919,166 @@ class PerformanceMonitor:
         os.makedirs(results_dir, exist_ok=True)
         logger.info(f"Saving metrics to {results_dir}")
         
-        suite_name = BuiltIn().get_variable_value("${SUITE_NAME}", "default_suite")
+        suite_name = self._get_suite_name()
         logger.info(f"Suite name: {suite_name}")
+        self._stop_flusher()
+        self._stop_sampler()
+        self._flush_logs()
+        self._log_pending_warnings()
         
         for test_name, metrics in self._metrics.items():
             if self._metrics[test_name]["status"] != "Completed":
                 self._metrics[test_name]["status"] = "Completed"
             # Ensure the summary is up-to-date before saving
             self._update_summary(test_name)
-            
-            logger.info(f"Saving metrics for test: {test_name}")
-            filename = os.path.join(results_dir, f"{suite_name}_metrics.json")
-            with open(filename, 'w') as f:
-                json.dump(metrics, f, indent=2)
-                logger.info(f"Metrics saved to {filename}")
 
+        if self._get_worker_id() is not None:
+            # Shard mode: every test has its own file, merged later by `merge_metric_shards`
+            for test_name, metrics in self._metrics.items():
+                filename = self._get_metrics_file(suite_name, test_name)
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                write_snapshot(filename, metrics)
+                logger.info(f"Metrics for test {test_name} saved to {filename}")
+        else:
+            # One suite-level file holding every test, written once in a single pass
+            filename = self._get_metrics_file(suite_name)
+            aggregator = write_suite_metrics(filename, suite_name, self._metrics.items())
+            rollup = write_rollup(results_dir, aggregator)
+            logger.info(f"Metrics of {aggregator.tests} tests saved to {filename}, rollup saved to {rollup}")
+            if str(self._get_variable("${PERF_BINARY_SNAPSHOT}", "False")).lower() == "true":
+                self.export_binary_snapshot(suite_name)
+
+        self._ingest_run(suite_name)
+
+    def export_binary_snapshot(self, suite_name: Optional[str] = None) -> Optional[str]:
+        """Write the suite's metrics as a memory-mappable columnar file next to its JSON snapshot."""
+        if not self._is_performance_monitoring_enabled:
+            logger.info("Performance monitoring is disabled. No binary snapshot written.")
+            return None
+        self._drain_lean_buffers()
+        suite_name = suite_name or self._get_suite_name()
+        filename = binary_path_for(os.path.join(self._get_results_dir(), f"{suite_name}_metrics.json"))
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        write_binary_snapshot(filename, self._metrics, suite_name)
+        logger.info(f"Binary metrics snapshot saved to {filename}")
+        return filename
+
+    def export_chrome_trace(self, suite_name: Optional[str] = None) -> Optional[str]:
+        """Write the recorded tests and actions as a Chrome Trace Event file (Perfetto, chrome://tracing)."""
+        if not self._is_performance_monitoring_enabled:
+            logger.info("Performance monitoring is disabled. No trace written.")
+            return None
+        suite_name = suite_name or self._get_suite_name()
+        filename = os.path.join(self._get_results_dir(), f"{safe_name(suite_name)}{TRACE_SUFFIX}")
+        self._drain_lean_buffers()
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with self._lock:
+            count = write_chrome_trace(filename, self._metrics)
+        logger.info(f"{count} trace events saved to {filename}")
+        return filename
+
+    def _get_run_store_path(self) -> Optional[str]:
+        """Path of the run history database; `${PERF_RUN_STORE}` set to NONE disables it."""
+        path = self._get_variable("${PERF_RUN_STORE}", None) or default_run_store_path(self._get_results_dir())
+        return None if str(path).upper() == "NONE" else path
+
+    def _get_run_key(self) -> str:
+        return str(self._get_variable("${PERF_RUN_ID}", None) or os.getenv("PERF_RUN_ID") or self._run_key)
+
+    def compare_with_baseline(self, tests: Optional[Dict[str, Dict]] = None, suite_name: Optional[str] = None,
+                              last_runs: int = 20, alpha: float = 0.05, min_slowdown: float = 0.10) -> List[Dict]:
+        """Compare per-action durations with the same actions in the last stored runs of the suite.
+
+        Returns one row per (test, action), see `compare_distributions`; the
+        current run is excluded from its own baseline.
+        """
+        path = self._get_run_store_path()
+        if path is None or not os.path.exists(path):
+            return []
+        if tests is None:
+            self._drain_lean_buffers()
+            tests = self._metrics
+        suite_name = suite_name or self._get_suite_name()
+
+        current = {
+            (test_name, action_name): durations
+            for test_name, metrics in tests.items()
+            for action_name, durations in durations_by_action(metrics.get("actions", [])).items()
+        }
+
+        store = RunStore(path)
+        try:
+            baseline = store.baseline_samples(suite_name, last_runs, exclude_run_key=self._get_run_key())
+        finally:
+            store.close()
+
+        results = compare_distributions(current, baseline, alpha=alpha, min_slowdown=min_slowdown)
+        for row in results:
+            row["test"], row["action"] = row.pop("key")
+        return sorted(results, key=lambda row: (row["status"] != REGRESSION, row["test"], row["action"]))
+
+    def _ingest_run(self, suite_name: str):
+        """Add the finished run to the history store used for trend analysis."""
+        path = self._get_run_store_path()
+        if path is None or not self._metrics:
+            return
+        run_key = self._get_run_key()
+        build = self._get_variable("${PERF_BUILD}", None) or os.getenv("BUILD_NUMBER")
+        try:
+            store = RunStore(path)
+            try:
+                run_id = store.ingest_run(suite_name, self._metrics, run_key, build)
+            finally:
+                store.close()
+            logger.info(f"Run {run_key} stored as run {run_id} in {path}")
+        except Exception as e:
+            # History is a convenience; never fail the suite over it
+            logger.warn(f"Could not store run history in {path}: {e}")
+
+    def merge_metric_shards(self, suite_name: Optional[str] = None) -> Optional[str]:
+        """Merge the per-worker shards this run wrote for a suite into one suite-level metrics file."""
+        self._drain_lean_buffers()
+        self._flush_logs()
+        merged_file = merge_shards(self._get_results_dir(), suite_name, run_id=self._get_shard_run_id())
+        if merged_file is None:
+            logger.info("No metric shards found to merge.")
+        else:
+            logger.info(f"Merged metric shards into {merged_file}")
+            aggregator = SuiteAggregator(suite_name or "all_suites")
+            for test_name, metrics in load_metrics_tests(merged_file).items():
+                aggregator.add_test(test_name, metrics)
+            write_rollup(self._get_results_dir(), aggregator)
+        return merged_file
+
+    def _merged_shards_file(self, suite_name: str) -> Optional[str]:
+        """The merged file of this run's shards; they are only merged again when a shard changed since."""
+        results_dir = self._get_results_dir()
+        shard_logs = find_shard_logs(results_dir, suite_name, self._get_shard_run_id())
+        if not shard_logs:
+            return None
+        merged_file = merged_metrics_file(results_dir, suite_name)
+        if os.path.exists(merged_file) and os.path.getmtime(merged_file) >= max(map(os.path.getmtime, shard_logs)):
+            with open(merged_file, 'r', encoding='utf-8') as f:
+                # Only the head is read; the run id is written before the tests
+                if f'"run_id":{json.dumps(run_label(self._get_shard_run_id()))}' in f.read(4096):
+                    return merged_file
+        return self.merge_metric_shards(suite_name)
+
+    def generate_rollup_report(self) -> Optional[str]:
+        """Render the cross-suite rollup (slowest actions, failure correlation, timelines) of the results directory."""
+        report_file = generate_rollup_report(self._get_results_dir())
+        if report_file is None:
+            logger.info("No suite rollups found. Save performance metrics first.")
+        else:
+            logger.info(f"Performance rollup report saved to {report_file}")
+        return report_file
 
     def generate_report(self, test_name: str) -> Dict:
         """Generate performance report for a specific test."""
         if not self._is_performance_monitoring_enabled or test_name not in self._metrics:
             return {}
         
+        self._drain_lean_buffers()
         self._update_summary(test_name)
         metrics = self._metrics[test_name]
         return {
@@ -246,12 +1087,20 @@ class PerformanceMonitor:
             "system_info": metrics["system_info"],
             "execution_context": metrics["execution_context"],
             "summary": metrics["summary"],
-            "actions": metrics["actions"],
+            "actions": metrics["actions"].to_json(),
+            "timings": metrics.get("timings", {}),
             "status": metrics["status"],
             "failures": metrics.get("failures", 0),
             "current_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         }
 
+    def _report_regressions(self, tests: Dict[str, Dict], suite_name: str) -> List[Dict]:
+        try:
+            return [row for row in self.compare_with_baseline(tests, suite_name) if "p_value" in row]
+        except Exception as e:
+            logger.warn(f"Baseline comparison skipped: {e}")
+            return []
+
     def generate_html_report(self, suite_name: str):
         if not self._is_performance_monitoring_enabled:
             logger.info("Performance monitoring is disabled. No HTML report generated.")
@@ -259,29 +1108,49 @@ class PerformanceMonitor:
         
         results_dir = self._get_results_dir()
         metrics_file = os.path.join(results_dir, f"{suite_name}_metrics.json")
-        if not os.path.exists(metrics_file):
+        log_file = log_path_for(metrics_file)
+        binary_file = binary_path_for(metrics_file)
+        self._drain_lean_buffers()
+        self._flush_logs()
+        # Sharded (pabot) runs are read through their merged view
+        merged_file = self._merged_shards_file(suite_name)
+        if merged_file is not None:
+            source_file = merged_file
+        else:
+            # Prefer the append-only log, it is always at least as fresh as the snapshot
+            source_file = log_file if os.path.exists(log_file) else metrics_file
+            # A binary snapshot written after the last logged action maps its columns instead of parsing records
+            if os.path.exists(binary_file) and (
+                    not os.path.exists(log_file) or os.path.getmtime(binary_file) >= os.path.getmtime(log_file)):
+                source_file = binary_file
+        if not os.path.exists(source_file):
             raise FileNotFoundError(f"Metrics file '{metrics_file}' not found.")
 
-        with open(metrics_file, 'r') as f:
-            metrics = json.load(f)
-
-        template_dir = os.path.join(os.getcwd(), 'templates')
-        if not os.path.isdir(template_dir):
-            raise FileNotFoundError(f"Template directory '{template_dir}' does not exist.")
-
-        env = Environment(loader=FileSystemLoader(template_dir))
-        try:
-            template = env.get_template('performance_report_template.html')
-        except Exception as e:
-            raise FileNotFoundError(f"Template 'performance_report_template.html' not found in '{template_dir}'.") from e
+        tests = load_metrics_tests(source_file, suite_name)
+        if source_file == log_file and os.path.exists(metrics_file):
+            # A log holding fewer actions than the snapshot missed some (e.g. logged under another suite's name)
+            snapshot_tests = load_metrics_tests(metrics_file, suite_name)
+            if _action_count(snapshot_tests) > _action_count(tests):
+                source_file, tests = metrics_file, snapshot_tests
+        if not tests:
+            raise ValueError(f"Metrics file '{source_file}' contains no tests.")
+        # Every test of the suite, in the order they started
+        ordered = sorted(tests.values(), key=lambda metrics: metrics.get("start_time") or "")
+        action_count = _action_count(tests)
+        mode = resolve_mode(self._get_variable("${PERF_REPORT_MODE}", AUTO), action_count)
+        template = get_template()
 
+        first = ordered[0]
         report_data = {
-            "test_case_id": metrics.get("test_case_id", "N/A"),
-            "start_time": metrics.get("start_time", "N/A"),
-            "system_info": metrics.get("system_info", {}),
-            "execution_context": metrics.get("execution_context", {}),
-            "summary": metrics.get("summary", {}),
-            "actions": metrics.get("actions", []),
+            "suite_name": suite_name,
+            "mode": mode,
+            "tests": [self._test_report_data(metrics, mode) for metrics in ordered],
+            "action_count": action_count,
+            "start_time": first.get("start_time", "N/A"),
+            "system_info": first.get("system_info", {}),
+            "execution_context": first.get("execution_context", {}),
+            "regressions": self._report_regressions(tests, suite_name),
+            "default_threshold": DEFAULT_DURATION_THRESHOLD,
             "current_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         }
 
@@ -0,0 +1,143 @@
+import os
+import time
+import psutil
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# Process roles, matched against lower-cased executable names
+NODE_PROCESS_NAMES = ("node",)
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell", "firefox", "webkit", "minibrowser", "msedge")
+ROLES = ("python", "node", "browser")
+
+# Per-process figures, in the order stored in `ProcessTreeTracker.latest`
+CPU_TIME, RSS, USS, THREADS, READ_BYTES, WRITE_BYTES = range(6)
+
+
+def _role_of(name: str) -> Optional[str]:
+    name = name.lower()
+    if any(candidate in name for candidate in NODE_PROCESS_NAMES):
+        return "node"
+    if any(candidate in name for candidate in BROWSER_PROCESS_NAMES):
+        return "browser"
+    return None
+
+
+class ProcessTreeTracker:
+    """Tracks the Python process, the Browser library's Node gRPC server and its browsers.
+
+    `psutil.Process` handles are cached: the tree is only walked again when a
+    tracked process exits, when `invalidate` is called (after a browser is
+    opened or closed), or every `rescan_interval` seconds as a fallback for
+    processes spawned behind our back.
+    """
+
+    def __init__(self, root_pid: Optional[int] = None, collect_uss: bool = False, rescan_interval: float = 5.0):
+        self.collect_uss = collect_uss
+        self.rescan_interval = rescan_interval
+        self._root = psutil.Process(root_pid or os.getpid())
+        self._handles: Dict[int, Tuple[psutil.Process, str, str]] = {self._root.pid: (self._root, self._root.name(), "python")}
+        self._lock = Lock()
+        self._dirty = True
+        self._last_scan = 0.0
+        self.latest: Dict[int, Tuple[float, ...]] = {}
+
+    def invalidate(self):
+        """Force a tree walk on the next snapshot, e.g. after a browser was launched."""
+        self._dirty = True
+
+    def _rescan(self):
+        try:
+            children = self._root.children(recursive=True)
+        except psutil.Error:
+            return
+        handles = {self._root.pid: self._handles[self._root.pid]}
+        for child in children:
+            cached = self._handles.get(child.pid)
+            if cached is not None:
+                handles[child.pid] = cached
+                continue
+            try:
+                name = child.name()
+            except psutil.Error:
+                continue
+            role = _role_of(name)
+            if role is not None:
+                handles[child.pid] = (child, name, role)
+        self._handles = handles
+        self._dirty = False
+        self._last_scan = time.perf_counter()
+
+    def _read(self, process: psutil.Process) -> Tuple[float, ...]:
+        with process.oneshot():
+            cpu_times = process.cpu_times()
+            memory = process.memory_full_info() if self.collect_uss else process.memory_info()
+            try:
+                io = process.io_counters()
+                read_bytes, write_bytes = io.read_bytes, io.write_bytes
+            except (AttributeError, psutil.AccessDenied):
+                read_bytes = write_bytes = 0  # Not available on every platform
+            return (
+                cpu_times.user + cpu_times.system,
+                memory.rss,
+                getattr(memory, "uss", 0),
+                process.num_threads(),
+                read_bytes,
+                write_bytes,
+            )
+
+    def snapshot(self) -> Dict[str, Tuple[float, ...]]:
+        """Read every tracked process and return per-role totals.
+
+        The per-process figures are kept in `latest` so actions can compute
+        deltas without touching psutil themselves.
+        """
+        with self._lock:
+            if self._dirty or time.perf_counter() - self._last_scan >= self.rescan_interval:
+                self._rescan()
+
+            latest = {}
+            totals = {role: [0.0] * 6 for role in ROLES}
+            for pid, (process, _, role) in list(self._handles.items()):
+                try:
+                    figures = self._read(process)
+                except psutil.Error:
+                    # The process exited; walk the tree again on the next snapshot
+                    self._handles.pop(pid, None)
+                    self._dirty = True
+                    continue
+                latest[pid] = figures
+                role_totals = totals[role]
+                for index, value in enumerate(figures):
+                    role_totals[index] += value
+            self.latest = latest
+            return {role: tuple(values) for role, values in totals.items()}
+
+    def describe(self, pid: int) -> Tuple[str, str]:
+        """Return the (name, role) of a tracked process."""
+        _, name, role = self._handles.get(pid, (None, "unknown", "unknown"))
+        return name, role
+
+    def action_report(self, start: Dict[int, Tuple[float, ...]], end: Dict[int, Tuple[float, ...]]) -> List[Dict]:
+        """Per-process figures between two `latest` copies taken at action start and end."""
+        report = []
+        for pid, figures in end.items():
+            before = start.get(pid)
+            if before is None:
+                # A process that appeared during the action used everything it reports;
+                # without any start figures there is nothing to compare against
+                before = (0.0,) * len(figures) if start else figures
+            name, role = self.describe(pid)
+            entry = {
+                "pid": pid,
+                "name": name,
+                "role": role,
+                "cpu_time_delta": round(figures[CPU_TIME] - before[CPU_TIME], 4),
+                "rss_mb": round(figures[RSS] / (1024 ** 2), 2),
+                "threads": int(figures[THREADS]),
+                "read_bytes_delta": int(figures[READ_BYTES] - before[READ_BYTES]),
+                "write_bytes_delta": int(figures[WRITE_BYTES] - before[WRITE_BYTES]),
+            }
+            if self.collect_uss:
+                entry["uss_mb"] = round(figures[USS] / (1024 ** 2), 2)
+            report.append(entry)
+        return report
@@ -0,0 +1,120 @@
+import math
+from typing import Dict, Hashable, List, Sequence
+import numpy as np
+
+REGRESSION = "regression"
+OK = "ok"
+INSUFFICIENT_DATA = "insufficient data"
+
+
+def _grouped(samples: Dict[Hashable, Sequence[float]], keys: List[Hashable], span: float):
+    """Concatenate every key's samples, shifted by `key_index * span` so the groups never overlap.
+
+    One sort then orders all groups at once and keeps each group contiguous.
+    """
+    counts = np.array([len(samples[key]) for key in keys], dtype=np.int64)
+    values = np.concatenate([np.asarray(samples[key], dtype=np.float64) for key in keys])
+    group = np.repeat(np.arange(len(keys)), counts)
+    shifted = np.sort(values + group * span)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return shifted, counts, starts
+
+
+def _medians(shifted: np.ndarray, counts: np.ndarray, starts: np.ndarray, span: float) -> np.ndarray:
+    low = shifted[starts + (counts - 1) // 2]
+    high = shifted[starts + counts // 2]
+    return (low + high) / 2 - np.arange(len(counts)) * span
+
+
+def _benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """False discovery rate adjusted p-values (q-values), for testing many actions at once."""
+    n = len(p_values)
+    order = np.argsort(p_values)
+    ranked = p_values[order] * n / np.arange(1, n + 1)
+    q_values = np.minimum.accumulate(ranked[::-1])[::-1]
+    result = np.empty(n)
+    result[order] = np.minimum(q_values, 1.0)
+    return result
+
+
+def compare_distributions(current: Dict[Hashable, Sequence[float]], baseline: Dict[Hashable, Sequence[float]],
+                          alpha: float = 0.05, min_slowdown: float = 0.10, min_current: int = 3,
+                          min_baseline: int = 5) -> List[Dict]:
+    """Compare per-action duration samples of the current run with a baseline.
+
+    Uses a one-sided Mann-Whitney U test (current slower than baseline) with
+    the normal approximation and tie correction. Every action is tested in the
+    same handful of numpy operations: the samples of all actions are shifted
+    into disjoint ranges, sorted once, and ranked with `searchsorted`.
+    p-values are adjusted for the number of actions (Benjamini-Hochberg).
+
+    An action is a regression when its adjusted p-value is below `alpha` and
+    its median is at least `min_slowdown` slower than the baseline median.
+    The effect size is the rank-biserial correlation: 0 means no shift, 1
+    means every current sample is slower than every baseline sample.
+    """
+    results = []
+    keys = []
+    for key in current:
+        if len(current[key]) >= min_current and len(baseline.get(key, ())) >= min_baseline:
+            keys.append(key)
+        else:
+            results.append({
+                "key": key,
+                "n_current": len(current[key]),
+                "n_baseline": len(baseline.get(key, ())),
+                "status": INSUFFICIENT_DATA,
+            })
+    if not keys:
+        return results
+
+    largest = max(max(current[key]) for key in keys)
+    largest = max(largest, max(max(baseline[key]) for key in keys))
+    span = largest * 2 + 1.0
+    cur, n1, cur_starts = _grouped(current, keys, span)
+    base, n2, base_starts = _grouped(baseline, keys, span)
+    groups = np.arange(len(keys))
+
+    # U of the current sample: baseline values below each current value, ties counting half
+    below = np.searchsorted(base, cur, side='left')
+    equal = np.searchsorted(base, cur, side='right') - below
+    cur_group = np.repeat(groups, n1)
+    below -= base_starts[cur_group]
+    u = np.bincount(cur_group, weights=below + 0.5 * equal, minlength=len(keys))
+
+    # Tie correction from the combined samples of each action
+    combined = np.concatenate((cur, base))
+    tie_values, tie_counts = np.unique(combined, return_counts=True)
+    tie_group = (tie_values // span).astype(np.int64)
+    tie_term = np.bincount(tie_group, weights=tie_counts.astype(np.float64) ** 3 - tie_counts, minlength=len(keys))
+
+    n = n1 + n2
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    sigma = np.sqrt(np.maximum(variance, 1e-12))
+    # Continuity correction, one-sided: is the current run slower?
+    z = (u - mean_u - 0.5) / sigma
+    p_values = np.array([0.5 * math.erfc(value / math.sqrt(2)) for value in z])
+    q_values = _benjamini_hochberg(p_values)
+
+    median_current = _medians(cur, n1, cur_starts, span)
+    median_baseline = _medians(base, n2, base_starts, span)
+    slowdown = np.where(median_baseline > 0, median_current / np.where(median_baseline > 0, median_baseline, 1) - 1, 0.0)
+    effect_size = 2 * u / (n1 * n2) - 1
+
+    for index, key in enumerate(keys):
+        regression = bool(q_values[index] < alpha and slowdown[index] >= min_slowdown)
+        results.append({
+            "key": key,
+            "n_current": int(n1[index]),
+            "n_baseline": int(n2[index]),
+            "median_current": float(median_current[index]),
+            "median_baseline": float(median_baseline[index]),
+            "slowdown": float(slowdown[index]),
+            "u": float(u[index]),
+            "p_value": float(p_values[index]),
+            "q_value": float(q_values[index]),
+            "effect_size": float(effect_size[index]),
+            "status": REGRESSION if regression else OK,
+        })
+    return results
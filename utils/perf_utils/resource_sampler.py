@@ -0,0 +1,176 @@
+import time
+import psutil
+from array import array
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Tuple
+from utils.perf_utils.process_tracker import CPU_TIME, ROLES, RSS, THREADS, USS, ProcessTreeTracker
+
+
+class RingBuffer:
+    """Fixed-capacity, preallocated columnar buffer of float samples.
+
+    Rows are appended in timestamp order; once full, the oldest rows are
+    overwritten. The first column must be a monotonic timestamp so that time
+    windows can be located by binary search.
+    """
+
+    def __init__(self, columns: Tuple[str, ...], capacity: int):
+        self.columns = columns
+        self.capacity = max(1, capacity)
+        self._data = {column: array('d', bytes(8 * self.capacity)) for column in columns}
+        self._next = 0
+        self._size = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, row: Tuple[float, ...]):
+        """Store one row, overwriting the oldest row when the buffer is full."""
+        with self._lock:
+            for column, value in zip(self.columns, row):
+                self._data[column][self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def _physical(self, logical: int) -> int:
+        return (self._next - self._size + logical) % self.capacity
+
+    def _bisect(self, timestamps: array, value: float, right: bool) -> int:
+        """Binary search over logical rows for a timestamp bound."""
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            current = timestamps[self._physical(mid)]
+            if current < value or (right and current == value):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def window(self, start: float, end: float) -> Dict[str, List[float]]:
+        """Return the column values of all rows with a timestamp in [start, end].
+
+        When no row falls inside the window (actions shorter than the sampling
+        interval), the latest row taken before `end` is returned instead.
+        """
+        timestamps = self._data[self.columns[0]]
+        with self._lock:
+            if self._size == 0:
+                return {column: [] for column in self.columns}
+            first = self._bisect(timestamps, start, right=False)
+            last = self._bisect(timestamps, end, right=True)
+            if first >= last:
+                first, last = max(last - 1, 0), max(last, 1)
+            rows = [self._physical(index) for index in range(first, last)]
+            return {column: [self._data[column][row] for row in rows] for column in self.columns}
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """Return the most recently stored row."""
+        with self._lock:
+            if self._size == 0:
+                return None
+            row = self._physical(self._size - 1)
+            return {column: self._data[column][row] for column in self.columns}
+
+
+class ResourceSampler:
+    """Samples host and process resource usage on a daemon thread.
+
+    Samples go into a preallocated ring buffer so that recording an action
+    never calls psutil itself: it only aggregates the samples taken during
+    the action's [start, end] window. Per-process figures come from a
+    `ProcessTreeTracker` covering the Python, Node and browser processes.
+    """
+
+    COLUMNS = ("timestamp", "system_cpu", "system_memory_mb") + tuple(
+        f"{role}_{figure}" for role in ROLES for figure in ("cpu", "rss_mb", "uss_mb", "threads")
+    )
+
+    def __init__(self, rate_hz: float = 20, buffer_seconds: float = 600, tracker: Optional[ProcessTreeTracker] = None):
+        self.rate_hz = min(max(rate_hz, 1), 100)
+        self.buffer = RingBuffer(self.COLUMNS, int(self.rate_hz * buffer_seconds))
+        self.tracker = tracker or ProcessTreeTracker()
+        # Cumulative CPU time per pid at the previous sample
+        self._last_cpu_times: Dict[int, float] = {}
+        self._last_timestamp = 0.0
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the sampling thread if it is not already running."""
+        if self.is_running:
+            return
+        # Prime the cpu_percent counter so the first sample is meaningful
+        psutil.cpu_percent(interval=None)
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name="ResourceSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception:
+                pass  # Never let a transient psutil error kill the sampler
+            next_tick += interval
+            self._stop_event.wait(max(0.0, next_tick - time.perf_counter()))
+
+    def sample(self):
+        """Take one sample and store it in the ring buffer."""
+        totals = self.tracker.snapshot()
+        timestamp = time.perf_counter()
+        elapsed = timestamp - self._last_timestamp if self._last_timestamp else 0.0
+
+        # CPU time used since the previous sample, summed only over processes present in both samples:
+        # a process that appeared or exited in between would otherwise add or remove its whole lifetime
+        cpu_times = {pid: figures[CPU_TIME] for pid, figures in self.tracker.latest.items()}
+        used = dict.fromkeys(ROLES, 0.0)
+        for pid, cpu_time in cpu_times.items():
+            previous = self._last_cpu_times.get(pid)
+            # A lower total means the pid was reused by a new process; it is counted from the next sample
+            role = self.tracker.describe(pid)[1]
+            if previous is not None and cpu_time >= previous and role in used:
+                used[role] += cpu_time - previous
+        self._last_cpu_times = cpu_times
+
+        row = [timestamp, psutil.cpu_percent(interval=None), psutil.virtual_memory().used / (1024 ** 2)]
+        for role in ROLES:
+            figures = totals[role]
+            cpu = used[role] / elapsed * 100 if elapsed else 0.0
+            row.extend((cpu, figures[RSS] / (1024 ** 2), figures[USS] / (1024 ** 2), figures[THREADS]))
+        self._last_timestamp = timestamp
+        self.buffer.append(tuple(row))
+
+    def window_stats(self, start: float, end: float) -> Dict:
+        """Aggregate min/mean/max of every sampled column over a perf_counter window."""
+        window = self.buffer.window(start, end)
+        samples = len(window["timestamp"])
+        stats = {"samples": samples}
+        if not samples:
+            return stats
+        for column in self.COLUMNS[1:]:
+            values = window[column]
+            stats[column] = {
+                "min": round(min(values), 2),
+                "mean": round(sum(values) / samples, 2),
+                "max": round(max(values), 2),
+            }
+        return stats
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """Return the most recent sample."""
+        return self.buffer.latest()
@@ -0,0 +1,233 @@
+import json
+import os
+from array import array
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.action_store import durations_by_action
+from utils.perf_utils.metrics_log import summary_stats
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    build TEXT,
+    started_at TEXT,
+    timestamp REAL NOT NULL,
+    UNIQUE (run_key, suite)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_suite_timestamp ON runs (suite, timestamp);
+
+-- What each process (e.g. a pabot worker) contributed to a run, with mergeable state
+CREATE TABLE IF NOT EXISTS run_parts (
+    run_id INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    test TEXT NOT NULL,
+    action TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (run_id, test, action, part)
+);
+
+-- Raw action durations of each part (float64 arrays), the samples regression checks compare
+CREATE TABLE IF NOT EXISTS run_samples (
+    run_id INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    test TEXT NOT NULL,
+    action TEXT NOT NULL,
+    durations BLOB NOT NULL,
+    PRIMARY KEY (run_id, test, action, part)
+);
+
+-- Per-run aggregates, precomputed at ingest so trend queries never touch raw actions
+CREATE TABLE IF NOT EXISTS run_actions (
+    run_id INTEGER NOT NULL,
+    suite TEXT NOT NULL,
+    test TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    count INTEGER NOT NULL,
+    total_duration REAL NOT NULL,
+    min_duration REAL NOT NULL,
+    max_duration REAL NOT NULL,
+    avg_duration REAL NOT NULL,
+    std_duration REAL NOT NULL,
+    p50_duration REAL,
+    p90_duration REAL,
+    p95_duration REAL,
+    p99_duration REAL,
+    PRIMARY KEY (run_id, test, action)
+);
+CREATE INDEX IF NOT EXISTS idx_run_actions_series ON run_actions (suite, test, action, timestamp, run_id);
+CREATE INDEX IF NOT EXISTS idx_run_actions_action ON run_actions (suite, action, timestamp, run_id);
+"""
+
+AGGREGATE_COLUMNS = (
+    "count", "total_duration", "min_duration", "max_duration", "avg_duration", "std_duration",
+    "p50_duration", "p90_duration", "p95_duration", "p99_duration",
+)
+
+
+class RunStore:
+    """SQLite history of finished runs for trend analysis across builds.
+
+    A run is identified by `(run_key, suite)`. Every process that saves
+    metrics for the run (one per pabot worker) replaces its own part, and the
+    per-run aggregates are re-merged from the parts' accumulators, so saving
+    twice or from several workers never double counts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # WAL lets the dashboard read while workers write
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def ingest_run(self, suite: str, tests: Dict[str, Dict], run_key: str, build: Optional[str] = None,
+                   part: Optional[str] = None) -> int:
+        """Store the per-action summaries of a finished run; returns its run id."""
+        part = part or f"{socket.gethostname()}:{os.getpid()}"
+        started_at = min((metrics.get("start_time", "") for metrics in tests.values()), default="") or None
+        connection = self._connection
+        with connection:
+            connection.execute(
+                "INSERT INTO runs (run_key, suite, build, started_at, timestamp) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_key, suite) DO NOTHING",
+                (run_key, suite, build, started_at, time.time()),
+            )
+            run = connection.execute(
+                "SELECT run_id, timestamp FROM runs WHERE run_key = ? AND suite = ?", (run_key, suite)
+            ).fetchone()
+            run_id, timestamp = run["run_id"], run["timestamp"]
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO run_parts (run_id, part, test, action, summary) VALUES (?, ?, ?, ?, ?)",
+                [
+                    # A part keeps the accumulator state next to its row, so parts merge exactly
+                    (run_id, part, test_name, action_name,
+                     json.dumps(dict(stats.to_summary(), state=stats.to_state()), separators=(',', ':')))
+                    for test_name, metrics in tests.items()
+                    for action_name, stats in summary_stats(metrics).items()
+                ],
+            )
+
+            samples = {
+                (test_name, action_name): durations
+                for test_name, metrics in tests.items()
+                for action_name, durations in durations_by_action(metrics.get("actions", [])).items()
+            }
+            connection.executemany(
+                "INSERT OR REPLACE INTO run_samples (run_id, part, test, action, durations) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, part, test_name, action_name, durations.tobytes())
+                 for (test_name, action_name), durations in samples.items()],
+            )
+
+            merged: Dict[tuple, ActionStats] = {}
+            for row in connection.execute("SELECT test, action, summary FROM run_parts WHERE run_id = ?", (run_id,)):
+                summary = json.loads(row["summary"])
+                stats = ActionStats.from_summary(summary, summary.get("state"))
+                key = (row["test"], row["action"])
+                if key in merged:
+                    merged[key].merge(stats)
+                else:
+                    merged[key] = stats
+
+            aggregates = []
+            for (test_name, action_name), stats in merged.items():
+                summary = stats.to_summary()
+                aggregates.append((run_id, suite, test_name, action_name, timestamp)
+                                  + tuple(summary.get(column) for column in AGGREGATE_COLUMNS))
+            connection.executemany(
+                f"INSERT OR REPLACE INTO run_actions (run_id, suite, test, action, timestamp, {', '.join(AGGREGATE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (5 + len(AGGREGATE_COLUMNS)))})",
+                aggregates,
+            )
+        return run_id
+
+    def suites(self) -> List[str]:
+        return [row["suite"] for row in self._connection.execute("SELECT DISTINCT suite FROM runs ORDER BY suite")]
+
+    def recent_runs(self, suite: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """The latest runs, newest first."""
+        if suite is None:
+            rows = self._connection.execute("SELECT * FROM runs ORDER BY timestamp DESC LIMIT ?", (limit,))
+        else:
+            rows = self._connection.execute(
+                "SELECT * FROM runs WHERE suite = ? ORDER BY timestamp DESC LIMIT ?", (suite, limit)
+            )
+        return [dict(row) for row in rows]
+
+    def actions(self, suite: str) -> List[Dict]:
+        """Every (test, action) pair recorded for a suite."""
+        rows = self._connection.execute(
+            "SELECT DISTINCT test, action FROM run_actions WHERE suite = ? ORDER BY test, action", (suite,)
+        )
+        return [dict(row) for row in rows]
+
+    def run_actions(self, run_id: int) -> List[Dict]:
+        """The per-action aggregates of one run."""
+        rows = self._connection.execute(
+            "SELECT * FROM run_actions WHERE run_id = ? ORDER BY test, action", (run_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def action_series(self, suite: str, action: str, test: Optional[str] = None, last_runs: int = 50) -> List[Dict]:
+        """Per-run aggregates of an action over the last `last_runs` runs of a suite, oldest first.
+
+        Without `test`, an action used by several tests is reported per test.
+        """
+        query = (
+            "SELECT ra.*, r.build, r.run_key FROM run_actions ra JOIN runs r ON r.run_id = ra.run_id "
+            "WHERE ra.suite = ? AND ra.action = ?"
+        )
+        parameters: list = [suite, action]
+        if test is not None:
+            query += " AND ra.test = ?"
+            parameters.append(test)
+        query += (
+            " AND ra.run_id IN (SELECT run_id FROM runs WHERE suite = ? ORDER BY timestamp DESC LIMIT ?)"
+            " ORDER BY ra.timestamp, ra.test"
+        )
+        parameters.extend([suite, last_runs])
+        return [dict(row) for row in self._connection.execute(query, parameters)]
+
+    def baseline_samples(self, suite: str, last_runs: int = 20, exclude_run_key: Optional[str] = None) -> Dict[tuple, array]:
+        """Action durations of the last `last_runs` runs of a suite, keyed by (test, action)."""
+        rows = self._connection.execute(
+            "SELECT s.test, s.action, s.durations FROM run_samples s WHERE s.run_id IN ("
+            "SELECT run_id FROM runs WHERE suite = ? AND run_key != ? ORDER BY timestamp DESC LIMIT ?)",
+            (suite, exclude_run_key or "", last_runs),
+        )
+        baseline: Dict[tuple, array] = {}
+        for row in rows:
+            durations = baseline.setdefault((row["test"], row["action"]), array('d'))
+            durations.frombytes(row["durations"])
+        return baseline
+
+
+def default_run_store_path(results_dir: str) -> str:
+    return os.path.join(results_dir, "perf_history.sqlite")
+
+
+_thread_stores = threading.local()
+
+
+def thread_run_store(path: str) -> RunStore:
+    """A store connection owned by the calling thread, for request handlers."""
+    stores = getattr(_thread_stores, "stores", None)
+    if stores is None:
+        stores = _thread_stores.stores = {}
+    if path not in stores:
+        stores[path] = RunStore(path)
+    return stores[path]
@@ -0,0 +1,147 @@
+import argparse
+import glob
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.metrics_log import SUMMARY_STATE, rollup_metrics_log, summary_fields, summary_stats, write_snapshot
+
+SHARDS_DIR = "shards"
+SHARD_SEPARATOR = "__"
+MERGED_SUFFIX = "_merged_metrics.json"
+
+
+def safe_name(value: str) -> str:
+    """Make a value safe to embed in a file name."""
+    return re.sub(r'[^\w.-]+', '_', str(value)).strip('_') or "unnamed"
+
+
+def run_label(run_id: str) -> str:
+    """Make a run id safe to embed between shard name separators."""
+    return safe_name(run_id).replace("_", "-")
+
+
+def shard_metrics_file(results_dir: str, suite_name: str, run_id: str, worker_id: str, pid: int, test_name: str) -> str:
+    """Path of the metrics snapshot written by one worker of a run for one test."""
+    file_name = (f"{safe_name(suite_name)}{SHARD_SEPARATOR}{run_label(run_id)}{SHARD_SEPARATOR}"
+                 f"w{safe_name(worker_id)}_p{pid}_{safe_name(test_name)}_metrics.json")
+    return os.path.join(results_dir, SHARDS_DIR, file_name)
+
+
+def _shard_parts(path: str) -> List[str]:
+    """Suite, run and the rest (worker, pid, test) of a shard file name."""
+    return os.path.basename(path).split(SHARD_SEPARATOR, 2)
+
+
+def find_shard_logs(results_dir: str, suite_name: Optional[str] = None, run_id: Optional[str] = None) -> List[str]:
+    """List shard logs, optionally limited to a suite and its child suites, and to one run."""
+    pattern = os.path.join(results_dir, SHARDS_DIR, f"*{SHARD_SEPARATOR}*{SHARD_SEPARATOR}*_metrics.jsonl")
+    shard_logs = sorted(glob.glob(pattern))
+    if run_id is not None:
+        shard_logs = [path for path in shard_logs if _shard_parts(path)[1] == run_label(run_id)]
+    if suite_name is None:
+        return shard_logs
+    prefix = safe_name(suite_name)
+    return [
+        path for path in shard_logs
+        if _shard_parts(path)[0] == prefix or os.path.basename(path).startswith(prefix + ".")
+    ]
+
+
+def latest_shard_run(results_dir: str, suite_name: Optional[str] = None) -> Optional[str]:
+    """The run whose shard log was written last; shards of earlier runs are left out of merges."""
+    shard_logs = find_shard_logs(results_dir, suite_name)
+    if not shard_logs:
+        return None
+    return _shard_parts(max(shard_logs, key=os.path.getmtime))[1]
+
+
+def merged_metrics_file(results_dir: str, suite_name: Optional[str] = None) -> str:
+    return os.path.join(results_dir, f"{safe_name(suite_name or 'all_suites')}{MERGED_SUFFIX}")
+
+
+def merge_summaries(tests: List[Dict]) -> Dict:
+    """Merge the summaries of several tests' metrics through their accumulators, never by averaging averages."""
+    merged: Dict[str, ActionStats] = {}
+    for metrics in tests:
+        for action_name, stats in summary_stats(metrics).items():
+            if action_name in merged:
+                merged[action_name].merge(stats)
+            else:
+                merged[action_name] = stats
+    return summary_fields(merged)
+
+
+def merge_shards(results_dir: str, suite_name: Optional[str] = None, output_file: Optional[str] = None,
+                 run_id: Optional[str] = None) -> Optional[str]:
+    """Combine the worker shards of one run of a suite into one suite-level metrics file.
+
+    Without `run_id`, the run that wrote the latest shard is merged. Tests
+    that ran in several workers (e.g. a suite-level session started by every
+    pabot process) get their actions concatenated and their summaries merged
+    from the per-shard accumulators.
+    """
+    run_id = run_id if run_id is not None else latest_shard_run(results_dir, suite_name)
+    if run_id is None:
+        return None
+    shard_logs = find_shard_logs(results_dir, suite_name, run_id)
+    if not shard_logs:
+        return None
+
+    tests: Dict[str, Dict] = {}
+    test_parts: Dict[str, List[Dict]] = {}
+    for shard_log in shard_logs:
+        worker = _shard_parts(shard_log)[2].split("_", 1)[0]
+        for test_name, metrics in rollup_metrics_log(shard_log).items():
+            for action in metrics["actions"]:
+                action["worker"] = worker
+            merged = tests.get(test_name)
+            if merged is None:
+                merged = tests[test_name] = {key: value for key, value in metrics.items() if key not in ("summary", SUMMARY_STATE)}
+                merged["actions"] = list(metrics["actions"])
+                merged["workers"] = [worker]
+            else:
+                merged["actions"].extend(metrics["actions"])
+                merged["workers"].append(worker)
+                merged["failures"] = merged.get("failures", 0) + metrics.get("failures", 0)
+                merged["start_time"] = min(merged.get("start_time", ""), metrics.get("start_time", "")) or metrics.get("start_time")
+                if metrics.get("status") != "Completed":
+                    merged["status"] = metrics.get("status", "Running")
+            test_parts.setdefault(test_name, []).append(metrics)
+
+    for test_name, merged in tests.items():
+        merged["actions"].sort(key=lambda action: action.get("start_time", ""))
+        merged.update(merge_summaries(test_parts[test_name]))
+
+    suite_label = suite_name or "all_suites"
+    merged_metrics = {
+        "suite_name": suite_label,
+        "run_id": run_label(run_id),
+        "merged_at": datetime.now().isoformat(),
+        "shards": [os.path.basename(path) for path in shard_logs],
+        "tests": tests,
+        **merge_summaries(list(tests.values())),
+    }
+    output_file = output_file or merged_metrics_file(results_dir, suite_name)
+    write_snapshot(output_file, merged_metrics)
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-worker performance metric shards of a pabot run.")
+    parser.add_argument("--results-dir", default=os.path.join(os.getcwd(), "results"))
+    parser.add_argument("--suite", default=None, help="Top-level suite name; merges every suite when omitted")
+    parser.add_argument("--run", default=None, help="Run id of the shards; the run that wrote the latest shard when omitted")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output_file = merge_shards(args.results_dir, args.suite, args.output, args.run)
+    if output_file is None:
+        print(f"No shards found in {os.path.join(args.results_dir, SHARDS_DIR)}")
+    else:
+        print(f"Merged metrics written to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
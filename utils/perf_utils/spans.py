@@ -0,0 +1,140 @@
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+from utils.perf_utils.action_store import ActionStore
+from utils.perf_utils.metrics_log import load_metrics_tests
+
+TRACE_SUFFIX = "_trace.json"
+
+
+def _epoch(value) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def span_times(actions) -> Dict[str, Dict]:
+    """Total and self time per action name, in one pass over a test's span tree.
+
+    An action is recorded when it ends, so its nested actions always come
+    before it: each span's children have already added their durations when
+    the span itself is reached, and its self time is its duration minus
+    theirs. Self times add up to the time spent in top-level actions, without
+    the double counting of summing nested totals.
+    """
+    store = ActionStore.of(actions)
+    # (thread, step) of a span -> summed durations of its direct children seen so far
+    child_time: Dict[Tuple[int, int], float] = {}
+    rows: Dict[int, list] = {}
+    for index in range(len(store)):
+        duration = store.duration[index]
+        thread_id = store.thread_id[index]
+        self_time = max(0.0, duration - child_time.pop((thread_id, store.step_order[index]), 0.0))
+        parent_step = store.parent_step[index]
+        if parent_step >= 0:
+            child_time[(thread_id, parent_step)] = child_time.get((thread_id, parent_step), 0.0) + duration
+        row = rows.get(store.name_ids[index])
+        if row is None:
+            row = rows[store.name_ids[index]] = [0, 0.0, 0.0, 0]
+        row[0] += 1
+        row[1] += duration
+        row[2] += self_time
+        row[3] += parent_step >= 0
+    return {
+        store.names.values[name_id]: {"count": count, "total_time": total, "self_time": self_time, "nested": nested}
+        for name_id, (count, total, self_time, nested) in rows.items()
+    }
+
+
+def trace_events(tests: Dict[str, Dict]) -> Iterator[Dict]:
+    """Chrome Trace Event "complete" events for every test and action.
+
+    Each test is a span enclosing its actions on the thread that ran them;
+    nested actions are contained in their parent's span, so Perfetto and
+    chrome://tracing draw the run as a flame timeline. Processes are the
+    workers (pabot or virtual users) that recorded the tests. Timestamps are
+    microseconds since the earliest test start.
+    """
+    stores = {test_name: ActionStore.of(metrics.get("actions", [])) for test_name, metrics in tests.items()}
+    starts = [_epoch(metrics.get("start_time")) for metrics in tests.values()]
+    starts += [next((start for start in store.start if not math.isnan(start)), None) for store in stores.values()]
+    starts = [start for start in starts if start is not None]
+    if not starts:
+        return
+    origin = min(starts)
+
+    named_processes = set()
+    for test_name, metrics in tests.items():
+        store = stores[test_name]
+        context = metrics.get("execution_context", {})
+        pid = context.get("pid") or 0
+        if pid not in named_processes:
+            named_processes.add(pid)
+            worker = context.get("worker_id")
+            yield {"name": "process_name", "ph": "M", "pid": pid,
+                   "args": {"name": f"worker {worker} (pid {pid})" if worker is not None else f"pid {pid}"}}
+
+        tid = 0
+        test_start = _epoch(metrics.get("start_time"))
+        test_end = test_start
+        for index in range(len(store)):
+            start = store.start[index]
+            if math.isnan(start):
+                continue
+            duration = store.duration[index]
+            tid = store.thread_id[index] if store.thread_id[index] >= 0 else 0
+            test_start = start if test_start is None else min(test_start, start)
+            test_end = start + duration if test_end is None else max(test_end, start + duration)
+            args = {"test": test_name, "step_order": store.step_order[index], "result": "FAIL" if store.failed[index] else "PASS"}
+            if store.parent_step[index] >= 0:
+                args["parent_step"] = store.parent_step[index]
+            if store.round_trips[index] >= 0:
+                args["round_trips"] = store.round_trips[index]
+            yield {
+                "name": store.name(index), "cat": "action", "ph": "X",
+                "ts": round((start - origin) * 1e6, 1), "dur": round(duration * 1e6, 1),
+                "pid": pid, "tid": tid, "args": args,
+            }
+        if test_start is not None:
+            yield {
+                "name": test_name, "cat": "test", "ph": "X",
+                "ts": round((test_start - origin) * 1e6, 1), "dur": round((test_end - test_start) * 1e6, 1),
+                "pid": pid, "tid": tid,
+                "args": {"status": metrics.get("status"), "failures": metrics.get("failures", 0)},
+            }
+
+
+def write_chrome_trace(path: str, tests: Dict[str, Dict]) -> int:
+    """Stream the trace of the given tests to a JSON file; returns the number of events written."""
+    count = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{"displayTimeUnit":"ms","traceEvents":[')
+        for event in trace_events(tests):
+            if count:
+                f.write(',\n')
+            f.write(json.dumps(event, separators=(',', ':')))
+            count += 1
+        f.write(']}')
+    os.replace(tmp_path, path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export performance metrics as a Chrome Trace Event file for Perfetto or chrome://tracing.")
+    parser.add_argument("metrics_file", help="A _metrics.json, _metrics.jsonl or _metrics.pcol file")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    base = args.metrics_file.rsplit("_metrics.", 1)[0]
+    output = args.output or base + TRACE_SUFFIX
+    count = write_chrome_trace(output, load_metrics_tests(args.metrics_file))
+    print(f"{count} trace events written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import glob
+import heapq
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.perf_utils.action_stats import ActionStats
+from utils.perf_utils.action_store import ActionStore, json_default
+from utils.perf_utils.html_report import get_template
+from utils.perf_utils.metrics_log import SUMMARY_STATE, summary_fields, summary_stats, write_snapshot
+from utils.perf_utils.shard_merge import safe_name
+
+ROLLUP_SUFFIX = "_rollup.json"
+ROLLUP_REPORT = "performance_rollup.html"
+ROLLUP_TEMPLATE = "performance_rollup_template.html"
+SLOWEST_ACTIONS = 25
+# Longer tests are sampled with a fixed stride so every timeline stays small
+TIMELINE_POINTS = 1000
+
+
+def _parse_time(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _merge_into(target: Dict[str, ActionStats], key: str, stats: ActionStats):
+    if key in target:
+        target[key].merge(stats)
+    else:
+        target[key] = stats
+
+
+class SuiteAggregator:
+    """Single-pass aggregation of a suite's tests.
+
+    Each test is visited once: its summary accumulators are merged into the
+    suite summary, its slowest actions compete for a bounded heap, its mean
+    duration per action goes to the failed or passed group, and a sampled
+    timeline is kept. Nothing needs a second look at the actions, and every
+    piece merges across suites.
+    """
+
+    def __init__(self, suite_name: str):
+        self.suite_name = suite_name
+        self.tests = 0
+        self.failed_tests = 0
+        self.actions = 0
+        self.total_duration = 0.0
+        self.summary: Dict[str, ActionStats] = {}
+        self._slowest: List[Tuple[float, int, Dict]] = []
+        self._sequence = 0
+        # Per action name: its mean duration in each test, split by the test's outcome
+        self._failed_means: Dict[str, ActionStats] = {}
+        self._passed_means: Dict[str, ActionStats] = {}
+        self.timelines: List[Dict] = []
+
+    def add_test(self, test_name: str, metrics: Dict):
+        # Plain records (e.g. read back from a log) are converted once; stores are read column by column
+        actions = ActionStore.of(metrics.get("actions", []))
+        failed = metrics.get("failures", 0) > 0 or any(actions.failed)
+        self.tests += 1
+        self.failed_tests += failed
+        self.actions += len(actions)
+
+        for action_name, stats in summary_stats(metrics).items():
+            self.total_duration += stats.total
+            _merge_into(self.summary, action_name, stats)
+            mean = ActionStats()
+            mean.add(stats.mean)
+            _merge_into(self._failed_means if failed else self._passed_means, action_name, mean)
+
+        durations = actions.duration
+        for index in heapq.nlargest(SLOWEST_ACTIONS, range(len(actions)), key=durations.__getitem__):
+            duration = durations[index]
+            if len(self._slowest) == SLOWEST_ACTIONS and duration <= self._slowest[0][0]:
+                break
+            self._sequence += 1
+            entry = (duration, self._sequence, {
+                "suite": self.suite_name, "test": test_name, "action": actions.name(index),
+                "step_order": actions.step_order[index], "duration": duration,
+                "result": "FAIL" if actions.failed[index] else "PASS",
+            })
+            if len(self._slowest) < SLOWEST_ACTIONS:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+
+        test_start = _parse_time(metrics.get("start_time"))
+        test_epoch = test_start.timestamp() if test_start else None
+        stride = max(1, math.ceil(len(actions) / TIMELINE_POINTS))
+        spans = []
+        for index in range(0, len(actions), stride):
+            offset = actions.start[index] - test_epoch if test_epoch is not None else math.nan
+            spans.append([
+                None if math.isnan(offset) else round(offset, 3), round(durations[index], 4),
+                actions.name_ids[index], actions.failed[index],
+            ])
+        self.timelines.append({
+            "suite": self.suite_name,
+            "test": test_name,
+            "failed": failed,
+            "start_time": metrics.get("start_time"),
+            "names": list(actions.names.values),
+            "stride": stride,
+            "spans": spans,
+        })
+
+    def slowest(self) -> List[Dict]:
+        return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self) -> Dict:
+        """The rollup of the suite; `state` holds the accumulator state so suites can be merged later."""
+        return {
+            "suite_name": self.suite_name,
+            "generated_at": datetime.now().isoformat(),
+            "tests": self.tests,
+            "failed_tests": self.failed_tests,
+            "actions": self.actions,
+            "total_duration": self.total_duration,
+            "summary": {action_name: stats.to_summary() for action_name, stats in self.summary.items()},
+            "slowest": self.slowest(),
+            "failed_means": {action_name: stats.to_summary() for action_name, stats in self._failed_means.items()},
+            "passed_means": {action_name: stats.to_summary() for action_name, stats in self._passed_means.items()},
+            "timelines": self.timelines,
+            "state": {
+                key: {action_name: stats.to_state() for action_name, stats in group.items()}
+                for key, group in (("summary", self.summary), ("failed_means", self._failed_means),
+                                   ("passed_means", self._passed_means))
+            },
+        }
+
+
+def failure_correlation(failed_means: Dict[str, ActionStats], passed_means: Dict[str, ActionStats]) -> List[Dict]:
+    """Relate each action's duration to test failures.
+
+    `correlation` is the point-biserial correlation between the action's mean
+    duration in a test and that test failing: positive when the action tends
+    to be slower in failing tests.
+    """
+    rows = []
+    for action_name in sorted(set(failed_means) | set(passed_means)):
+        failed = failed_means.get(action_name)
+        passed = passed_means.get(action_name)
+        n_failed = failed.count if failed else 0
+        n_passed = passed.count if passed else 0
+        combined = ActionStats()
+        for stats in (failed, passed):
+            if stats is not None:
+                combined.merge(stats)
+        n = combined.count
+        std = math.sqrt(combined._m2 / n) if n else 0.0
+        correlation = None
+        if n_failed and n_passed and std > 0:
+            correlation = (failed.mean - passed.mean) / std * math.sqrt(n_failed * n_passed) / n
+        rows.append({
+            "action": action_name,
+            "tests": n,
+            "failed_tests": n_failed,
+            "failure_rate": n_failed / n if n else 0.0,
+            "mean_failed": failed.mean if n_failed else None,
+            "mean_passed": passed.mean if n_passed else None,
+            "correlation": correlation,
+        })
+    return sorted(rows, key=lambda row: (row["correlation"] is None, -(row["correlation"] or 0), -row["failure_rate"]))
+
+
+def write_suite_metrics(path: str, suite_name: str, tests: Iterable[Tuple[str, Dict]]) -> SuiteAggregator:
+    """Stream every test into one suite-level metrics file and aggregate it in the same pass.
+
+    Tests are serialized one at a time straight into a temporary file that
+    replaces the target at the end, so the file is written exactly once and
+    never holds a partial suite.
+    """
+    aggregator = SuiteAggregator(suite_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{"suite_name":' + json.dumps(suite_name) + ',"generated_at":' + json.dumps(datetime.now().isoformat()))
+        f.write(',"tests":{')
+        for index, (test_name, metrics) in enumerate(tests):
+            if index:
+                f.write(',')
+            f.write(json.dumps(test_name) + ':' + json.dumps(metrics, separators=(',', ':'), default=json_default))
+            aggregator.add_test(test_name, metrics)
+        fields = summary_fields(aggregator.summary)
+        f.write('},"summary":' + json.dumps(fields["summary"], separators=(',', ':')))
+        f.write(',' + json.dumps(SUMMARY_STATE) + ':' + json.dumps(fields[SUMMARY_STATE], separators=(',', ':')) + '}')
+    os.replace(tmp_path, path)
+    return aggregator
+
+
+def rollup_file(results_dir: str, suite_name: str) -> str:
+    return os.path.join(results_dir, f"{safe_name(suite_name)}{ROLLUP_SUFFIX}")
+
+
+def write_rollup(results_dir: str, aggregator: SuiteAggregator) -> str:
+    """Write the suite's rollup next to its metrics; cross-suite reports only read these small files."""
+    path = rollup_file(results_dir, aggregator.suite_name)
+    write_snapshot(path, aggregator.to_dict())
+    return path
+
+
+def build_cross_suite_rollup(results_dir: str) -> Dict:
+    """Merge the rollups of every suite in a results directory."""
+    suites = []
+    summary: Dict[str, ActionStats] = {}
+    failed_means: Dict[str, ActionStats] = {}
+    passed_means: Dict[str, ActionStats] = {}
+    slowest = []
+    timelines = []
+    for path in sorted(glob.glob(os.path.join(results_dir, f"*{ROLLUP_SUFFIX}"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            rollup = json.load(f)
+        suites.append({key: rollup[key] for key in ("suite_name", "generated_at", "tests", "failed_tests", "actions", "total_duration")})
+        for target, key in ((summary, "summary"), (failed_means, "failed_means"), (passed_means, "passed_means")):
+            states = rollup.get("state", {}).get(key, {})
+            for action_name, row in rollup.get(key, {}).items():
+                _merge_into(target, action_name, ActionStats.from_summary(row, states.get(action_name)))
+        slowest.extend(rollup.get("slowest", []))
+        timelines.extend(rollup.get("timelines", []))
+    return {
+        "suites": suites,
+        "summary": {action_name: stats.to_summary() for action_name, stats in summary.items()},
+        "slowest": sorted(slowest, key=lambda entry: entry["duration"], reverse=True)[:SLOWEST_ACTIONS],
+        "correlation": failure_correlation(failed_means, passed_means),
+        "timelines": timelines,
+    }
+
+
+def generate_rollup_report(results_dir: str, output_file: Optional[str] = None) -> Optional[str]:
+    """Render the cross-suite rollup of a results directory; None when no suite rollup exists."""
+    rollup = build_cross_suite_rollup(results_dir)
+    if not rollup["suites"]:
+        return None
+    html_content = get_template(ROLLUP_TEMPLATE).render(
+        rollup,
+        timelines_json=json.dumps(rollup["timelines"], separators=(',', ':')).replace("</", "<\\/"),
+        current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    )
+    output_file = output_file or os.path.join(results_dir, ROLLUP_REPORT)
+    with open(output_file, 'w') as f:
+        f.write(html_content)
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cross-suite performance rollup report of a results directory.")
+    parser.add_argument("--results-dir", default=os.path.join(os.getcwd(), "results"))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output_file = generate_rollup_report(args.results_dir, args.output)
+    if output_file is None:
+        print(f"No suite rollups found in {args.results_dir}")
+    else:
+        print(f"Rollup report written to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from typing import Optional
+from Browser import SelectAttribute
+from playwright.sync_api import sync_playwright
+
+
+class PageAdapter:
+    """The subset of the Browser library API used by the page objects, on a Playwright page.
+
+    The Browser library drives one Playwright server for the whole process, so
+    every page object normally shares one browser. This adapter lets the same
+    page objects drive a page of their own, one per virtual user.
+    """
+
+    def __init__(self, page, timeout_ms: float = 30000):
+        self.page = page
+        self.timeout_ms = timeout_ms
+
+    def new_page(self, url: Optional[str] = None):
+        self.page = self.page.context.new_page()
+        if url:
+            self.page.goto(url, timeout=self.timeout_ms)
+
+    def go_to(self, url: str):
+        self.page.goto(url, timeout=self.timeout_ms)
+
+    def click(self, selector: str):
+        self.page.locator(selector).click(timeout=self.timeout_ms)
+
+    def type_text(self, selector: str, text: str):
+        # Like the Browser library: clear the field, then type key by key
+        locator = self.page.locator(selector)
+        locator.fill("", timeout=self.timeout_ms)
+        locator.press_sequentially(text, timeout=self.timeout_ms)
+
+    def get_element(self, selector: str):
+        locator = self.page.locator(selector).first
+        locator.wait_for(state="attached", timeout=self.timeout_ms)
+        return locator
+
+    def get_elements(self, selector: str) -> list:
+        return self.page.locator(selector).all()
+
+    def get_text(self, element) -> str:
+        return element.inner_text(timeout=self.timeout_ms)
+
+    def select_options_by(self, selector: str, attribute: SelectAttribute, *values):
+        locator = self.page.locator(selector)
+        if attribute == SelectAttribute.value:
+            locator.select_option(value=list(values), timeout=self.timeout_ms)
+        elif attribute == SelectAttribute.index:
+            locator.select_option(index=[int(value) for value in values], timeout=self.timeout_ms)
+        else:
+            # `label` and `text` both match the visible option text
+            locator.select_option(label=list(values), timeout=self.timeout_ms)
+
+    def evaluate_javascript(self, selector: Optional[str], function: str, arg=None, all_elements: bool = False):
+        if selector is None:
+            return self.page.evaluate(function, arg)
+        locator = self.page.locator(selector)
+        if all_elements:
+            return locator.evaluate_all(function, arg)
+        return locator.first.evaluate(function, arg, timeout=self.timeout_ms)
+
+
+class PlaywrightSession:
+    """One virtual user's browser: its own Playwright connection, browser and isolated context.
+
+    Stands in for `BrowserManager` (`get_browser`, `open_browser`,
+    `close_browser`) so the existing page objects can be built on it. The
+    Playwright sync API is bound to the thread that started it, so a session
+    must be opened, used and closed on the same thread.
+    """
+
+    def __init__(self, browser_type: str = "chromium", headless: bool = True, timeout_ms: float = 30000):
+        self.browser_type = browser_type
+        self.headless = headless
+        self.timeout_ms = timeout_ms
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._adapter: Optional[PageAdapter] = None
+
+    def open_browser(self, url: str, **context_args):
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+            launcher = getattr(self._playwright, self.browser_type, self._playwright.chromium)
+            self._browser = launcher.launch(headless=self.headless)
+        if self._context is not None:
+            self._context.close()
+        # A new context per iteration: no cookies or storage carried over, like a new test
+        self._context = self._browser.new_context(**context_args)
+        page = self._context.new_page()
+        page.goto(url, timeout=self.timeout_ms)
+        self.get_browser().page = page
+
+    def get_browser(self) -> PageAdapter:
+        if self._adapter is None:
+            # Page objects are built before the first page exists; they only keep the adapter
+            self._adapter = PageAdapter(None, self.timeout_ms)
+        return self._adapter
+
+    def close_browser(self):
+        if self._context is not None:
+            self._context.close()
+            self._context = None
+
+    def close(self):
+        """Close the context, the browser and this thread's Playwright connection."""
+        self.close_browser()
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
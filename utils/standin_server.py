@@ -0,0 +1,154 @@
+import argparse
+import json
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+USERS = ("standard_user", "problem_user", "performance_glitch_user")
+PASSWORD = "secret_sauce"
+SESSION_COOKIE = "session-username"
+
+PRODUCTS = (
+    ("Sauce Labs Backpack", "29.99"),
+    ("Sauce Labs Bike Light", "9.99"),
+    ("Sauce Labs Bolt T-Shirt", "15.99"),
+    ("Sauce Labs Fleece Jacket", "49.99"),
+    ("Sauce Labs Onesie", "7.99"),
+    ("Test.allTheThings() T-Shirt (Red)", "15.99"),
+)
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Swag Labs</title></head>
+<body>
+<div class="login_logo">Swag Labs</div>
+<form id="login" onsubmit="return false;">
+    <input id="user-name" name="user-name" placeholder="Username" type="text">
+    <input id="password" name="password" placeholder="Password" type="password">
+    <h3 data-test="error" id="error" hidden></h3>
+    <input id="login-button" type="submit" value="Login">
+</form>
+<script>
+const USERS = %(users)s;
+document.getElementById('login-button').addEventListener('click', () => {
+    const username = document.getElementById('user-name').value;
+    const password = document.getElementById('password').value;
+    if (USERS.includes(username) && password === '%(password)s') {
+        document.cookie = '%(cookie)s=' + username + '; path=/';
+        window.location.href = '/inventory.html';
+    } else {
+        const error = document.getElementById('error');
+        error.textContent = 'Epic sadface: Username and password do not match any user in this service';
+        error.hidden = false;
+    }
+});
+</script>
+</body></html>
+"""
+
+INVENTORY_PAGE = """<!DOCTYPE html>
+<html><head><title>Swag Labs</title></head>
+<body>
+<div class="header_secondary_container">
+    <span class="title">Products</span>
+    <select class="product_sort_container">
+        <option value="az">Name (A to Z)</option>
+        <option value="za">Name (Z to A)</option>
+        <option value="lohi">Price (low to high)</option>
+        <option value="hilo">Price (high to low)</option>
+    </select>
+    <a class="shopping_cart_link" href="#"></a>
+</div>
+<div class="inventory_list">%(items)s</div>
+<script>
+const list = document.querySelector('.inventory_list');
+const itemName = item => item.querySelector('.inventory_item_name').innerText;
+const itemPrice = item => parseFloat(item.querySelector('.inventory_item_price').innerText.slice(1));
+const orders = {
+    az: (a, b) => itemName(a).localeCompare(itemName(b)),
+    za: (a, b) => itemName(b).localeCompare(itemName(a)),
+    lohi: (a, b) => itemPrice(a) - itemPrice(b),
+    hilo: (a, b) => itemPrice(b) - itemPrice(a),
+};
+document.querySelector('.product_sort_container').addEventListener('change', event => {
+    const items = Array.from(list.children).sort(orders[event.target.value]);
+    items.forEach(item => list.appendChild(item));
+});
+</script>
+</body></html>
+"""
+
+ITEM = """
+    <div class="inventory_item">
+        <div class="inventory_item_name">%s</div>
+        <div class="inventory_item_price">$%s</div>
+    </div>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a saucedemo-like login page and products page, with an optional fixed latency."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/index.html"):
+            self._send(LOGIN_PAGE % {"users": json.dumps(list(USERS)), "password": PASSWORD, "cookie": SESSION_COOKIE})
+        elif path == "/inventory.html":
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            if cookie.get(SESSION_COOKIE) is None or cookie[SESSION_COOKIE].value not in USERS:
+                # Like the real site: products are only shown to a logged-in user
+                self.send_response(302)
+                self.send_header("Location", "/")
+                self.end_headers()
+                return
+            items = "".join(ITEM % product for product in PRODUCTS)
+            self._send(INVENTORY_PAGE % {"items": items})
+        else:
+            self.send_error(404)
+
+    def _send(self, body: str):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Hundreds of virtual users would flood the console
+        pass
+
+
+def start_standin_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stand-in site from a daemon thread; returns the server and its base URL.
+
+    Port 0 picks a free port.
+    """
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a saucedemo-like login and products page for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+
+    server, base_url = start_standin_server(args.host, args.port, args.latency)
+    print(f"Stand-in server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()